@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Bench Rules - Measure detection-rule evaluation cost across data sizes.
+
+Runs every .esql rule under demo-instructions/ against synthetic corpora from
+generate_events.py (default 10k, 100k and 1M events; 10M with --sizes) using
+the offline engine in esql_engine.py, and records per rule and size:
+
+    - latency percentiles over repeated evaluations
+    - events per second at the median latency
+    - peak memory allocated during one evaluation
+    - number of matches
+
+When several rules are benchmarked, the same measurements are also taken
+for the whole set evaluated in one pass by esql_engine.RulePlan.
+
+Results are written as JSON. Passing a previous report with --baseline
+flags rules whose median latency regressed, and exits non-zero, so editing a
+rule (e.g. adding another leading-wildcard LIKE) shows up as a measurable
+change. The median must grow by more than --threshold of the baseline's
+median, more than the baseline's own p95-p50 spread and at least
+--min-delta-ms, and the slowdown must reproduce when the rule is measured
+again, so one noisy run on either side does not fail the gate. Runs fully
+offline.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from esql_engine import Rule, RulePlan, Table, load_rule, matching_rows
+from generate_events import EventGenerator, GeneratorConfig
+from stats import percentile
+
+
+DEFAULT_RULES_DIR = Path(__file__).resolve().parent.parent / "demo-instructions"
+RULE_SET = "(all rules, one pass)"
+MIN_BASELINE_REPEAT = 10  # Fewer timed runs make the median and p95 too noisy to gate on
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes like 10000, 10k or 1M."""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def build_corpus(size: int, seed: int, fields: set[str] | None) -> tuple[Table, datetime]:
+    """Generate ``size`` events and load them into a projected table.
+
+    Returns the table and the timestamp of the last event, which is used as
+    NOW() so windowed rules see the tail of the corpus.
+    """
+    generator = EventGenerator(GeneratorConfig(count=size, seed=seed))
+
+    def docs():
+        remaining = size
+        while remaining > 0:
+            for line in generator.batch(min(generator.config.batch_size, remaining))[:remaining]:
+                remaining -= 1
+                yield json.loads(line)
+
+    table = Table.from_documents(docs(), fields=fields)
+    now = datetime.fromtimestamp(generator.clock_ms / 1000, timezone.utc)
+    return table, now
+
+
+def measure(run: Callable[[], int], repeat: int) -> tuple[int, list[float], int]:
+    """Time repeated calls of ``run``; returns (matches, latencies in ms, peak bytes)."""
+    # Warm-up run also populates cached timestamp columns
+    matches = run()
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()  # Keep collector pauses out of the timings, as timeit does
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return matches, samples, peak
+
+
+def summarize(name: str, path: str, table: Table, matches: int, samples: list[float], peak: int) -> dict:
+    """Build one result entry from measured samples."""
+    p50 = percentile(samples, 50)
+    return {
+        "rule": name,
+        "rule_path": path,
+        "events": table.row_count,
+        "matches": matches,
+        "latency_ms": {
+            "min": round(min(samples), 3),
+            "p50": round(p50, 3),
+            "p95": round(percentile(samples, 95), 3),
+            "p99": round(percentile(samples, 99), 3),
+            "max": round(max(samples), 3),
+        },
+        "events_per_sec": round(table.row_count / (p50 / 1000)) if p50 > 0 else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_rule(rule: Rule, table: Table, now: datetime, repeat: int) -> dict:
+    """Time repeated evaluations of one rule against one table."""
+    measured = measure(lambda: len(matching_rows(rule.query, table, now)), repeat)
+    return summarize(rule.name, str(rule.path), table, *measured)
+
+
+def bench_rule_set(rules: list[Rule], table: Table, now: datetime, repeat: int) -> dict:
+    """Time repeated single-pass evaluations of all rules together."""
+    plan = RulePlan(rule.query for rule in rules)
+    measured = measure(lambda: sum(len(rows) for rows in plan.matching_rows(table, now)), repeat)
+    result = summarize(RULE_SET, "", table, *measured)
+    result["plan_steps"] = plan.steps
+    result["naive_steps"] = plan.naive_steps
+    return result
+
+
+def regression(before: dict, after: dict, threshold: float, min_delta_ms: float) -> str | None:
+    """Describe how ``after`` regressed from ``before``, or None if it did not.
+
+    The slowdown of the median must exceed ``threshold`` (relative), the
+    baseline's p95-p50 spread and ``min_delta_ms`` (absolute), so rules whose
+    timings are noisy, or sub-millisecond on small corpora, do not fail on
+    jitter.
+    """
+    old_p50 = before["latency_ms"]["p50"]
+    new_p50 = after["latency_ms"]["p50"]
+    allowed = max(old_p50 * threshold, before["latency_ms"]["p95"] - old_p50, min_delta_ms)
+    if old_p50 <= 0 or new_p50 - old_p50 <= allowed:
+        return None
+    return (
+        f"{after['rule']} @ {after['events']:,} events: "
+        f"p50 {old_p50:.2f} ms -> {new_p50:.2f} ms (+{(new_p50 / old_p50 - 1) * 100:.0f}%, allowed +{allowed:.2f} ms)"
+    )
+
+
+def load_baseline(path: str) -> dict:
+    """Read a previous report; raises ValueError if it cannot gate a run."""
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"cannot read baseline {path}: {e}") from e
+    if baseline.get("repeat", 0) < MIN_BASELINE_REPEAT:
+        raise ValueError(
+            f"{path} was recorded with --repeat {baseline.get('repeat')}; re-record it with {MIN_BASELINE_REPEAT} or more"
+        )
+    return baseline
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark ES|QL detection rules against synthetic corpora",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s -o bench.json
+  %(prog)s --sizes 10k,100k,1M,10M --repeat 5 -o bench.json
+  %(prog)s --baseline bench.json --threshold 0.25 --min-delta-ms 2
+""",
+    )
+
+    parser.add_argument(
+        "-r", "--rule",
+        action="append",
+        metavar="ESQL",
+        help="Rule file to benchmark (repeatable; default: all .esql under demo-instructions/)",
+    )
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Comma-separated corpus sizes (default: 10k,100k,1M)")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed evaluations per rule and size (default: 10)")
+    parser.add_argument("--seed", type=int, default=2025, help="Corpus seed (default: 2025)")
+    parser.add_argument("-o", "--output", metavar="FILE", help="Write the JSON report to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Previous report to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown of the median latency versus the baseline before failing (default: 0.2)",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Smallest absolute slowdown, in ms, that counts as a regression (default: 1)",
+    )
+
+    args = parser.parse_args()
+    if args.baseline and args.repeat < MIN_BASELINE_REPEAT:
+        parser.error(f"--baseline needs --repeat {MIN_BASELINE_REPEAT} or more for a stable comparison")
+    if args.baseline and args.output and Path(args.output).resolve() == Path(args.baseline).resolve():
+        parser.error("--output would overwrite the --baseline it is compared against")
+    return args
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    previous = {}
+    if args.baseline:
+        try:
+            baseline = load_baseline(args.baseline)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        previous = {(r["rule"], r["events"]): r for r in baseline.get("results", [])}
+
+    rule_paths = args.rule or sorted(str(path) for path in DEFAULT_RULES_DIR.rglob("*.esql"))
+    rules = [load_rule(path) for path in rule_paths]
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+
+    fields = RulePlan(rule.query for rule in rules).fields()
+
+    results = []
+    regressions = []
+    for size in sizes:
+        start = time.perf_counter()
+        table, now = build_corpus(size, args.seed, fields)
+        load_s = time.perf_counter() - start
+        print(f"Corpus: {size:,} events (generated and loaded in {load_s:.1f}s)")
+
+        benches = [lambda rule=rule: bench_rule(rule, table, now, args.repeat) for rule in rules]
+        if len(rules) > 1:
+            benches.append(lambda: bench_rule_set(rules, table, now, args.repeat))
+        for bench in benches:
+            result = bench()
+            result["load_s"] = round(load_s, 3)
+            results.append(result)
+            latency = result["latency_ms"]
+            print(
+                f"  {result['rule']:<32} p50 {latency['p50']:>9.2f} ms  p95 {latency['p95']:>9.2f} ms  "
+                f"{result['events_per_sec'] or 0:>12,} ev/s  peak {result['peak_memory_bytes'] / 1024 / 1024:>7.1f} MB  "
+                f"matches {result['matches']}"
+            )
+
+            # A slowdown only counts if measuring the rule again shows it too
+            before = previous.get((result["rule"], result["events"]))
+            if before and regression(before, result, args.threshold, args.min_delta_ms):
+                message = regression(before, bench(), args.threshold, args.min_delta_ms)
+                if message:
+                    regressions.append(message)
+                else:
+                    print(f"  {result['rule']:<32} slower than the baseline, but not when measured again; ignored")
+        del table
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        if regressions:
+            print()
+            print(f"Regressions versus {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"No regressions versus {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
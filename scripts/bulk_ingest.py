@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""Bulk Ingest - Stream NDJSON documents into Elasticsearch via the _bulk API.
+
+Replaces one-curl-per-document ingestion for anything larger than a handful
+of test documents:
+
+    - Batches are sized by bytes, not document count
+    - Requests reuse pooled keep-alive connections (one per worker)
+    - A bounded number of bulk requests run concurrently
+    - Only the items that failed with a retryable status (429/5xx) are resent,
+      with exponential backoff and jitter; so is the whole batch when a 2xx
+      response cannot be parsed, and any documents it has no item for
+    - Throughput and per-error-type counts are printed at the end
+
+Input files may be NDJSON, a JSON array, or a single (pretty-printed) JSON
+document such as data/test-data/true-positive.json.
+
+``--stub`` serves an in-memory imitation of the _bulk API, optionally
+rejecting a share of items with 429, so the client can be exercised without
+a cluster:
+
+    python3 scripts/bulk_ingest.py --stub --stub-port 9200 --stub-reject-rate 0.1 &
+    python3 scripts/bulk_ingest.py --url http://127.0.0.1:9200 corpus.ndjson
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import queue
+import random
+import ssl
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Iterator
+from urllib.parse import urlsplit
+
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# A reused keep-alive connection that fails like this was closed by the
+# server while idle, before it read the request, so resending is safe
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError)
+
+
+@dataclass
+class IngestConfig:
+    """Configuration for a bulk ingest run."""
+
+    url: str
+    index: str = "logs-endpoint.events.default"
+    username: str | None = None
+    password: str | None = None
+    api_key: str | None = None
+    batch_bytes: int = 5 * 1024 * 1024
+    concurrency: int = 4
+    max_retries: int = 5
+    backoff: float = 0.5  # Base delay for exponential backoff, in seconds
+    timeout: float = 60.0
+    verify_tls: bool = True
+    refresh: bool = False
+
+
+@dataclass
+class IngestStats:
+    """Counters accumulated across all bulk requests."""
+
+    docs: int = 0
+    bytes: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retried_items: int = 0
+    requests: int = 0
+    errors: Counter = field(default_factory=Counter)
+    sample_errors: dict[str, str] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_error(self, error_type: str, reason: str) -> None:
+        self.errors[error_type] += 1
+        self.sample_errors.setdefault(error_type, reason)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections shared by the worker threads."""
+
+    def __init__(self, config: IngestConfig):
+        parts = urlsplit(config.url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = config.timeout
+        self.ssl_context = ssl.create_default_context()
+        if not config.verify_tls:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+        self.headers = {"Content-Type": "application/x-ndjson", "Connection": "keep-alive"}
+        if config.api_key:
+            self.headers["Authorization"] = f"ApiKey {config.api_key}"
+        elif config.username:
+            token = base64.b64encode(f"{config.username}:{config.password or ''}".encode()).decode()
+            self.headers["Authorization"] = f"Basic {token}"
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _send(
+        self,
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: bytes | None,
+        headers: dict[str, str] | None,
+    ) -> tuple[int, bytes]:
+        try:
+            conn.request(method, self.base_path + path, body=body, headers={**self.headers, **(headers or {})})
+            response = conn.getresponse()
+            data = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        return response.status, data
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, bytes]:
+        """Send a request on an idle connection, reconnecting once if it went stale.
+
+        ``headers`` are added to (or override) the pool's default headers.
+        Only failures that show the server dropped the idle connection before
+        reading the request are resent; anything else (a timeout, a reset
+        mid-response) may come after the server acted on it, e.g. indexed a
+        _bulk batch, so it is raised for the caller to decide.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._send(self._connect(), method, path, body, headers)
+
+        try:
+            return self._send(conn, method, path, body, headers)
+        except STALE_CONNECTION_ERRORS:
+            return self._send(self._connect(), method, path, body, headers)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def iter_source_lines(path: str) -> Iterator[bytes]:
+    """Yield one compact JSON document per item from a file.
+
+    NDJSON lines are passed through untouched; JSON arrays and pretty-printed
+    single documents are parsed and re-serialized onto one line.
+    """
+    with open(path, "rb") as f:
+        first = f.readline()
+        stripped = first.strip()
+        if stripped.startswith(b"{"):
+            try:
+                json.loads(stripped)
+            except json.JSONDecodeError:
+                pass
+            else:
+                yield stripped
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield line
+                return
+        data = json.loads(first + f.read())
+    docs = data if isinstance(data, list) else [data]
+    for doc in docs:
+        yield json.dumps(doc, separators=(",", ":")).encode()
+
+
+def iter_batches(lines: Iterable[bytes], max_bytes: int) -> Iterator[list[bytes]]:
+    """Group document lines into batches of at most ``max_bytes`` of payload."""
+    batch: list[bytes] = []
+    size = 0
+    for line in lines:
+        line_size = len(line) + len(BulkIngester.ACTION) + 2
+        if batch and size + line_size > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(line)
+        size += line_size
+    if batch:
+        yield batch
+
+
+class BulkIngester:
+    """Sends document batches to _bulk with bounded concurrency and item retries."""
+
+    ACTION = b'{"create":{}}'
+
+    def __init__(self, config: IngestConfig, pool: ConnectionPool | None = None):
+        self.config = config
+        self.pool = pool or ConnectionPool(config)
+        self.stats = IngestStats()
+        self.path = f"/{config.index}/_bulk" + ("?refresh=wait_for" if config.refresh else "")
+
+    def _body(self, docs: list[bytes]) -> bytes:
+        parts = []
+        for doc in docs:
+            parts.append(self.ACTION)
+            parts.append(doc)
+        parts.append(b"")
+        return b"\n".join(parts)
+
+    def _sleep_backoff(self, attempt: int) -> None:
+        delay = self.config.backoff * (2 ** attempt)
+        time.sleep(delay / 2 + random.random() * delay / 2)
+
+    @staticmethod
+    def _items(data: bytes, count: int) -> list[dict] | None:
+        """Return one result per document from a _bulk response, or None if it is unusable.
+
+        Documents past the end of a short ``items`` list get a retryable
+        ``missing_item`` result, so every document is accounted for.
+        """
+        try:
+            items = json.loads(data).get("items")
+            results = [next(iter(item.values())) for item in items]
+        except (ValueError, AttributeError, TypeError, StopIteration):
+            return None
+        if not all(isinstance(result, dict) for result in results):
+            return None
+        missing = {"status": 503, "error": {"type": "missing_item", "reason": "no item in the bulk response"}}
+        return results[:count] + [missing] * (count - len(results))
+
+    def send_batch(self, docs: list[bytes]) -> None:
+        """Send one batch, resending only retryable failures until done."""
+        pending = docs
+        attempt = 0
+        while pending:
+            body = self._body(pending)
+            try:
+                status, data = self.pool.request("POST", self.path, body)
+            except (http.client.HTTPException, OSError) as e:
+                status, data = None, str(e).encode()
+
+            with self.stats.lock:
+                self.stats.requests += 1
+
+            results = self._items(data, len(pending)) if status is not None and status < 300 else None
+            if status is None or status in RETRYABLE_STATUSES or (status < 300 and results is None):
+                if attempt >= self.config.max_retries:
+                    error_type = "invalid_response" if status is not None and status < 300 else f"http_{status or 'connection'}"
+                    with self.stats.lock:
+                        self.stats.failed += len(pending)
+                        self.stats.record_error(error_type, data[:200].decode(errors="replace"))
+                    return
+                with self.stats.lock:
+                    self.stats.retried_items += len(pending)
+                self._sleep_backoff(attempt)
+                attempt += 1
+                continue
+
+            if status >= 300:
+                with self.stats.lock:
+                    self.stats.failed += len(pending)
+                    self.stats.record_error(f"http_{status}", data[:200].decode(errors="replace"))
+                return
+
+            retry = []
+            with self.stats.lock:
+                for doc, result in zip(pending, results):
+                    item_status = result.get("status", 500)
+                    if item_status < 300:
+                        self.stats.succeeded += 1
+                    elif item_status in RETRYABLE_STATUSES and attempt < self.config.max_retries:
+                        retry.append(doc)
+                    else:
+                        self.stats.failed += 1
+                        error = result.get("error") or {}
+                        self.stats.record_error(error.get("type", f"status_{item_status}"), error.get("reason", ""))
+                self.stats.retried_items += len(retry)
+
+            pending = retry
+            if pending:
+                self._sleep_backoff(attempt)
+                attempt += 1
+
+    def run(self, lines: Iterable[bytes]) -> IngestStats:
+        """Ingest all lines, keeping at most ``2 * concurrency`` batches in memory."""
+        return self.run_batches(iter_batches(lines, self.config.batch_bytes))
+
+    def run_batches(self, batches: Iterable[list[bytes]]) -> IngestStats:
+        """Ingest pre-formed batches with the same bounded concurrency as ``run``."""
+        in_flight = threading.BoundedSemaphore(self.config.concurrency * 2)
+
+        def release(_future) -> None:
+            in_flight.release()
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.config.concurrency) as executor:
+            for batch in batches:
+                in_flight.acquire()
+                with self.stats.lock:
+                    self.stats.docs += len(batch)
+                    self.stats.bytes += sum(len(doc) for doc in batch)
+                future = executor.submit(self.send_batch, batch)
+                future.add_done_callback(release)
+                futures.append(future)
+        for future in futures:
+            future.result()
+        self.pool.close()
+        return self.stats
+
+
+# =============================================================================
+# Stub server
+# =============================================================================
+
+
+class StubElasticsearch:
+    """In-memory imitation of the _bulk and _count APIs.
+
+    Documents are only counted per index. ``reject_rate`` of the items are
+    answered 429 (es_rejected_execution_exception), like a cluster whose
+    write queue is full, to exercise the client's item retries.
+    """
+
+    def __init__(self, reject_rate: float = 0.0, seed: int = 0):
+        self.reject_rate = reject_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.requests = 0
+        self.rejected = 0
+
+    def bulk(self, index: str, body: bytes) -> tuple[int, dict]:
+        started = time.perf_counter()
+        lines = [line for line in body.split(b"\n") if line.strip()]
+        if len(lines) % 2:
+            return 400, {"error": {"type": "illegal_argument_exception", "reason": "The bulk request must be terminated by a newline [\\n]"}, "status": 400}
+        items = []
+        for action_line, doc in zip(lines[::2], lines[1::2]):
+            try:
+                action = next(iter(json.loads(action_line)))
+                json.loads(doc)
+            except (ValueError, TypeError, StopIteration):
+                items.append({"create": {"_index": index, "status": 400, "error": {"type": "mapper_parsing_exception", "reason": "failed to parse"}}})
+                continue
+            if self.rng.random() < self.reject_rate:
+                self.rejected += 1
+                items.append({action: {"_index": index, "status": 429, "error": {"type": "es_rejected_execution_exception", "reason": "rejected execution of coordinating operation"}}})
+                continue
+            self.counts[index] += 1
+            items.append({action: {"_index": index, "_id": f"stub-{self.counts[index]}", "result": "created", "status": 201}})
+        self.requests += 1
+        took = int((time.perf_counter() - started) * 1000)
+        return 200, {"took": took, "errors": any(item_status(item) >= 300 for item in items), "items": items}
+
+
+def item_status(item: dict) -> int:
+    return next(iter(item.values())).get("status", 500)
+
+
+def make_stub_handler(stub: StubElasticsearch) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self, method: str) -> None:
+            path = urlsplit(self.path).path.strip("/").split("/")
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            with stub.lock:
+                if method == "POST" and len(path) == 2 and path[1] == "_bulk":
+                    self._reply(*stub.bulk(path[0], body))
+                elif method == "GET" and len(path) == 2 and path[1] == "_count":
+                    self._reply(200, {"count": stub.counts[path[0]]})
+                else:
+                    self._reply(404, {"error": {"type": "not_found", "reason": f"{method} /{'/'.join(path)}"}, "status": 404})
+
+        def do_GET(self) -> None:
+            self._route("GET")
+
+        def do_POST(self) -> None:
+            self._route("POST")
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def start_stub(host: str, port: int, reject_rate: float) -> tuple[ThreadingHTTPServer, StubElasticsearch]:
+    """Serve a stub on ``host:port`` (0 for any free port) from a daemon thread."""
+    stub = StubElasticsearch(reject_rate)
+    server = ThreadingHTTPServer((host, port), make_stub_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def print_summary(stats: IngestStats, elapsed: float) -> None:
+    """Print throughput and error statistics."""
+    rate = stats.docs / elapsed if elapsed > 0 else 0
+    mb_rate = stats.bytes / elapsed / 1024 / 1024 if elapsed > 0 else 0
+    print()
+    print("==========================================")
+    print("Bulk Ingestion Summary")
+    print("==========================================")
+    print(f"Documents read:     {stats.docs}")
+    print(f"Succeeded:          {stats.succeeded}")
+    print(f"Failed:             {stats.failed}")
+    print(f"Items retried:      {stats.retried_items}")
+    print(f"Bulk requests:      {stats.requests}")
+    print(f"Elapsed:            {elapsed:.2f}s")
+    print(f"Throughput:         {rate:,.0f} docs/s ({mb_rate:.2f} MB/s)")
+    if stats.errors:
+        print()
+        print("Errors by type:")
+        for error_type, count in stats.errors.most_common():
+            print(f"  {error_type}: {count}")
+            reason = stats.sample_errors.get(error_type)
+            if reason:
+                print(f"    e.g. {reason}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Stream NDJSON documents into Elasticsearch with the _bulk API",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  ES_PASSWORD=... %(prog)s --url https://my-es:443 corpus.ndjson
+  %(prog)s --url http://localhost:9200 --concurrency 8 --batch-mb 10 data/test-data/*.json
+  %(prog)s --stub --stub-reject-rate 0.2 corpus.ndjson
+  %(prog)s --stub --stub-port 9200
+""",
+    )
+
+    parser.add_argument("files", nargs="*", metavar="FILE", help="NDJSON or JSON files to ingest")
+    parser.add_argument("--url", help="Elasticsearch endpoint URL")
+    parser.add_argument("--index", default="logs-endpoint.events.default", help="Target index or data stream")
+    parser.add_argument("--user", default="elastic", help="Basic auth username (default: elastic)")
+    parser.add_argument("--password", default=os.environ.get("ES_PASSWORD"), help="Basic auth password (default: $ES_PASSWORD)")
+    parser.add_argument("--api-key", default=os.environ.get("ES_API_KEY"), help="API key, overrides basic auth (default: $ES_API_KEY)")
+    parser.add_argument("--batch-mb", type=float, default=5.0, help="Maximum bulk request size in MB (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent bulk requests (default: 4)")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries for failed items (default: 5)")
+    parser.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification")
+    parser.add_argument("--refresh", action="store_true", help="Wait for each batch to become searchable")
+    parser.add_argument(
+        "--stub",
+        action="store_true",
+        help="Serve a local stub _bulk endpoint; with FILEs, ingest into it and exit",
+    )
+    parser.add_argument("--stub-port", type=int, default=9200, help="Port for a standalone stub (default: 9200)")
+    parser.add_argument("--stub-reject-rate", type=float, default=0.0, help="Share of items the stub rejects with 429 (default: 0)")
+
+    args = parser.parse_args()
+    if not args.files and not args.stub:
+        parser.error("at least one FILE is required")
+    if args.files and not args.url and not args.stub:
+        parser.error("--url is required")
+    return args
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    if args.stub and not args.files:
+        server = ThreadingHTTPServer(("127.0.0.1", args.stub_port), make_stub_handler(StubElasticsearch(args.stub_reject_rate)))
+        print(f"Stub Elasticsearch on http://127.0.0.1:{args.stub_port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    stub = None
+    if args.stub:
+        server, stub = start_stub("127.0.0.1", 0, args.stub_reject_rate)
+        args.url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    config = IngestConfig(
+        url=args.url,
+        index=args.index,
+        username=args.user if args.password else None,
+        password=args.password,
+        api_key=args.api_key,
+        batch_bytes=int(args.batch_mb * 1024 * 1024),
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+        verify_tls=not args.insecure,
+        refresh=args.refresh,
+    )
+
+    def lines() -> Iterator[bytes]:
+        for path in args.files:
+            yield from iter_source_lines(path)
+
+    ingester = BulkIngester(config)
+    start = time.perf_counter()
+    stats = ingester.run(lines())
+    print_summary(stats, time.perf_counter() - start)
+    if stub is not None:
+        server.shutdown()
+        print(f"Stub:               {sum(stub.counts.values())} indexed, {stub.rejected} rejected with 429")
+
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
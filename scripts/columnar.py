@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""Columnar - Memory-mappable, dictionary-encoded corpus format.
+
+Converting ECS JSON to this format once removes JSON parsing from every later
+rule evaluation: a corpus is opened by memory-mapping its column files, so
+load time does not depend on corpus size and only the columns (and pages) a
+rule touches are ever read.
+
+A corpus is a directory holding manifest.json plus a few flat files per
+column. Rows are the flattened documents exactly as esql_engine.Table would
+build them (metadata fields included). Column encodings:
+
+    dict    uint16/uint32 codes, one per row (0 = null); the dictionary of
+            values lives in the manifest. Used for process.name,
+            process.parent.name, host.name, event.type and any other string
+            field with few distinct values, so IN / == predicates compare
+            integers.
+    str     uint64 byte offsets (rows + 1) into a UTF-8 data file
+    int     int64 values
+    float   float64 values
+    list    multi-valued strings such as process.args: uint64 row offsets
+            into an element table, which is itself offsets + data
+    json    anything else, stored as JSON text (offsets + data)
+
+Every non-dict column also has a one-byte-per-row validity file. Offsets and
+values are little-endian.
+
+Conversion makes two streaming passes over the input (one to choose
+encodings, one to write), so memory use does not grow with corpus size.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from esql_engine import Table, document_row, iter_json_values, normalize_value
+
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Always dictionary-encoded; other string fields qualify automatically when
+# they have at most AUTO_DICT_LIMIT distinct values and repeat on average
+DICT_FIELDS = {"process.name", "process.parent.name", "host.name", "event.type", "_index"}
+AUTO_DICT_LIMIT = 4096
+CODE_LIMIT = 1 << 16  # Dictionaries up to this size use uint16 codes
+
+FLUSH_ITEMS = 1 << 16  # Buffered items per array before writing to disk
+
+if sys.byteorder != "little":
+    raise SystemExit("columnar.py assumes a little-endian host")
+
+
+# =============================================================================
+# Writing
+# =============================================================================
+
+
+class _Stream:
+    """Append-only typed array file with an in-memory buffer."""
+
+    def __init__(self, path: Path, typecode: str):
+        self.file = open(path, "wb")
+        self.buffer = array(typecode)
+
+    def append(self, value: Any) -> None:
+        self.buffer.append(value)
+        if len(self.buffer) >= FLUSH_ITEMS:
+            self.flush()
+
+    def flush(self) -> None:
+        self.buffer.tofile(self.file)
+        del self.buffer[:]
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+class _Blob:
+    """Append-only byte file tracking its length for offset arrays."""
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+        self.size = 0
+
+    def append(self, data: bytes) -> None:
+        self.file.write(data)
+        self.size += len(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _ColumnWriter:
+    """Writes one column in its chosen encoding."""
+
+    def __init__(self, directory: Path, index: int, kind: str, wide_codes: bool = False):
+        self.kind = kind
+        prefix = directory / f"c{index}"
+        self.files = {}
+        self.dictionary: dict[str, int] = {}
+        if kind == "dict":
+            self.codes = _Stream(prefix.with_suffix(".codes"), "I" if wide_codes else "H")
+            self.files["codes"] = self.codes.file.name
+            return
+        self.valid = _Blob(prefix.with_suffix(".valid"))
+        self.files["valid"] = self.valid.file.name
+        if kind in ("int", "float"):
+            self.values = _Stream(prefix.with_suffix(".values"), "q" if kind == "int" else "d")
+            self.files["values"] = self.values.file.name
+            return
+        self.offsets = _Stream(prefix.with_suffix(".offsets"), "Q")
+        self.data = _Blob(prefix.with_suffix(".data"))
+        self.offsets.append(0)
+        self.files.update(offsets=self.offsets.file.name, data=self.data.file.name)
+        if kind == "list":
+            self.rows = _Stream(prefix.with_suffix(".rows"), "Q")
+            self.rows.append(0)
+            self.elements = 0
+            self.files["rows"] = self.rows.file.name
+
+    def add(self, value: Any) -> None:
+        kind = self.kind
+        if kind == "dict":
+            if value is None:
+                self.codes.append(0)
+            else:
+                code = self.dictionary.get(value)
+                if code is None:
+                    code = self.dictionary[value] = len(self.dictionary) + 1
+                self.codes.append(code)
+            return
+
+        self.valid.append(b"\x00" if value is None else b"\x01")
+        if kind in ("int", "float"):
+            self.values.append(0 if value is None else value)
+        elif kind == "list":
+            items = [] if value is None else value if isinstance(value, list) else [value]
+            for item in items:
+                self.data.append(item.encode("utf-8"))
+                self.offsets.append(self.data.size)
+            self.elements += len(items)
+            self.rows.append(self.elements)
+        else:
+            if value is not None:
+                self.data.append(value.encode("utf-8") if kind == "str" else json.dumps(value).encode("utf-8"))
+            self.offsets.append(self.data.size)
+
+    def close(self) -> dict:
+        """Finish the files and return this column's manifest entry."""
+        for part in ("codes", "values", "offsets", "rows", "valid", "data"):
+            writer = getattr(self, part, None)
+            if writer is not None:
+                writer.close()
+        entry: dict = {"kind": self.kind, "files": {name: os.path.basename(path) for name, path in self.files.items()}}
+        if self.kind == "dict":
+            entry["code_type"] = self.codes.buffer.typecode
+            entry["dictionary"] = list(self.dictionary)
+        return entry
+
+
+class _Profile:
+    """What pass one learned about a column."""
+
+    __slots__ = ("types", "distinct", "count")
+
+    def __init__(self):
+        self.types: set[str] = set()
+        self.distinct: set[str] | None = set()
+        self.count = 0
+
+    def observe(self, value: Any) -> None:
+        if value is None:
+            return
+        self.count += 1
+        if isinstance(value, str):
+            self.types.add("str")
+            if self.distinct is not None:
+                self.distinct.add(value)
+                if len(self.distinct) > CODE_LIMIT:
+                    self.distinct = None
+        elif isinstance(value, bool):
+            self.types.add("json")
+        elif isinstance(value, int):
+            self.types.add("int" if -(1 << 63) <= value < (1 << 63) else "json")
+        elif isinstance(value, float):
+            self.types.add("float")
+        elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+            self.types.add("list")
+        else:
+            self.types.add("json")
+
+    def encoding(self, name: str) -> tuple[str, bool]:
+        """Return (kind, wide_codes) for this column."""
+        types = self.types
+        if types <= {"str"}:
+            cardinality = len(self.distinct) if self.distinct is not None else CODE_LIMIT + 1
+            if name in DICT_FIELDS or (cardinality <= AUTO_DICT_LIMIT and cardinality * 2 <= self.count):
+                return "dict", cardinality >= CODE_LIMIT
+            return "str", False
+        if types == {"int"}:
+            return "int", False
+        if types <= {"int", "float"}:
+            return "float", False
+        if types <= {"str", "list"}:
+            return "list", False
+        return "json", False
+
+
+def iter_rows(paths: Iterable[str]) -> Iterator[dict]:
+    """Yield the flattened table rows of every document in ``paths``."""
+    row = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for doc in iter_json_values(f):
+                if isinstance(doc, dict):
+                    yield document_row(doc, "", row)
+                    row += 1
+
+
+def convert(paths: list[str], directory: str) -> dict:
+    """Convert JSON/NDJSON files to a columnar corpus; returns the manifest."""
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+
+    # Pass 1: choose an encoding per column
+    profiles: dict[str, _Profile] = {}
+    row_count = 0
+    for flat in iter_rows(paths):
+        row_count += 1
+        for name, value in flat.items():
+            profile = profiles.get(name)
+            if profile is None:
+                profile = profiles[name] = _Profile()
+            profile.observe(normalize_value(value))
+
+    names = sorted(profiles)
+    writers = {}
+    for index, name in enumerate(names):
+        kind, wide = profiles[name].encoding(name)
+        writers[name] = _ColumnWriter(out, index, kind, wide)
+    del profiles
+
+    # Pass 2: write every column, null where a document lacks the field
+    for flat in iter_rows(paths):
+        for name, writer in writers.items():
+            writer.add(normalize_value(flat.get(name)))
+
+    manifest = {
+        "format": "tomcatastrophe-columnar",
+        "version": FORMAT_VERSION,
+        "rows": row_count,
+        "sources": [os.path.abspath(path) for path in paths],
+        "columns": {name: writer.close() for name, writer in writers.items()},
+    }
+    with open(out / MANIFEST, "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+# =============================================================================
+# Reading
+# =============================================================================
+
+
+class _Column:
+    """Base for memory-mapped columns: a read-only sequence of row values."""
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Any]:
+        for row in range(self.length):
+            yield self[row]
+
+
+class DictColumn(_Column):
+    """Dictionary-encoded strings; predicates can work on ``codes`` directly."""
+
+    def __init__(self, codes: memoryview, dictionary: list[str]):
+        super().__init__(len(codes))
+        self.codes = codes
+        self.dictionary = [None] + dictionary
+        self._lookup = {value: code for code, value in enumerate(dictionary, 1)}
+
+    def __getitem__(self, row: int) -> str | None:
+        return self.dictionary[self.codes[row]]
+
+    def __iter__(self) -> Iterator[str | None]:
+        dictionary = self.dictionary
+        return (dictionary[code] for code in self.codes)
+
+    def encode(self, values: Iterable[Any]) -> set[int]:
+        """Codes of the given values; values not in the dictionary are dropped."""
+        return {self._lookup[value] for value in values if isinstance(value, str) and value in self._lookup}
+
+
+class NumberColumn(_Column):
+    def __init__(self, values: memoryview, valid: memoryview):
+        super().__init__(len(values))
+        self.values = values
+        self.valid = valid
+
+    def __getitem__(self, row: int) -> int | float | None:
+        return self.values[row] if self.valid[row] else None
+
+
+class StringColumn(_Column):
+    def __init__(self, offsets: memoryview, data: memoryview, valid: memoryview, decode_json: bool = False):
+        super().__init__(len(offsets) - 1)
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+        self.decode_json = decode_json
+
+    def __getitem__(self, row: int) -> Any:
+        if not self.valid[row]:
+            return None
+        text = str(self.data[self.offsets[row]:self.offsets[row + 1]], "utf-8")
+        return json.loads(text) if self.decode_json else text
+
+
+class ListColumn(_Column):
+    """Multi-valued strings, normalized like table values (one element -> scalar)."""
+
+    def __init__(self, rows: memoryview, offsets: memoryview, data: memoryview, valid: memoryview):
+        super().__init__(len(rows) - 1)
+        self.rows = rows
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+
+    def __getitem__(self, row: int) -> Any:
+        if not self.valid[row]:
+            return None
+        offsets, data = self.offsets, self.data
+        items = [
+            str(data[offsets[i]:offsets[i + 1]], "utf-8")
+            for i in range(self.rows[row], self.rows[row + 1])
+        ]
+        return normalize_value(items)
+
+
+class ColumnarCorpus(Mapping):
+    """A converted corpus; maps field names to lazily memory-mapped columns."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{directory}: unsupported columnar format version {self.manifest.get('version')}")
+        self.row_count = self.manifest["rows"]
+        self._maps: list[mmap.mmap] = []
+        self._columns: dict[str, _Column] = {}
+
+    def _map(self, name: str, typecode: str = "B") -> memoryview:
+        path = self.directory / name
+        if os.path.getsize(path) == 0:
+            return memoryview(b"").cast(typecode)
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(typecode)
+
+    def __getitem__(self, name: str) -> _Column:
+        column = self._columns.get(name)
+        if column is not None:
+            return column
+        entry = self.manifest["columns"][name]
+        files = entry["files"]
+        kind = entry["kind"]
+        if kind == "dict":
+            column = DictColumn(self._map(files["codes"], entry["code_type"]), entry["dictionary"])
+        elif kind in ("int", "float"):
+            column = NumberColumn(self._map(files["values"], "q" if kind == "int" else "d"), self._map(files["valid"]))
+        elif kind == "list":
+            column = ListColumn(
+                self._map(files["rows"], "Q"), self._map(files["offsets"], "Q"), self._map(files["data"]), self._map(files["valid"])
+            )
+        else:
+            column = StringColumn(
+                self._map(files["offsets"], "Q"), self._map(files["data"]), self._map(files["valid"]), decode_json=kind == "json"
+            )
+        self._columns[name] = column
+        return column
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest["columns"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["columns"])
+
+
+def open_table(directory: str | Path) -> Table:
+    """Open a converted corpus as an esql_engine Table without loading it."""
+    corpus = ColumnarCorpus(directory)
+    return Table(corpus, corpus.row_count)
+
+
+def is_corpus(path: str | Path) -> bool:
+    """True if ``path`` is a directory written by convert()."""
+    return (Path(path) / MANIFEST).is_file()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Convert ECS JSON/NDJSON to a memory-mappable columnar corpus",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s data/test-data/*.json -o test-data.col
+  %(prog)s corpus.ndjson -o corpus.col
+  python3 scripts/esql_engine.py -r demo-instructions/tomcat-webshell-rule-query.esql corpus.col
+""",
+    )
+
+    parser.add_argument("files", nargs="+", metavar="FILE", help="JSON, JSON array or NDJSON files")
+    parser.add_argument("-o", "--output", required=True, metavar="DIR", help="Output corpus directory")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    start = time.perf_counter()
+    try:
+        manifest = convert(args.files, args.output)
+    except json.JSONDecodeError as e:
+        print(f"ERROR: Invalid JSON: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    size = sum(entry.stat().st_size for entry in Path(args.output).iterdir())
+    kinds: dict[str, int] = {}
+    for entry in manifest["columns"].values():
+        kinds[entry["kind"]] = kinds.get(entry["kind"], 0) + 1
+    print(f"Converted {manifest['rows']:,} documents in {elapsed:.1f}s -> {args.output} ({size / 1024 / 1024:.1f} MB)")
+    print("Columns: " + ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -85,6 +85,7 @@ construct_fleet_url() {
 ELASTIC_USER="${ELASTIC_USER:-elastic}"
 SSH_KEY="${SSH_KEY:-$HOME/.ssh/id_ed25519}"
 SSH_USER="ubuntu"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 POLICY_NAME="Blue Team - Endpoint Security"
 
 # Check required environment variables
@@ -163,24 +164,33 @@ echo "  Policy Name: $POLICY_NAME"
 echo "  Elastic Version: $ELASTIC_VERSION"
 echo ""
 
-# Wait for SSH access with retry logic (VM may still be booting)
+# Wait for SSH access (VM may still be booting); returns as soon as sshd sends its banner
 print_step "Waiting for SSH access to blue-01 (VM may still be booting)..."
-MAX_SSH_ATTEMPTS=30
-SSH_WAIT_INTERVAL=10
+SSH_WAIT_TIMEOUT=300
+
+if ! python3 "$SCRIPT_DIR/wait_for_hosts.py" "$BLUE_VM_IP:22" --timeout "$SSH_WAIT_TIMEOUT"; then
+    print_error "Cannot connect to blue-01 via SSH after ${SSH_WAIT_TIMEOUT}s"
+    print_error "Verify the VM is running and its security group allows SSH"
+    exit 1
+fi
+# sshd can answer before login works (key not installed yet, MaxStartups), so retry briefly
+MAX_LOGIN_ATTEMPTS=6
+LOGIN_WAIT_INTERVAL=5
 SSH_CONNECTED=false
 
-for attempt in $(seq 1 $MAX_SSH_ATTEMPTS); do
+for attempt in $(seq 1 $MAX_LOGIN_ATTEMPTS); do
     if ssh -i "$SSH_KEY" -o ConnectTimeout=10 -o StrictHostKeyChecking=accept-new -o UserKnownHostsFile=/dev/null "$SSH_USER@$BLUE_VM_IP" "echo 'SSH connection successful'" > /dev/null 2>&1; then
         SSH_CONNECTED=true
         break
     fi
-    print_info "SSH attempt $attempt/$MAX_SSH_ATTEMPTS failed, waiting ${SSH_WAIT_INTERVAL}s..."
-    sleep $SSH_WAIT_INTERVAL
+    if [ "$attempt" -lt "$MAX_LOGIN_ATTEMPTS" ]; then
+        print_info "SSH login attempt $attempt/$MAX_LOGIN_ATTEMPTS failed, waiting ${LOGIN_WAIT_INTERVAL}s..."
+        sleep $LOGIN_WAIT_INTERVAL
+    fi
 done
-
 if [ "$SSH_CONNECTED" = false ]; then
-    print_error "Cannot connect to blue-01 via SSH after $MAX_SSH_ATTEMPTS attempts"
-    print_error "Verify the VM is running and SSH_KEY is correct"
+    print_error "SSH is up on blue-01 but login as $SSH_USER failed after $MAX_LOGIN_ATTEMPTS attempts"
+    print_error "Verify SSH_KEY is correct"
     exit 1
 fi
 print_info "✓ SSH access verified"
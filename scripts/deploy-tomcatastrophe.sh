@@ -31,19 +31,24 @@ echo "Target: ${SSH_USER}@${RED_VM_IP}"
 echo "SSH Key: ${SSH_KEY}"
 echo ""
 
-# Wait for SSH to be available
+# Wait for SSH to be available (returns as soon as sshd sends its banner)
 echo "[1/3] Waiting for SSH access..."
-for i in {1..30}; do
+if ! python3 "${SCRIPT_DIR}/wait_for_hosts.py" "${RED_VM_IP}:22" --timeout 300; then
+    echo "ERROR: SSH on ${RED_VM_IP} did not come up within 300s"
+    exit 1
+fi
+# sshd can answer before login works (key not installed yet, MaxStartups), so retry briefly
+for i in {1..6}; do
     if ssh -i "$SSH_KEY" -o ConnectTimeout=5 -o StrictHostKeyChecking=no -o BatchMode=yes "${SSH_USER}@${RED_VM_IP}" "echo 'SSH ready'" 2>/dev/null; then
         echo "SSH connection established"
         break
     fi
-    if [ $i -eq 30 ]; then
-        echo "ERROR: Could not establish SSH connection after 30 attempts"
+    if [ $i -eq 6 ]; then
+        echo "ERROR: SSH is up but login as ${SSH_USER} with ${SSH_KEY} failed after 6 attempts"
         exit 1
     fi
-    echo "Attempt $i/30 - waiting 10s..."
-    sleep 10
+    echo "Login attempt $i/6 failed - waiting 5s..."
+    sleep 5
 done
 
 # Copy tomcatastrophe.py to red-01
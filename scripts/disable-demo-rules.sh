@@ -17,7 +17,7 @@
 #
 # Prerequisites:
 #   - Terraform deployed (to get Kibana URL and credentials)
-#   - curl and jq installed
+#   - python3 and jq installed
 
 set -e
 
@@ -32,7 +32,7 @@ echo ""
 # Get credentials from Terraform
 cd "$TERRAFORM_DIR"
 
-echo "[1/4] Getting Kibana credentials from Terraform..."
+echo "[1/2] Getting Kibana credentials from Terraform..."
 KIBANA_URL=$(terraform output -json elastic_dev | jq -r '.kibana_url')
 PASSWORD=$(terraform output -raw elastic_dev_password)
 
@@ -56,72 +56,15 @@ RULE_NAMES=(
     "Sensitive Files Compression"
 )
 
-echo "[2/4] Searching for demo rules..."
+echo "[2/2] Disabling ${#RULE_NAMES[@]} demo rules..."
 echo ""
 
-# Get all rules (paginated)
-all_rules=$(curl -s -u "elastic:${PASSWORD}" \
-    "${KIBANA_URL}/api/detection_engine/rules/_find?per_page=10000" \
-    -H "kbn-xsrf: true" \
-    -H "Content-Type: application/json")
-
-total_rules=$(echo "$all_rules" | jq -r '.total // 0')
-echo "       Total rules in system: $total_rules"
-echo ""
-
-# Find rule IDs by name
-RULE_IDS=()
-for rule_name in "${RULE_NAMES[@]}"; do
-    rule_id=$(echo "$all_rules" | jq -r --arg name "$rule_name" '.data[] | select(.name == $name) | .id' 2>/dev/null | head -1)
-
-    if [ -n "$rule_id" ] && [ "$rule_id" != "null" ] && [ "$rule_id" != "" ]; then
-        echo "  ✓ Found: $rule_name"
-        RULE_IDS+=("$rule_id")
-    else
-        echo "  ✗ Not found: $rule_name"
-    fi
-done
-
-echo ""
-
-if [ ${#RULE_IDS[@]} -eq 0 ]; then
-    echo "ERROR: No matching rules found."
-    exit 1
-fi
-
-echo "[3/4] Disabling ${#RULE_IDS[@]} rules..."
-echo ""
-
-# Build the bulk disable request
-ids_json=$(printf '%s\n' "${RULE_IDS[@]}" | jq -R . | jq -s .)
-
-# Disable rules using bulk action API
-response=$(curl -s -u "elastic:${PASSWORD}" \
-    -X POST "${KIBANA_URL}/api/detection_engine/rules/_bulk_action" \
-    -H "kbn-xsrf: true" \
-    -H "Content-Type: application/json" \
-    -d "{
-        \"action\": \"disable\",
-        \"ids\": $ids_json
-    }")
-
-# Check result - try different response formats
-success_count=$(echo "$response" | jq -r '.attributes.summary.succeeded // empty' 2>/dev/null)
-if [ -z "$success_count" ]; then
-    # Try array length (older API format)
-    success_count=$(echo "$response" | jq -r 'if type == "array" then length else 0 end' 2>/dev/null)
-fi
-if [ -z "$success_count" ] || [ "$success_count" == "null" ]; then
-    success_count="${#RULE_IDS[@]}"
-fi
-
-failed_count=$(echo "$response" | jq -r '.attributes.summary.failed // 0' 2>/dev/null)
-
-echo "[4/4] Results:"
-echo ""
-echo "  ✓ Rules disabled: ${success_count}"
-if [ "$failed_count" != "0" ] && [ "$failed_count" != "null" ] && [ -n "$failed_count" ]; then
-    echo "  ✗ Rules failed: $failed_count"
+# One pooled connection: a single paged rule lookup (cached between runs),
+# then bulk disable requests
+if ! KIBANA_PASSWORD="$PASSWORD" python3 "${SCRIPT_DIR}/kibana_rules.py" --url "$KIBANA_URL" \
+    disable "${RULE_NAMES[@]}"; then
+    echo ""
+    echo "WARNING: Some rules could not be disabled (see above)"
 fi
 
 echo ""
@@ -0,0 +1,1287 @@
+#!/usr/bin/env python3
+"""ESQL Engine - Offline evaluation of the demo's ES|QL detection rules.
+
+Parses the subset of ES|QL used by the rules in demo-instructions/ and runs
+them against ECS documents on disk, so rule changes can be checked in
+milliseconds without a cluster.
+
+Supported syntax:
+    FROM <pattern>[, <pattern>...] [METADATA _id, _version, _index]
+    | WHERE <expr>         (==, !=, <, <=, >, >=, IN, LIKE, MV_CONTAINS,
+                            AND, OR, NOT, NOW() +/- N <unit>)
+    | KEEP <field>[, <field>...]
+
+Documents are loaded from JSON (single object or array) or NDJSON files and
+stored column by column; each predicate is applied to a whole column over the
+current selection of row indices.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+
+METADATA_FIELDS = ("_id", "_version", "_index")
+
+JSON_CHUNK_SIZE = 1024 * 1024  # Characters read per chunk by iter_json_values
+VALUE_DELIMITERS = " \t\r\n,]}"  # Characters that can end a bare JSON number or literal
+
+TIME_UNITS = {
+    "millisecond": timedelta(milliseconds=1),
+    "second": timedelta(seconds=1),
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+class EsqlError(ValueError):
+    """Raised when a query uses syntax outside the supported subset."""
+
+
+# =============================================================================
+# Query model
+# =============================================================================
+
+
+@dataclass(frozen=True)
+class TimeOffset:
+    """A ``NOW() +/- N <unit>`` expression, resolved at evaluation time."""
+
+    delta: timedelta
+
+    def resolve(self, now: datetime) -> float:
+        return (now + self.delta).timestamp()
+
+
+@dataclass(frozen=True)
+class Compare:
+    field: str
+    op: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class In:
+    field: str
+    values: tuple
+
+
+@dataclass(frozen=True)
+class Like:
+    field: str
+    pattern: str
+
+
+@dataclass(frozen=True)
+class LikeAny:
+    """Several substring LIKE patterns on one field, ORed together.
+
+    Produced by ``optimize`` from ``f LIKE "*a*" OR f LIKE "*b*" ...`` so the
+    field is scanned once regardless of how many patterns there are.
+    """
+
+    field: str
+    patterns: tuple
+    matcher: "MultiPatternMatcher" = field(compare=False, repr=False, default=None)
+
+
+@dataclass(frozen=True)
+class MvContains:
+    field: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    child: Any
+
+
+@dataclass
+class Query:
+    """A parsed ES|QL query."""
+
+    indices: list[str]
+    metadata: list[str] = field(default_factory=list)
+    filters: list[Any] = field(default_factory=list)
+    keep: list[str] | None = None
+
+
+@dataclass
+class Rule:
+    """A detection rule loaded from an .esql file."""
+
+    name: str
+    path: Path
+    query: Query
+
+
+# =============================================================================
+# Parsing
+# =============================================================================
+
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<op>==|!=|>=|<=|>|<|\(|\)|,|\+|-)
+  | (?P<ident>[A-Za-z_@][A-Za-z0-9_@.]*)
+    """,
+    re.VERBOSE,
+)
+
+
+def tokenize(text: str) -> list[tuple[str, Any]]:
+    """Split a WHERE expression into (kind, value) tokens."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            raise EsqlError(f"Unexpected character {text[pos]!r} at offset {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "ws":
+            continue
+        if kind == "string":
+            value = json.loads(value)
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "ident" and value.upper() in ("AND", "OR", "NOT", "IN", "LIKE", "NOW", "MV_CONTAINS", "TRUE", "FALSE", "NULL"):
+            kind, value = "keyword", value.upper()
+        tokens.append((kind, value))
+    return tokens
+
+
+class ExpressionParser:
+    """Recursive-descent parser for WHERE expressions."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse(self) -> Any:
+        expr = self._or()
+        if self.pos != len(self.tokens):
+            raise EsqlError(f"Unexpected token {self.tokens[self.pos][1]!r}")
+        return expr
+
+    def _peek(self) -> tuple[str, Any]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ("eof", None)
+
+    def _next(self) -> tuple[str, Any]:
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _accept(self, kind: str, value: Any = None) -> bool:
+        token_kind, token_value = self._peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: Any = None) -> Any:
+        token_kind, token_value = self._next()
+        if token_kind != kind or (value is not None and token_value != value):
+            raise EsqlError(f"Expected {value or kind}, found {token_value!r}")
+        return token_value
+
+    def _or(self) -> Any:
+        children = [self._and()]
+        while self._accept("keyword", "OR"):
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def _and(self) -> Any:
+        children = [self._not()]
+        while self._accept("keyword", "AND"):
+            children.append(self._not())
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def _not(self) -> Any:
+        if self._accept("keyword", "NOT"):
+            return Not(self._not())
+        return self._primary()
+
+    def _primary(self) -> Any:
+        if self._accept("op", "("):
+            expr = self._or()
+            self._expect("op", ")")
+            return expr
+
+        if self._accept("keyword", "MV_CONTAINS"):
+            self._expect("op", "(")
+            name = self._expect("ident")
+            self._expect("op", ",")
+            value = self._value()
+            self._expect("op", ")")
+            return MvContains(name, value)
+
+        name = self._expect("ident")
+        negate = self._accept("keyword", "NOT")
+
+        if self._accept("keyword", "IN"):
+            self._expect("op", "(")
+            values = [self._value()]
+            while self._accept("op", ","):
+                values.append(self._value())
+            self._expect("op", ")")
+            expr = In(name, tuple(values))
+        elif self._accept("keyword", "LIKE"):
+            expr = Like(name, self._expect("string"))
+        elif negate:
+            raise EsqlError(f"Expected IN or LIKE after NOT, found {self._peek()[1]!r}")
+        else:
+            kind, op = self._next()
+            if kind != "op" or op not in ("==", "!=", ">", ">=", "<", "<="):
+                raise EsqlError(f"Expected comparison operator after {name}, found {op!r}")
+            expr = Compare(name, op, self._value())
+
+        return Not(expr) if negate else expr
+
+    def _value(self) -> Any:
+        kind, value = self._next()
+        if kind in ("string", "number"):
+            return value
+        if kind == "keyword" and value in ("TRUE", "FALSE"):
+            return value == "TRUE"
+        if kind == "keyword" and value == "NULL":
+            return None
+        if kind == "keyword" and value == "NOW":
+            self._expect("op", "(")
+            self._expect("op", ")")
+            delta = timedelta(0)
+            while self._peek() in (("op", "+"), ("op", "-")):
+                sign = -1 if self._next()[1] == "-" else 1
+                amount = self._expect("number")
+                unit = self._expect("ident").lower().rstrip("s")
+                if unit not in TIME_UNITS:
+                    raise EsqlError(f"Unsupported time unit: {unit}")
+                delta += sign * amount * TIME_UNITS[unit]
+            return TimeOffset(delta)
+        raise EsqlError(f"Expected a literal value, found {value!r}")
+
+
+def split_commands(text: str) -> list[str]:
+    """Split a query on top-level pipes, ignoring pipes inside strings."""
+    commands = []
+    current = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            current.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            current.append(char)
+        elif char == "|":
+            commands.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    commands.append("".join(current).strip())
+    return [command for command in commands if command]
+
+
+def parse_query(text: str) -> Query:
+    """Parse an ES|QL query string into a Query."""
+    lines = [line for line in text.splitlines() if not line.strip().startswith("//")]
+    commands = split_commands("\n".join(lines))
+    if not commands:
+        raise EsqlError("Empty query")
+
+    source = commands[0]
+    match = re.match(r"FROM\s+(.+?)(?:\s+METADATA\s+(.+))?$", source, re.IGNORECASE | re.DOTALL)
+    if not match:
+        raise EsqlError(f"Query must start with FROM: {source!r}")
+    indices = [index.strip() for index in match.group(1).split(",") if index.strip()]
+    metadata = [name.strip() for name in (match.group(2) or "").split(",") if name.strip()]
+    query = Query(indices=indices, metadata=metadata)
+
+    for command in commands[1:]:
+        keyword, _, body = command.partition(" ")
+        keyword = keyword.upper()
+        if keyword == "WHERE":
+            query.filters.append(optimize(ExpressionParser(body).parse()))
+        elif keyword == "KEEP":
+            query.keep = [name.strip() for name in body.split(",") if name.strip()]
+        else:
+            raise EsqlError(f"Unsupported command: {keyword}")
+
+    return query
+
+
+def load_rule(path: str | Path) -> Rule:
+    """Load and parse a rule from an .esql file."""
+    path = Path(path)
+    return Rule(name=path.stem, path=path, query=parse_query(path.read_text()))
+
+
+# =============================================================================
+# Documents and columnar storage
+# =============================================================================
+
+
+def iter_documents(path: str | Path) -> Iterator[dict]:
+    """Yield documents from a JSON object, JSON array or NDJSON file."""
+    with open(path) as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if not stripped:
+        return
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+        return
+    if isinstance(data, list):
+        yield from data
+    else:
+        yield data
+
+
+def iter_json_values(stream: TextIO, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[object]:
+    """Yield the elements of a top-level JSON array, or a stream of JSON values.
+
+    Only one chunk plus the value being decoded is held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array = None
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        # Skip whitespace and array punctuation between values
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                char = buffer[pos]
+                if in_array is None:
+                    in_array = char == "["
+                    if in_array:
+                        pos += 1
+                        continue
+                if in_array and char == ",":
+                    pos += 1
+                    continue
+                if in_array and char == "]":
+                    return
+                break
+            if not fill():
+                return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        if (
+            not eof
+            and not isinstance(value, (dict, list, str))
+            and (end == len(buffer) or buffer[end] not in VALUE_DELIMITERS)
+        ):
+            # A bare number or literal may continue in the next chunk ("2" of "2.5")
+            if fill():
+                continue
+        pos = end
+        yield value
+
+
+def flatten(doc: dict, prefix: str = "", out: dict | None = None) -> dict:
+    """Flatten nested objects into dotted field names.
+
+    Documents that already use dotted keys (as in Discover exports) come
+    through unchanged.
+    """
+    if out is None:
+        out = {}
+    for key, value in doc.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flatten(value, f"{name}.", out)
+        else:
+            out[name] = value
+    return out
+
+
+def normalize_value(value: Any) -> Any:
+    """Collapse empty and single-element arrays the way doc values do."""
+    if isinstance(value, list):
+        if not value:
+            return None
+        if len(value) == 1:
+            return value[0]
+    return value
+
+
+def document_index(doc: dict) -> str | None:
+    """Work out the backing index name of a flattened document."""
+    if doc.get("_index"):
+        return doc["_index"]
+    parts = [doc.get(f"data_stream.{name}") for name in ("type", "dataset", "namespace")]
+    if all(parts):
+        return "-".join(parts)
+    return None
+
+
+def parse_timestamp(value: Any) -> float | None:
+    """Convert an ISO-8601 string or epoch milliseconds to epoch seconds."""
+    if value is None or isinstance(value, list):
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def document_row(doc: dict, source: str, row: int) -> dict:
+    """Flatten a document and add the metadata fields a table row carries."""
+    flat = flatten(doc)
+    flat.setdefault("_id", flat.get("event.id") or f"{source}#{row}")
+    flat.setdefault("_version", 1)
+    flat["_index"] = document_index(flat)
+    return flat
+
+
+class Table:
+    """Column-oriented store of flattened documents.
+
+    Each field maps to a list with one entry per row (None where the field is
+    missing). Parsed timestamp columns are cached on first use.
+
+    Columns may also be any indexable sequence, such as the memory-mapped
+    columns of columnar.py. Dictionary-encoded columns expose ``codes`` (one
+    integer per row, 0 for null), ``dictionary`` (code -> value) and
+    ``encode(values)`` (values -> set of codes), and equality and IN
+    predicates on them compare integer codes.
+    """
+
+    def __init__(self, columns: dict[str, list], row_count: int):
+        self.columns = columns
+        self.row_count = row_count
+        self._timestamps: dict[str, list] = {}
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[dict], source: str = "", fields: Iterable[str] | None = None) -> "Table":
+        """Build a table from documents, optionally keeping only ``fields``."""
+        wanted = set(fields) | set(METADATA_FIELDS) if fields is not None else None
+        columns: dict[str, list] = {}
+        row_count = 0
+        for row, doc in enumerate(docs):
+            for name, value in document_row(doc, source, row).items():
+                if wanted is not None and name not in wanted:
+                    continue
+                column = columns.setdefault(name, [])
+                if len(column) < row:
+                    column.extend([None] * (row - len(column)))
+                column.append(normalize_value(value))
+            row_count = row + 1
+        for column in columns.values():
+            column.extend([None] * (row_count - len(column)))
+        return cls(columns, row_count)
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str | Path], fields: Iterable[str] | None = None) -> "Table":
+        def docs() -> Iterator[dict]:
+            for path in paths:
+                yield from iter_documents(path)
+        return cls.from_documents(docs(), fields=fields)
+
+    def column(self, name: str) -> list:
+        column = self.columns.get(name)
+        if column is None:
+            return [None] * self.row_count
+        return column
+
+    def timestamp_column(self, name: str) -> list:
+        if name not in self._timestamps:
+            self._timestamps[name] = [parse_timestamp(value) for value in self.column(name)]
+        return self._timestamps[name]
+
+    def row(self, index: int, fields: Iterable[str]) -> dict:
+        return {name: self.column(name)[index] for name in fields}
+
+
+# =============================================================================
+# Evaluation
+# =============================================================================
+
+
+def like_tokens(pattern: str) -> list[str | None]:
+    """Split a LIKE pattern into tokens, resolving ``\\`` escapes.
+
+    Literal characters are returned as-is, ``None`` stands for ``*`` and
+    ``""`` for ``?``.
+    """
+    tokens: list[str | None] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            tokens.append(pattern[i + 1])
+            i += 2
+            continue
+        if char == "*":
+            tokens.append(None)
+        elif char == "?":
+            tokens.append("")
+        else:
+            tokens.append(char)
+        i += 1
+    return tokens
+
+
+def like_to_regex(pattern: str) -> re.Pattern:
+    """Translate an ES|QL LIKE pattern (``*``, ``?``, ``\\`` escapes) to a regex."""
+    parts = []
+    for token in like_tokens(pattern):
+        if token is None:
+            parts.append(".*")
+        elif token == "":
+            parts.append(".")
+        else:
+            parts.append(re.escape(token))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def like_literal(pattern: str) -> tuple[str, str] | None:
+    """Classify a LIKE pattern whose only wildcards are leading/trailing ``*``.
+
+    Returns ``(kind, literal)`` with kind one of ``exact``, ``prefix``,
+    ``suffix`` or ``contains``, or None if the pattern needs a regex.
+    """
+    tokens = like_tokens(pattern)
+    leading = bool(tokens) and tokens[0] is None
+    trailing = len(tokens) > 1 and tokens[-1] is None
+    inner = tokens[int(leading):len(tokens) - int(trailing)]
+    if any(token is None or token == "" for token in inner):
+        return None
+    literal = "".join(inner)
+    if leading and trailing:
+        return "contains", literal
+    if leading:
+        return "suffix", literal
+    if trailing:
+        return "prefix", literal
+    return "exact", literal
+
+
+def compile_like(pattern: str):
+    """Return a ``str -> bool`` predicate for a LIKE pattern.
+
+    Simple shapes map to C-level string methods; anything else falls back to
+    a compiled regex.
+    """
+    shape = like_literal(pattern)
+    if shape is None:
+        return like_to_regex(pattern).fullmatch
+    kind, literal = shape
+    if kind == "contains":
+        return lambda value: literal in value
+    if kind == "prefix":
+        return lambda value: value.startswith(literal)
+    if kind == "suffix":
+        return lambda value: value.endswith(literal)
+    return lambda value: value == literal
+
+
+class MultiPatternMatcher:
+    """Aho-Corasick matcher for a set of substring patterns.
+
+    ``search`` answers "does any pattern occur?" in one pass using a regex
+    alternation (run in C); ``matches`` walks the automaton once and returns
+    the IDs (indices into ``patterns``) of every pattern found, overlaps
+    included.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = tuple(patterns)
+        alternatives = sorted(set(self.patterns), key=len, reverse=True)
+        self._regex = re.compile("|".join(re.escape(pattern) for pattern in alternatives), re.DOTALL)
+
+        goto: list[dict[str, int]] = [{}]
+        output: list[list[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(pattern_id)
+
+        # Breadth-first pass to build failure links and merge outputs
+        fail = [0] * len(goto)
+        pending = list(goto[0].values())
+        while pending:
+            state = pending.pop(0)
+            for char, next_state in goto[state].items():
+                pending.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def search(self, text: str) -> bool:
+        return self._regex.search(text) is not None
+
+    def matches(self, text: str) -> list[int]:
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set(output[0])
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return sorted(found)
+
+
+def optimize(expr: Any) -> Any:
+    """Rewrite ORs of substring LIKEs on the same field into LikeAny nodes."""
+    if isinstance(expr, And):
+        return And(tuple(optimize(child) for child in expr.children))
+    if isinstance(expr, Not):
+        return Not(optimize(expr.child))
+    if not isinstance(expr, Or):
+        return expr
+
+    children = [optimize(child) for child in expr.children]
+    groups: dict[str, list[str]] = {}
+    rest = []
+    for child in children:
+        shape = like_literal(child.pattern) if isinstance(child, Like) else None
+        if shape is not None and shape[0] == "contains":
+            groups.setdefault(child.field, []).append(shape[1])
+        else:
+            rest.append(child)
+
+    merged = []
+    for name, literals in groups.items():
+        if len(literals) == 1:
+            merged.append(Like(name, f"*{literals[0]}*"))
+        else:
+            merged.append(LikeAny(name, tuple(literals), MultiPatternMatcher(literals)))
+    children = merged + rest
+    return children[0] if len(children) == 1 else Or(tuple(children))
+
+
+COMPARATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+def _scalar(value: Any) -> bool:
+    return value is not None and not isinstance(value, list)
+
+
+def _known(expr: Any) -> Callable[[Any], bool]:
+    """Return a test for field values on which ``expr`` is not null (unknown)."""
+    if isinstance(expr, Compare) and isinstance(expr.value, TimeOffset):
+        return lambda value: parse_timestamp(value) is not None
+    if isinstance(expr, (Like, LikeAny)):
+        return lambda value: isinstance(value, str)
+    if isinstance(expr, MvContains):
+        return lambda value: value is not None
+    return _scalar
+
+
+def select(expr: Any, table: Table, rows: list[int], now: datetime) -> list[int]:
+    """Return the subset of ``rows`` (in order) for which ``expr`` is true.
+
+    Multi-valued fields yield null in scalar comparisons, as in ES|QL, so they
+    only match through MV_CONTAINS. ``NOT`` keeps only the rows for which its
+    operand is false (see ``select_false``).
+    """
+    if not rows:
+        return rows
+
+    if isinstance(expr, And):
+        for child in expr.children:
+            rows = select(child, table, rows, now)
+            if not rows:
+                break
+        return rows
+
+    if isinstance(expr, Or):
+        matched: set[int] = set()
+        remaining = rows
+        for child in expr.children:
+            hits = select(child, table, remaining, now)
+            if hits:
+                matched.update(hits)
+                remaining = [row for row in remaining if row not in matched]
+            if not remaining:
+                break
+        return [row for row in rows if row in matched]
+
+    if isinstance(expr, Not):
+        return select_false(expr.child, table, rows, now)
+
+    if isinstance(expr, Compare):
+        compare = COMPARATORS[expr.op]
+        if isinstance(expr.value, TimeOffset):
+            column = table.timestamp_column(expr.field)
+            bound = expr.value.resolve(now)
+            return [row for row in rows if column[row] is not None and compare(column[row], bound)]
+        column = table.column(expr.field)
+        value = expr.value
+        codes = getattr(column, "codes", None)
+        if codes is not None and expr.op in ("==", "!="):
+            wanted = column.encode([value])
+            if expr.op == "==":
+                return [row for row in rows if codes[row] in wanted]
+            return [row for row in rows if codes[row] and codes[row] not in wanted]
+        if expr.op == "==":
+            return [row for row in rows if column[row] == value]
+        try:
+            return [row for row in rows if _scalar(column[row]) and compare(column[row], value)]
+        except TypeError:
+            return [
+                row for row in rows
+                if _scalar(column[row]) and type(column[row]) is type(value) and compare(column[row], value)
+            ]
+
+    if isinstance(expr, In):
+        column = table.column(expr.field)
+        codes = getattr(column, "codes", None)
+        if codes is not None:
+            wanted = column.encode(expr.values)
+            return [row for row in rows if codes[row] in wanted]
+        values = set(expr.values)
+        return [row for row in rows if _scalar(column[row]) and column[row] in values]
+
+    if isinstance(expr, Like):
+        column = table.column(expr.field)
+        matcher = compile_like(expr.pattern)
+        return [row for row in rows if isinstance(column[row], str) and matcher(column[row])]
+
+    if isinstance(expr, LikeAny):
+        column = table.column(expr.field)
+        search = expr.matcher.search
+        return [row for row in rows if isinstance(column[row], str) and search(column[row])]
+
+    if isinstance(expr, MvContains):
+        column = table.column(expr.field)
+        value = expr.value
+        return [
+            row for row in rows
+            if column[row] == value or (isinstance(column[row], list) and value in column[row])
+        ]
+
+    raise EsqlError(f"Cannot evaluate expression: {expr!r}")
+
+
+def select_false(expr: Any, table: Table, rows: list[int], now: datetime) -> list[int]:
+    """Return the subset of ``rows`` (in order) for which ``expr`` is false.
+
+    ES|QL logic is three-valued: a comparison on a null field is null, not
+    false, and so is ``NOT`` of it. Rows where ``expr`` is null are therefore
+    in neither ``select`` nor ``select_false``.
+    """
+    if not rows:
+        return rows
+
+    if isinstance(expr, Or):
+        for child in expr.children:
+            rows = select_false(child, table, rows, now)
+            if not rows:
+                break
+        return rows
+
+    if isinstance(expr, And):
+        matched: set[int] = set()
+        remaining = rows
+        for child in expr.children:
+            hits = select_false(child, table, remaining, now)
+            if hits:
+                matched.update(hits)
+                remaining = [row for row in remaining if row not in matched]
+            if not remaining:
+                break
+        return [row for row in rows if row in matched]
+
+    if isinstance(expr, Not):
+        return select(expr.child, table, rows, now)
+
+    hits = set(select(expr, table, rows, now))
+    if isinstance(expr, Compare) and isinstance(expr.value, TimeOffset):
+        column = table.timestamp_column(expr.field)
+        return [row for row in rows if row not in hits and column[row] is not None]
+    column = table.column(expr.field)
+    known = _known(expr)
+    return [row for row in rows if row not in hits and known(column[row])]
+
+
+def compile_predicate(expr: Any) -> Callable[[dict, float], bool]:
+    """Compile a WHERE expression into a ``(row, now) -> bool`` function.
+
+    The row-at-a-time counterpart of ``select`` for streaming use: ``row`` is
+    a flattened, normalized document and ``now`` is epoch seconds. Null and
+    multi-valued handling matches ``select``, including ``NOT`` of null.
+    """
+    if isinstance(expr, And):
+        children = [compile_predicate(child) for child in expr.children]
+        return lambda row, now: all(child(row, now) for child in children)
+
+    if isinstance(expr, Or):
+        children = [compile_predicate(child) for child in expr.children]
+        return lambda row, now: any(child(row, now) for child in children)
+
+    if isinstance(expr, Not):
+        return compile_false(expr.child)
+
+    name = expr.field
+
+    if isinstance(expr, Compare):
+        compare = COMPARATORS[expr.op]
+        value = expr.value
+        if isinstance(value, TimeOffset):
+            offset = value.delta.total_seconds()
+
+            def time_predicate(row: dict, now: float) -> bool:
+                stamp = parse_timestamp(row.get(name))
+                return stamp is not None and compare(stamp, now + offset)
+
+            return time_predicate
+        if expr.op == "==":
+            return lambda row, now: row.get(name) == value
+
+        def compare_predicate(row: dict, now: float) -> bool:
+            current = row.get(name)
+            if not _scalar(current):
+                return False
+            try:
+                return compare(current, value)
+            except TypeError:
+                return type(current) is type(value) and compare(current, value)
+
+        return compare_predicate
+
+    if isinstance(expr, In):
+        values = set(expr.values)
+        return lambda row, now: _scalar(row.get(name)) and row[name] in values
+
+    if isinstance(expr, (Like, LikeAny)):
+        matcher = compile_like(expr.pattern) if isinstance(expr, Like) else expr.matcher.search
+        return lambda row, now: isinstance(row.get(name), str) and matcher(row[name])
+
+    if isinstance(expr, MvContains):
+        value = expr.value
+
+        def contains_predicate(row: dict, now: float) -> bool:
+            current = row.get(name)
+            return current == value or (isinstance(current, list) and value in current)
+
+        return contains_predicate
+
+    raise EsqlError(f"Cannot evaluate expression: {expr!r}")
+
+
+def compile_false(expr: Any) -> Callable[[dict, float], bool]:
+    """Compile a ``(row, now) -> bool`` test for ``expr`` being false, not null."""
+    if isinstance(expr, And):
+        children = [compile_false(child) for child in expr.children]
+        return lambda row, now: any(child(row, now) for child in children)
+
+    if isinstance(expr, Or):
+        children = [compile_false(child) for child in expr.children]
+        return lambda row, now: all(child(row, now) for child in children)
+
+    if isinstance(expr, Not):
+        return compile_predicate(expr.child)
+
+    name = expr.field
+    test = compile_predicate(expr)
+    known = _known(expr)
+    return lambda row, now: known(row.get(name)) and not test(row, now)
+
+
+def compile_query(query: Query) -> Callable[[dict, float], bool]:
+    """Compile a query's FROM and WHERE stages into one row predicate.
+
+    Index patterns are matched once per distinct index name.
+    """
+    filters = [compile_predicate(expr) for expr in query.filters]
+    allowed: dict[str | None, bool] = {None: True}
+
+    def predicate(row: dict, now: float) -> bool:
+        index = row.get("_index")
+        ok = allowed.get(index)
+        if ok is None:
+            ok = allowed[index] = any(fnmatch.fnmatchcase(index, pattern) for pattern in query.indices)
+        return ok and all(check(row, now) for check in filters)
+
+    return predicate
+
+
+def expression_fields(expr: Any) -> set[str]:
+    """Return the field names referenced by a WHERE expression."""
+    if isinstance(expr, (And, Or)):
+        return set().union(*(expression_fields(child) for child in expr.children))
+    if isinstance(expr, Not):
+        return expression_fields(expr.child)
+    return {expr.field}
+
+
+def query_fields(query: Query) -> set[str] | None:
+    """Return every field a query reads, or None if it needs all of them."""
+    if query.keep is None:
+        return None
+    fields = set(query.keep)
+    for expr in query.filters:
+        fields |= expression_fields(expr)
+    return fields
+
+
+def without_time_window(query: Query) -> Query:
+    """Return a copy of ``query`` without its top-level ``NOW()`` comparisons.
+
+    Used to evaluate a rule's logic against recorded data regardless of when
+    the events happened.
+    """
+
+    def strip(expr: Any) -> Any:
+        if isinstance(expr, Compare) and isinstance(expr.value, TimeOffset):
+            return None
+        if isinstance(expr, And):
+            children = tuple(child for child in map(strip, expr.children) if child is not None)
+            if not children:
+                return None
+            return children[0] if len(children) == 1 else And(children)
+        return expr
+
+    filters = [expr for expr in map(strip, query.filters) if expr is not None]
+    return Query(query.indices, query.metadata, filters, query.keep)
+
+
+def index_rows(indices: Iterable[str], table: Table) -> list[int]:
+    """Return the rows whose index matches any of the FROM patterns."""
+    indices = list(indices)
+    index_column = table.column("_index")
+    dictionary = getattr(index_column, "dictionary", None)
+    if dictionary is not None:
+        # Dictionary-encoded: match each dictionary entry, then compare codes
+        allowed = {
+            code for code, name in enumerate(dictionary)
+            if name is None or any(fnmatch.fnmatchcase(name, pattern) for pattern in indices)
+        }
+        if len(allowed) == len(dictionary):
+            rows = list(range(table.row_count))
+        else:
+            codes = index_column.codes
+            rows = [row for row in range(table.row_count) if codes[row] in allowed]
+    else:
+        # Match each distinct index name against the patterns once
+        distinct = set(index_column)
+        allowed = {
+            name for name in distinct
+            if name is None or any(fnmatch.fnmatchcase(name, pattern) for pattern in indices)
+        }
+        if len(allowed) == len(distinct):
+            rows = list(range(table.row_count))
+        else:
+            rows = [row for row in range(table.row_count) if index_column[row] in allowed]
+    return rows
+
+
+def matching_rows(query: Query, table: Table, now: datetime | None = None) -> list[int]:
+    """Return the row indices that pass the query's FROM and WHERE stages."""
+    now = now or datetime.now(timezone.utc)
+    rows = index_rows(query.indices, table)
+    for expr in query.filters:
+        rows = select(expr, table, rows, now)
+    return rows
+
+
+def multi_pattern_nodes(expr: Any) -> list[LikeAny]:
+    """Return the LikeAny nodes inside an expression."""
+    if isinstance(expr, LikeAny):
+        return [expr]
+    if isinstance(expr, (And, Or)):
+        return [node for child in expr.children for node in multi_pattern_nodes(child)]
+    if isinstance(expr, Not):
+        return multi_pattern_nodes(expr.child)
+    return []
+
+
+def evaluate(query: Query, table: Table, now: datetime | None = None) -> list[dict]:
+    """Run a query against a table and return the projected result rows.
+
+    When the query contains merged substring patterns, each row also carries
+    ``_matched_patterns`` listing the patterns found, for alert context.
+    """
+    return project(query, table, matching_rows(query, table, now))
+
+
+def project(query: Query, table: Table, rows: list[int]) -> list[dict]:
+    """Apply a query's KEEP stage to matched rows."""
+    fields = query.keep or sorted(name for name in table.columns if name not in METADATA_FIELDS)
+    results = [table.row(row, fields) for row in rows]
+
+    nodes = [node for expr in query.filters for node in multi_pattern_nodes(expr)]
+    if nodes:
+        for row, result in zip(rows, results):
+            matched = []
+            for node in nodes:
+                value = table.column(node.field)[row]
+                if isinstance(value, str):
+                    matched.extend(node.patterns[i] for i in node.matcher.matches(value))
+            result["_matched_patterns"] = matched
+    return results
+
+
+def conjuncts(expr: Any) -> list[Any]:
+    """Split an expression into its top-level AND terms."""
+    if isinstance(expr, And):
+        return [term for child in expr.children for term in conjuncts(child)]
+    return [expr]
+
+
+@dataclass
+class _PlanNode:
+    children: dict[Any, "_PlanNode"] = field(default_factory=dict)
+    queries: list[int] = field(default_factory=list)
+
+
+class RulePlan:
+    """Evaluates a set of queries in a single pass with shared work.
+
+    Each query's WHERE stages are split into AND terms. Terms used by several
+    queries are ordered first, and the queries are merged into a prefix tree
+    keyed by FROM patterns and then by term. Each tree node narrows the row
+    selection of its parent once, so a FROM scan or predicate shared by
+    several rules is evaluated once for all of them. Every query's matches
+    are then routed to its own KEEP projection.
+    """
+
+    def __init__(self, queries: Iterable[Query]):
+        self.queries = list(queries)
+        terms = [list(dict.fromkeys(term for expr in query.filters for term in conjuncts(expr))) for query in self.queries]
+
+        uses: dict[Any, int] = {}
+        order: dict[Any, int] = {}
+        for query_terms in terms:
+            for term in query_terms:
+                uses[term] = uses.get(term, 0) + 1
+                order.setdefault(term, len(order))
+
+        self.roots: dict[tuple, _PlanNode] = {}
+        self.naive_steps = 0
+        self.steps = 0
+        for index, (query, query_terms) in enumerate(zip(self.queries, terms)):
+            node = self.roots.get(tuple(query.indices))
+            if node is None:
+                node = self.roots[tuple(query.indices)] = _PlanNode()
+                self.steps += 1
+            for term in sorted(query_terms, key=lambda term: (-uses[term], order[term])):
+                child = node.children.get(term)
+                if child is None:
+                    child = node.children[term] = _PlanNode()
+                    self.steps += 1
+                node = child
+            node.queries.append(index)
+            self.naive_steps += 1 + len(query_terms)
+
+    def fields(self) -> set[str] | None:
+        """Return every field the queries read, or None if any needs all of them."""
+        fields: set[str] | None = set()
+        for query in self.queries:
+            needed = query_fields(query)
+            fields = None if needed is None or fields is None else fields | needed
+        return fields
+
+    def matching_rows(self, table: Table, now: datetime | None = None) -> list[list[int]]:
+        """Return each query's matching rows, in query order."""
+        now = now or datetime.now(timezone.utc)
+        results: list[list[int]] = [[] for _ in self.queries]
+
+        def walk(node: _PlanNode, rows: list[int]) -> None:
+            for index in node.queries:
+                results[index] = rows
+            for term, child in node.children.items():
+                walk(child, select(term, table, rows, now))
+
+        for indices, root in self.roots.items():
+            walk(root, index_rows(indices, table))
+        return results
+
+    def evaluate(self, table: Table, now: datetime | None = None) -> list[list[dict]]:
+        """Return each query's projected result rows, in query order."""
+        return [
+            project(query, table, rows)
+            for query, rows in zip(self.queries, self.matching_rows(table, now))
+        ]
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Evaluate ES|QL detection rules against local ECS documents",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s -r demo-instructions/tomcat-webshell-rule-query.esql data/test-data/*.json
+  %(prog)s -r demo-instructions/new-rules/shadow-file-read.esql events.ndjson --now 2025-11-10T15:36:00Z
+  %(prog)s -r demo-instructions/tomcat-webshell-rule-query.esql corpus.col
+""",
+    )
+
+    parser.add_argument(
+        "data",
+        nargs="+",
+        metavar="FILE",
+        help="ECS documents as JSON or NDJSON, or one corpus directory from columnar.py",
+    )
+
+    parser.add_argument(
+        "-r", "--rule",
+        action="append",
+        required=True,
+        metavar="ESQL",
+        help="Rule file to evaluate (repeatable)",
+    )
+
+    parser.add_argument(
+        "--now",
+        type=str,
+        metavar="ISO8601",
+        help="Value of NOW() for time-windowed rules (default: current time)",
+    )
+
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print matches as NDJSON instead of a summary",
+    )
+
+    return parser.parse_args()
+
+
+def parse_now(value: str | None) -> datetime:
+    """Parse the --now argument, defaulting to the current UTC time."""
+    if not value:
+        return datetime.now(timezone.utc)
+    return datetime.fromtimestamp(parse_timestamp(value), timezone.utc)
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+    now = parse_now(args.now)
+
+    try:
+        rules = [load_rule(path) for path in args.rule]
+    except EsqlError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    plan = RulePlan(rule.query for rule in rules)
+    fields = plan.fields()
+
+    start = time.perf_counter()
+    if any(os.path.isdir(path) for path in args.data):
+        if len(args.data) > 1:
+            print("ERROR: A columnar corpus directory cannot be combined with other inputs", file=sys.stderr)
+            return 1
+        from columnar import open_table
+
+        table = open_table(args.data[0])
+    else:
+        table = Table.from_files(args.data, fields=fields)
+    load_ms = (time.perf_counter() - start) * 1000
+    if not args.json:
+        print(f"Loaded {table.row_count} documents in {load_ms:.1f} ms")
+
+    start = time.perf_counter()
+    rule_results = plan.evaluate(table, now)
+    eval_ms = (time.perf_counter() - start) * 1000
+    if not args.json:
+        print(
+            f"Evaluated {len(rules)} rule(s) in one pass in {eval_ms:.2f} ms "
+            f"({plan.steps} of {plan.naive_steps} scan/predicate steps after sharing)"
+        )
+
+    for rule, results in zip(rules, rule_results):
+        if args.json:
+            for result in results:
+                print(json.dumps({"rule": rule.name, **result}, default=str))
+            continue
+        print(f"{rule.name}: {len(results)} match(es)")
+        for result in results:
+            print(f"  {json.dumps(result, default=str)}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Evaluate Rules - Measure rule accuracy against labeled corpora.
+
+Every event in the test data (and in generate_events.py output) carries
+labels saying whether a rule is expected to fire on it:
+
+    labels.detection_expected_result   true_positive | true_negative
+    labels.detection_rule              rule the label refers to ("none" for benign)
+
+An event is an expected positive for a rule when it is labeled
+true_positive for that rule, and an expected negative for every other rule.
+Events without labels are skipped.
+
+NDJSON inputs are cut into byte-range shards that are parsed and evaluated
+in parallel worker processes, one shard at a time per worker, so throughput
+scales with cores and memory stays bounded by shard size. Per-rule confusion
+matrices, precision/recall and the IDs of misclassified events are merged
+at the end. Rule windows (``@timestamp > NOW() - 5 minutes``) are ignored
+unless --now is given, so the rule logic is judged regardless of when the
+corpus was recorded.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from esql_engine import (
+    Rule,
+    RulePlan,
+    Table,
+    iter_documents,
+    load_rule,
+    parse_now,
+    without_time_window,
+)
+
+
+DEFAULT_RULES_DIR = Path(__file__).resolve().parent.parent / "demo-instructions"
+
+# Label names that differ from the rule's file name
+RULE_ALIASES = {"tomcat-webshell-detection": "tomcat-webshell-rule-query"}
+
+LABEL_FIELDS = {"labels.detection_expected_result", "labels.detection_rule", "event.id", "process.entity_id"}
+
+# Per-process state, set up once by init_worker
+_rules: list[Rule] = []
+_plan: RulePlan | None = None
+_fields: set[str] | None = None
+_now: datetime | None = None
+_aliases: dict[str, str] = {}
+_max_ids = 0
+
+
+def init_worker(rule_paths: list[str], now: str | None, aliases: dict[str, str], max_ids: int) -> None:
+    """Load and prepare the rules in a worker process."""
+    global _rules, _plan, _fields, _now, _aliases, _max_ids
+    _rules = [load_rule(path) for path in rule_paths]
+    if now is None:
+        _rules = [Rule(rule.name, rule.path, without_time_window(rule.query)) for rule in _rules]
+    _plan = RulePlan(rule.query for rule in _rules)
+    _now = parse_now(now)
+    _aliases = aliases
+    _max_ids = max_ids
+    needed = _plan.fields()
+    _fields = None if needed is None else needed | LABEL_FIELDS
+
+
+def plan_shards(path: str, shard_bytes: int) -> list[tuple[str, int, int]]:
+    """Split a file into (path, start, end) byte ranges.
+
+    Only NDJSON files are split; a JSON array or pretty-printed document is a
+    single shard with end == -1.
+    """
+    with open(path, "rb") as f:
+        first = f.readline().strip()
+    try:
+        ndjson = first.startswith(b"{") and isinstance(json.loads(first), dict)
+    except json.JSONDecodeError:
+        ndjson = False
+    if not ndjson:
+        return [(path, 0, -1)]
+    size = os.path.getsize(path)
+    return [(path, start, min(start + shard_bytes, size)) for start in range(0, size, shard_bytes)]
+
+
+def iter_shard(path: str, start: int, end: int) -> Iterator[dict]:
+    """Yield the documents whose line starts inside [start, end)."""
+    if end < 0:
+        yield from iter_documents(path)
+        return
+    name = os.path.basename(path)
+    with open(path, "rb") as f:
+        if start:
+            # Skip the line that straddles the boundary; the previous shard owns it
+            f.seek(start - 1)
+            f.readline()
+        while True:
+            offset = f.tell()
+            if offset >= end:
+                return
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            if "_id" not in doc and not (doc.get("event") or {}).get("id"):
+                doc["_id"] = f"{name}@{offset}"
+            yield doc
+
+
+def evaluate_shard(shard: tuple[str, int, int]) -> dict:
+    """Evaluate every rule on one shard and return its partial counts."""
+    path, start, end = shard
+    table = Table.from_documents(iter_shard(path, start, end), source=os.path.basename(path), fields=_fields)
+    results = table.column("labels.detection_expected_result")
+    labels = [_aliases.get(rule, rule) for rule in table.column("labels.detection_rule")]
+    ids = table.column("_id")
+    labeled = [row for row in range(table.row_count) if results[row] is not None]
+
+    counts = {}
+    for rule, rows in zip(_rules, _plan.matching_rows(table, _now)):
+        matched = set(rows)
+        stats = {"tp": 0, "fp": 0, "fn": 0, "tn": 0, "fp_ids": [], "fn_ids": []}
+        for row in labeled:
+            expected = results[row] == "true_positive" and labels[row] == rule.name
+            if row in matched:
+                outcome = "tp" if expected else "fp"
+            else:
+                outcome = "fn" if expected else "tn"
+            stats[outcome] += 1
+            if outcome in ("fp", "fn") and len(stats[f"{outcome}_ids"]) < _max_ids:
+                stats[f"{outcome}_ids"].append(ids[row])
+        counts[rule.name] = stats
+    return {"events": table.row_count, "labeled": len(labeled), "rules": counts}
+
+
+def merge(partials: list[dict], max_ids: int) -> dict:
+    """Combine shard results into per-rule totals with precision and recall."""
+    events = sum(partial["events"] for partial in partials)
+    labeled = sum(partial["labeled"] for partial in partials)
+    rules: dict[str, dict] = {}
+    for partial in partials:
+        for name, stats in partial["rules"].items():
+            total = rules.setdefault(name, {"tp": 0, "fp": 0, "fn": 0, "tn": 0, "fp_ids": [], "fn_ids": []})
+            for key in ("tp", "fp", "fn", "tn"):
+                total[key] += stats[key]
+            for key in ("fp_ids", "fn_ids"):
+                total[key].extend(stats[key][: max_ids - len(total[key])])
+
+    for stats in rules.values():
+        tp, fp, fn = stats["tp"], stats["fp"], stats["fn"]
+        stats["precision"] = round(tp / (tp + fp), 4) if tp + fp else None
+        stats["recall"] = round(tp / (tp + fn), 4) if tp + fn else None
+        precision, recall = stats["precision"], stats["recall"]
+        stats["f1"] = round(2 * precision * recall / (precision + recall), 4) if precision and recall else None
+    return {"events": events, "labeled": labeled, "rules": rules}
+
+
+def print_report(report: dict, elapsed: float) -> None:
+    """Print per-rule confusion matrices and misclassified IDs."""
+    rate = report["events"] / elapsed if elapsed > 0 else 0
+    print(f"Events: {report['events']:,} ({report['labeled']:,} labeled) in {elapsed:.1f}s ({rate:,.0f} events/s)")
+    print()
+    print(f"{'Rule':<32} {'TP':>9} {'FP':>9} {'FN':>9} {'TN':>11} {'Precision':>10} {'Recall':>8} {'F1':>8}")
+
+    def fmt(value: float | None) -> str:
+        return "-" if value is None else f"{value:.4f}"
+
+    for name, stats in sorted(report["rules"].items()):
+        print(
+            f"{name[:32]:<32} {stats['tp']:>9,} {stats['fp']:>9,} {stats['fn']:>9,} {stats['tn']:>11,} "
+            f"{fmt(stats['precision']):>10} {fmt(stats['recall']):>8} {fmt(stats['f1']):>8}"
+        )
+    for name, stats in sorted(report["rules"].items()):
+        for kind, label in (("fp", "False positives"), ("fn", "False negatives")):
+            if stats[kind]:
+                shown = stats[f"{kind}_ids"]
+                more = f" (first {len(shown)})" if len(shown) < stats[kind] else ""
+                print()
+                print(f"{name} - {label}{more}:")
+                for event_id in shown:
+                    print(f"  {event_id}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Measure detection-rule accuracy against labeled ECS corpora",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s data/test-data/*.json
+  %(prog)s corpus.ndjson --workers 16 -o accuracy.json
+  %(prog)s -r demo-instructions/new-rules/shadow-file-read.esql corpus.ndjson
+""",
+    )
+
+    parser.add_argument("files", nargs="+", metavar="FILE", help="Labeled NDJSON or JSON files")
+    parser.add_argument(
+        "-r", "--rule",
+        action="append",
+        metavar="ESQL",
+        help="Rule file to evaluate (repeatable; default: all .esql under demo-instructions/)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--shard-mb", type=float, default=32.0, help="NDJSON shard size in MB (default: 32)")
+    parser.add_argument("--now", help="Apply rule time windows relative to this ISO-8601 time (default: ignore windows)")
+    parser.add_argument(
+        "--alias",
+        action="append",
+        default=[],
+        metavar="LABEL=RULE",
+        help="Map a labels.detection_rule value to a rule file name (repeatable)",
+    )
+    parser.add_argument("--max-ids", type=int, default=50, help="Misclassified IDs kept per rule and kind (default: 50)")
+    parser.add_argument("-o", "--output", metavar="FILE", help="Write the JSON report to FILE")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    rule_paths = args.rule or sorted(str(path) for path in DEFAULT_RULES_DIR.rglob("*.esql"))
+    aliases = dict(RULE_ALIASES)
+    for item in args.alias:
+        label, sep, rule = item.partition("=")
+        if not sep:
+            print(f"ERROR: --alias expects LABEL=RULE, got {item!r}", file=sys.stderr)
+            return 1
+        aliases[label] = rule
+
+    shard_bytes = max(1, int(args.shard_mb * 1024 * 1024))
+    shards = [shard for path in args.files for shard in plan_shards(path, shard_bytes)]
+
+    start = time.perf_counter()
+    init_args = (rule_paths, args.now, aliases, args.max_ids)
+    workers = max(1, min(args.workers, len(shards)))
+    if workers == 1:
+        init_worker(*init_args)
+        partials = [evaluate_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=init_args) as executor:
+            partials = list(executor.map(evaluate_shard, shards))
+    report = merge(partials, args.max_ids)
+    elapsed = time.perf_counter() - start
+
+    print_report(report, elapsed)
+    if args.output:
+        report.update({"elapsed_s": round(elapsed, 3), "shards": len(shards), "workers": workers})
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print()
+        print(f"Report written to {args.output}")
+
+    misclassified = sum(stats["fp"] + stats["fn"] for stats in report["rules"].values())
+    return 1 if misclassified else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Generate Events - Synthetic ECS process events for load-testing the rules.
+
+Streams NDJSON modelled on data/test-data/true-positive.json and
+true-negative.json: Elastic Defend process start events with a parent
+process, host, user and detection labels. Benign activity is mixed with
+injected attack chains matching the tomcatastrophe demo:
+
+    webshell  java (Tomcat) -> bash -c <discovery command>
+    shadow    java -> bash -c "sudo cat /etc/shadow" -> sudo -> cat
+    tar       java -> bash -c "sudo tar -czf ..."    -> sudo -> tar
+
+Events are built a batch at a time: every random column (host, process,
+parent, pid, inter-arrival time) is drawn for the whole batch up front, and
+each event is assembled from JSON fragments that were serialized once at
+start-up. The same seed always produces byte-identical output.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TextIO
+
+
+ATTACK_CHAINS = ("webshell", "shadow", "tar")
+CHAIN_LENGTHS = {"webshell": 1, "shadow": 3, "tar": 3}  # Events per chain, as built by _chain
+
+BENIGN_LABELS = {"detection_expected_result": "true_negative", "detection_rule": "none"}
+
+TOMCAT_ARGS = [
+    "/usr/lib/jvm/java-11-openjdk-amd64/bin/java",
+    "-Djava.util.logging.config.file=/opt/tomcat/conf/logging.properties",
+    "-Djava.util.logging.manager=org.apache.juli.ClassLoaderLogManager",
+    "-classpath",
+    "/opt/tomcat/bin/bootstrap.jar:/opt/tomcat/bin/tomcat-juli.jar",
+    "-Dcatalina.base=/opt/tomcat",
+    "-Dcatalina.home=/opt/tomcat",
+    "-Djava.io.tmpdir=/opt/tomcat/temp",
+    "org.apache.catalina.startup.Bootstrap",
+    "start",
+]
+
+ELASTICSEARCH_ARGS = [
+    "/usr/share/elasticsearch/jdk/bin/java",
+    "-Xms4g",
+    "-Xmx4g",
+    "-XX:+UseG1GC",
+    "-Des.path.home=/usr/share/elasticsearch",
+    "-Des.path.conf=/etc/elasticsearch",
+    "-cp",
+    "/usr/share/elasticsearch/lib/*",
+    "org.elasticsearch.bootstrap.Elasticsearch",
+]
+
+# (args, executable, user, parent kind) - parent kind is "shell", "tomcat" or "es"
+BENIGN_PROCESSES = [
+    (["ls", "-la", "/var/log"], "/usr/bin/ls", "ubuntu", "shell"),
+    (["ls", "-la", "/opt/elasticsearch/logs"], "/usr/bin/ls", "ubuntu", "es"),
+    (["ps", "aux"], "/usr/bin/ps", "ubuntu", "shell"),
+    (["grep", "-r", "ERROR", "/var/log/syslog"], "/usr/bin/grep", "ubuntu", "shell"),
+    (["cat", "/etc/hostname"], "/usr/bin/cat", "ubuntu", "shell"),
+    (["cat", "/etc/passwd"], "/usr/bin/cat", "ubuntu", "shell"),
+    (["tail", "-n", "100", "/opt/tomcat/logs/catalina.out"], "/usr/bin/tail", "tomcat", "shell"),
+    (["tar", "-czf", "/backup/www.tar.gz", "/var/www/html"], "/usr/bin/tar", "root", "shell"),
+    (["gzip", "-9", "/var/log/syslog.1"], "/usr/bin/gzip", "root", "shell"),
+    (["df", "-h"], "/usr/bin/df", "ubuntu", "shell"),
+    (["uptime"], "/usr/bin/uptime", "ubuntu", "shell"),
+    (["systemctl", "status", "tomcat"], "/usr/bin/systemctl", "root", "shell"),
+    (["curl", "-s", "http://localhost:8080/health"], "/usr/bin/curl", "ubuntu", "shell"),
+    (["git", "pull", "--ff-only"], "/usr/bin/git", "ubuntu", "shell"),
+    (["python3", "/opt/app/report.py"], "/usr/bin/python3", "ubuntu", "shell"),
+    (["/usr/bin/convert", "/opt/tomcat/temp/upload.png", "-resize", "50%", "/opt/tomcat/temp/thumb.png"], "/usr/bin/convert", "tomcat", "tomcat"),
+    (["sed", "-n", "1,20p", "/etc/hosts"], "/usr/bin/sed", "ubuntu", "shell"),
+]
+
+DISCOVERY_COMMANDS = ["whoami", "id", "uname -a", "hostname", "cat /etc/passwd | grep -v nologin"]
+TAR_COMMAND = "sudo tar -czf /tmp/loot.tar.gz /etc/shadow /etc/passwd /home/ubuntu/.ssh/authorized_keys /home/ubuntu/.bash_history"
+
+USERS = {"root": "0", "ubuntu": "1000", "tomcat": "1001", "elasticsearch": "112"}
+
+
+@dataclass
+class GeneratorConfig:
+    """Configuration for a synthetic event corpus."""
+
+    count: int = 100_000
+    hosts: int = 10
+    tree_depth: int = 4  # systemd -> sshd -> (tree_depth - 2) nested shells
+    malicious_ratio: float = 0.01  # Fraction of events that belong to attack chains
+    chains: tuple[str, ...] = ATTACK_CHAINS
+    seed: int = 2025
+    start: str = "2025-11-10T15:00:00Z"
+    events_per_second: float = 1000.0  # Simulated event rate, for timestamps
+    batch_size: int = 10_000
+
+
+def _json(value: object) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _process_fragment(args: list[str], executable: str) -> str:
+    """Serialize the static part of a process object once."""
+    return (
+        f'"args":{_json(args)},"args_count":{len(args)},'
+        f'"command_line":{_json(" ".join(args))},"executable":{_json(executable)},'
+        f'"name":{_json(executable.rsplit("/", 1)[-1])}'
+    )
+
+
+def _user_fragment(name: str) -> str:
+    return f'"user":{{"id":{_json(USERS[name])},"name":{_json(name)}}}'
+
+
+class EventGenerator:
+    """Builds NDJSON batches of synthetic process events."""
+
+    def __init__(self, config: GeneratorConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.sequence = 0
+        self.clock_ms = self._parse_start(config.start)
+        self._second_cache: dict[int, str] = {}
+        self._chain_carry = 0.0  # Attack events owed to the malicious ratio
+        self._chain_serial = 0
+        self._next_chain = self.rng.choice(config.chains) if config.chains else None
+
+        self.hosts = [self._build_host(index) for index in range(config.hosts)]
+        self.benign = [
+            (_process_fragment(args, executable), _user_fragment(user), kind)
+            for args, executable, user, kind in BENIGN_PROCESSES
+        ]
+        self.benign_labels = f'"labels":{_json(BENIGN_LABELS)}'
+
+    @staticmethod
+    def _parse_start(value: str) -> int:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp() * 1000)
+
+    def _entity_id(self, kind: str, host: int, serial: int) -> str:
+        return f"{kind}-{self.config.seed:x}-{host:x}-{serial:x}"
+
+    def _parent(self, host: int, serial: int, args: list[str], user: str, pid: int) -> dict:
+        return {
+            "args": args,
+            "args_count": len(args),
+            "command_line": " ".join(args),
+            "entity_id": self._entity_id("p", host, serial),
+            "executable": args[0] if args[0].startswith("/") else f"/usr/bin/{args[0].lstrip('-')}",
+            "name": args[0].rsplit("/", 1)[-1].lstrip("-"),
+            "pid": pid,
+            "user": {"id": USERS[user], "name": user},
+        }
+
+    def _build_host(self, index: int) -> dict:
+        """Build one host's static fragments and its process tree."""
+        rng = self.rng
+        host_id = "".join(rng.choice("0123456789abcdef") for _ in range(32))
+        name = f"blue-{index + 1:02d}"
+
+        # Ancestor chain: systemd -> sshd -> bash -> bash ...
+        depth = max(self.config.tree_depth, 3)
+        tree = [self._parent(index, 0, ["/usr/lib/systemd/systemd"], "root", 1)]
+        tree.append(self._parent(index, 1, ["/usr/sbin/sshd", "-D"], "root", rng.randint(300, 900)))
+        for level in range(2, depth):
+            tree.append(self._parent(index, level, ["bash"] if level > 2 else ["-bash"], "ubuntu", rng.randint(1000, 60000)))
+        services = {
+            "tomcat": self._parent(index, depth, TOMCAT_ARGS, "tomcat", rng.randint(1000, 5000)),
+            "es": self._parent(index, depth + 1, ELASTICSEARCH_ARGS, "elasticsearch", rng.randint(1000, 5000)),
+        }
+
+        return {
+            "name": name,
+            "prefix": (
+                f'"agent":{{"id":{_json(host_id[:8] + "-agent")},"type":"endpoint","version":"9.0.5"}},'
+                '"data_stream":{"dataset":"endpoint.events.process","namespace":"default","type":"logs"},'
+                '"ecs":{"version":"8.10.0"}'
+            ),
+            "host": f'"host":{{"id":{_json(host_id)},"name":{_json(name)},"os":{{"type":"linux"}}}}',
+            "shells": [_json(parent) for parent in tree[2:]],
+            "tomcat": _json(services["tomcat"]),
+            "es": _json(services["es"]),
+            "tomcat_parent": services["tomcat"],
+        }
+
+    def _timestamp(self, ms: int) -> str:
+        second, millis = divmod(ms, 1000)
+        prefix = self._second_cache.get(second)
+        if prefix is None:
+            if len(self._second_cache) > 4096:
+                self._second_cache.clear()
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second_cache[second] = prefix
+        return f"{prefix}.{millis:03d}Z"
+
+    def _event(self, host: dict, process: str, user: str, parent: str, labels: str,
+               ms: int, pid: int, entity_id: str) -> str:
+        self.sequence += 1
+        timestamp = self._timestamp(ms)
+        return (
+            f'{{{labels},"@timestamp":"{timestamp}",{host["prefix"]},'
+            f'"event":{{"action":"exec","category":"process","created":"{timestamp}",'
+            f'"dataset":"endpoint.events.process","id":"{self.config.seed:x}{self.sequence:012x}",'
+            f'"kind":"event","module":"endpoint","outcome":"success","sequence":{self.sequence},"type":"start"}},'
+            f'{host["host"]},"message":"Endpoint process event",'
+            f'"process":{{{process},"entity_id":"{entity_id}","parent":{parent},"pid":{pid},'
+            f'"start":"{timestamp}"}},{user}}}'
+        )
+
+    def _chain(self, name: str, host_index: int) -> list[tuple]:
+        """Build the (process, user, parent, labels, pid, entity_id) steps of one attack chain."""
+        rng = self.rng
+        host = self.hosts[host_index]
+
+        def labels(rule: str | None) -> str:
+            if rule is None:
+                return self.benign_labels
+            return f'"labels":{_json({"detection_expected_result": "true_positive", "detection_rule": rule})}'
+
+        def step(args: list[str], executable: str, user: str, parent: dict, rule: str | None):
+            pid = rng.randint(1000, 4_000_000)
+            self._chain_serial += 1
+            entity_id = self._entity_id("a", host_index, self._chain_serial)
+            steps.append((_process_fragment(args, executable), _user_fragment(user), _json(parent), labels(rule), pid, entity_id))
+            return {
+                "args": args,
+                "args_count": len(args),
+                "command_line": " ".join(args),
+                "entity_id": entity_id,
+                "executable": executable,
+                "name": executable.rsplit("/", 1)[-1],
+                "pid": pid,
+                "user": {"id": USERS[user], "name": user},
+            }
+
+        steps: list = []
+        tomcat = host["tomcat_parent"]
+        if name == "webshell":
+            step(["bash", "-c", rng.choice(DISCOVERY_COMMANDS)], "/usr/bin/bash", "tomcat", tomcat, "tomcat-webshell-detection")
+        elif name == "shadow":
+            shell = step(["bash", "-c", "sudo cat /etc/shadow"], "/usr/bin/bash", "tomcat", tomcat, "tomcat-webshell-detection")
+            sudo = step(["sudo", "cat", "/etc/shadow"], "/usr/bin/sudo", "root", shell, None)
+            step(["cat", "/etc/shadow"], "/usr/bin/cat", "root", sudo, "shadow-file-read")
+        elif name == "tar":
+            shell = step(["bash", "-c", TAR_COMMAND], "/usr/bin/bash", "tomcat", tomcat, "tomcat-webshell-detection")
+            sudo = step(TAR_COMMAND.split(), "/usr/bin/sudo", "root", shell, None)
+            step(TAR_COMMAND.split()[1:], "/usr/bin/tar", "root", sudo, "sensitive-files-compression")
+        return steps
+
+    def batch(self, size: int) -> list[str]:
+        """Generate one batch of serialized events."""
+        rng = self.rng
+        config = self.config
+
+        # Decide which attack chains land in this batch. The owed number of
+        # attack events is carried between batches, so the overall ratio
+        # stays exact whatever the chain lengths, and a chain that does not
+        # fit whole waits for the next batch instead of being cut short
+        chain_events = 0
+        chains: list[tuple[int, list]] = []
+        if config.malicious_ratio > 0 and config.chains:
+            self._chain_carry += size * config.malicious_ratio
+            while True:
+                length = CHAIN_LENGTHS[self._next_chain]
+                if self._chain_carry < length or chain_events + length > size:
+                    break
+                self._chain_carry -= length
+                host_index = rng.randrange(len(self.hosts))
+                steps = self._chain(self._next_chain, host_index)
+                chains.append((rng.randrange(size), host_index, steps))
+                chain_events += len(steps)
+                self._next_chain = rng.choice(config.chains)
+        benign_count = max(size - chain_events, 0)
+
+        # Draw every random column for the batch at once
+        host_column = rng.choices(range(len(self.hosts)), k=benign_count)
+        process_column = rng.choices(range(len(self.benign)), k=benign_count)
+        shell_column = [rng.random() for _ in range(benign_count)]
+        pid_column = [rng.randint(1000, 4_000_000) for _ in range(benign_count)]
+        mean_gap = 1000.0 / config.events_per_second
+        gap_column = [rng.expovariate(1.0 / mean_gap) for _ in range(benign_count + chain_events)]
+
+        rows: list[tuple] = []
+        for i in range(benign_count):
+            host = self.hosts[host_column[i]]
+            process, user, kind = self.benign[process_column[i]]
+            if kind == "shell":
+                shells = host["shells"]
+                parent = shells[int(shell_column[i] * len(shells))]
+            else:
+                parent = host[kind]
+            rows.append((host, process, user, parent, self.benign_labels, pid_column[i], None))
+
+        # Splice chains in at their drawn positions, highest first so earlier
+        # offsets stay valid
+        for position, host_index, steps in sorted(chains, key=lambda c: c[0], reverse=True):
+            host = self.hosts[host_index]
+            rows[position:position] = [
+                (host, process, user, parent, labels, pid, entity_id)
+                for process, user, parent, labels, pid, entity_id in steps
+            ]
+
+        lines = []
+        clock = float(self.clock_ms)
+        seed = config.seed
+        for i, (host, process, user, parent, labels, pid, entity_id) in enumerate(rows):
+            clock += gap_column[i]
+            if entity_id is None:
+                entity_id = f"b-{seed:x}-{self.sequence + 1:x}"
+            lines.append(self._event(host, process, user, parent, labels, int(clock), pid, entity_id))
+        self.clock_ms = int(clock)
+        return lines
+
+    def stream(self, out: TextIO) -> int:
+        """Write ``config.count`` events to ``out`` as NDJSON."""
+        remaining = self.config.count
+        written = 0
+        while remaining > 0:
+            lines = self.batch(min(self.config.batch_size, remaining))
+            out.write("\n".join(lines))
+            out.write("\n")
+            written += len(lines)
+            remaining -= len(lines)
+        return written
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic ECS process events as NDJSON",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s -n 1000000 -o corpus.ndjson
+  %(prog)s -n 50000 --hosts 20 --malicious-ratio 0.05 --chains shadow,tar --seed 7
+""",
+    )
+
+    parser.add_argument("-n", "--count", type=int, default=100_000, help="Number of events (default: 100000)")
+    parser.add_argument("-o", "--output", type=str, metavar="FILE", help="Output file (default: stdout)")
+    parser.add_argument("--hosts", type=int, default=10, help="Number of hosts (default: 10)")
+    parser.add_argument("--tree-depth", type=int, default=4, help="Process tree depth per host (default: 4)")
+    parser.add_argument(
+        "--malicious-ratio",
+        type=float,
+        default=0.01,
+        help="Fraction of events belonging to attack chains (default: 0.01)",
+    )
+    parser.add_argument(
+        "--chains",
+        type=str,
+        default=",".join(ATTACK_CHAINS),
+        help=f"Comma-separated attack chains to inject (default: {','.join(ATTACK_CHAINS)})",
+    )
+    parser.add_argument("--seed", type=int, default=2025, help="Random seed (default: 2025)")
+    parser.add_argument("--start", type=str, default="2025-11-10T15:00:00Z", help="Timestamp of the first event")
+    parser.add_argument("--eps", type=float, default=1000.0, help="Simulated events per second (default: 1000)")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Events per batch (default: 10000)")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    chains = tuple(name.strip() for name in args.chains.split(",") if name.strip())
+    unknown = set(chains) - set(ATTACK_CHAINS)
+    if unknown:
+        print(f"ERROR: Unknown attack chain(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 1
+
+    config = GeneratorConfig(
+        count=args.count,
+        hosts=args.hosts,
+        tree_depth=args.tree_depth,
+        malicious_ratio=args.malicious_ratio,
+        chains=chains,
+        seed=args.seed,
+        start=args.start,
+        events_per_second=args.eps,
+        batch_size=args.batch_size,
+    )
+    generator = EventGenerator(config)
+
+    start = time.perf_counter()
+    if args.output:
+        with open(args.output, "w") as f:
+            written = generator.stream(f)
+    else:
+        written = generator.stream(sys.stdout)
+    elapsed = time.perf_counter() - start
+
+    rate = written / elapsed * 60 if elapsed > 0 else 0
+    print(f"Generated {written} events in {elapsed:.2f}s ({rate:,.0f} events/min)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
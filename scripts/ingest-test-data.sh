@@ -7,7 +7,14 @@
 # into the Local Elasticsearch instance (ec-local) for testing the
 # Tomcat webshell detection rule.
 #
-# Usage: ./ingest-test-data.sh
+# Usage: ./ingest-test-data.sh [EXTRA_FILE.ndjson ...]
+#
+# Additional JSON/NDJSON files (e.g. a corpus from generate_events.py) are
+# ingested in the same bulk run.
+#
+# Set FRESH_TIMESTAMPS=1 to rewrite @timestamp/event.created/event.ingested
+# to the time of ingest (via replay.py), so rules with a NOW() window match.
+# REPLAY_EPS additionally paces the ingest at that many events per second.
 ################################################################################
 
 set -e
@@ -80,32 +87,6 @@ echo ""
 # Target index
 INDEX_NAME="logs-endpoint.events.default"
 
-# Function to ingest a document
-ingest_document() {
-    local file=$1
-    local description=$2
-
-    print_info "Ingesting $description..."
-
-    response=$(curl -s -w "\n%{http_code}" -u "elastic:${ES_PASSWORD}" \
-        -X POST "${ES_ENDPOINT}/${INDEX_NAME}/_doc" \
-        -H 'Content-Type: application/json' \
-        -d @"${file}")
-
-    http_code=$(echo "$response" | tail -n1)
-    body=$(echo "$response" | head -n -1)
-
-    if [ "$http_code" -eq 201 ] || [ "$http_code" -eq 200 ]; then
-        doc_id=$(echo "$body" | jq -r '._id')
-        print_info "✓ Success! Document ID: $doc_id"
-        return 0
-    else
-        print_error "✗ Failed with HTTP $http_code"
-        echo "$body" | jq '.' 2>/dev/null || echo "$body"
-        return 1
-    fi
-}
-
 # Create index with proper mappings (if it doesn't exist)
 print_info "Checking if index exists..."
 index_exists=$(curl -s -u "elastic:${ES_PASSWORD}" \
@@ -132,33 +113,29 @@ fi
 
 echo ""
 
-# Ingest test documents
+# Ingest test documents through the _bulk API (pooled connection, per-item retries)
 print_info "Ingesting test data..."
-echo ""
-
-success_count=0
-fail_count=0
-
-if ingest_document "data/test-data/true-positive.json" "True Positive (Tomcat spawning bash -c)"; then
-    ((success_count++))
-else
-    ((fail_count++))
+print_info "  - True Positive (Tomcat spawning bash -c)"
+print_info "  - True Negative (Elasticsearch spawning ls)"
+
+INGEST_SCRIPT="scripts/bulk_ingest.py"
+INGEST_ARGS=()
+if [ "${FRESH_TIMESTAMPS:-0}" = "1" ] || [ -n "${REPLAY_EPS:-}" ]; then
+    INGEST_SCRIPT="scripts/replay.py"
+    print_info "  - Timestamps rewritten to now${REPLAY_EPS:+ at ${REPLAY_EPS} events/s}"
+    if [ -n "${REPLAY_EPS:-}" ]; then
+        INGEST_ARGS+=(--eps "$REPLAY_EPS")
+    fi
 fi
 
-echo ""
-
-if ingest_document "data/test-data/true-negative.json" "True Negative (Elasticsearch spawning ls)"; then
-    ((success_count++))
-else
-    ((fail_count++))
-fi
+fail_count=0
+ES_PASSWORD="$ES_PASSWORD" python3 "$INGEST_SCRIPT" "${INGEST_ARGS[@]}" \
+    --url "$ES_ENDPOINT" \
+    --index "$INDEX_NAME" \
+    --refresh \
+    data/test-data/true-positive.json \
+    data/test-data/true-negative.json "$@" || fail_count=1
 
-echo ""
-echo "=========================================="
-echo "Ingestion Summary"
-echo "=========================================="
-echo "Successfully ingested: $success_count documents"
-echo "Failed: $fail_count documents"
 echo ""
 
 if [ $fail_count -eq 0 ]; then
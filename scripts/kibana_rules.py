@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""Kibana Rules - Enable, disable and import detection rules in bulk.
+
+Replaces the per-rule curl + jq loops of enable-demo-rules.sh and
+disable-demo-rules.sh, which got slower with every rule in the catalog:
+
+    - All requests share one keep-alive connection
+    - Rule names and rule_ids are resolved to saved-object IDs with a single
+      paged _find (only name and rule_id are fetched), and the mapping is
+      cached on disk per Kibana URL; a stale cache is refreshed once
+      automatically when Kibana reports a rule missing
+    - Enable, disable and schedule/suppression edits go through
+      _bulk_action in batches of --batch-size IDs
+    - Rules are created or updated (overwrite) through _import, in batches
+
+Rules are given by name ("Cron Job Created or Modified") or rule_id. Rule
+files may be NDJSON exports or the .esql rules under demo-instructions/.
+
+``kibana_rules.py stub`` serves an in-memory imitation of these endpoints with
+a synthetic catalog, so the client and the shell scripts can be exercised
+without a deployment:
+
+    python3 scripts/kibana_rules.py stub --port 5601 --rules 5000 &
+    python3 scripts/kibana_rules.py --url http://127.0.0.1:5601 disable "Cron Job Created or Modified"
+"""
+
+import argparse
+import email.parser
+import http.client
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from bulk_ingest import ConnectionPool, IngestConfig
+
+
+RULES_API = "/api/detection_engine/rules"
+DEFAULT_CACHE = Path.home() / ".cache" / "elastic-security-demo" / "kibana-rules.json"
+DEFAULT_BATCH = 500
+FIND_PAGE_SIZE = 1000
+
+# rule_id namespace for rules generated from demo-instructions/*.esql
+ESQL_RULE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/stuartMoorhouse/elastic-security-demo-2025")
+
+
+class KibanaError(RuntimeError):
+    """A Kibana API request failed."""
+
+
+@dataclass
+class BulkResult:
+    """Totals across the batches of one bulk operation."""
+
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)  # IDs Kibana no longer knows
+
+    def add(self, other: "BulkResult") -> None:
+        self.succeeded += other.succeeded
+        self.failed += other.failed
+        self.skipped += other.skipped
+        self.errors.extend(other.errors)
+        self.missing.extend(other.missing)
+
+
+def batched(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parse_duration(text: str) -> int:
+    """Parse '30s', '1m', '10m' or '1h' into seconds."""
+    match = re.fullmatch(r"(\d+)([smh])", text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration {text!r} (expected e.g. 30s, 1m, 1h)")
+    return int(match.group(1)) * {"s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def format_duration(seconds: int) -> str:
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+# =============================================================================
+# Client
+# =============================================================================
+
+
+class RuleCache:
+    """On-disk map of rule name / rule_id -> saved-object ID, per Kibana URL."""
+
+    def __init__(self, path: Path | None, url: str):
+        self.path = path
+        self.url = url.rstrip("/")
+        self.entries: dict[str, str] = {}
+        self.fetched_at: float | None = None
+        if path and path.exists():
+            try:
+                stored = json.loads(path.read_text()).get(self.url) or {}
+            except (OSError, ValueError):
+                stored = {}
+            self.entries = stored.get("entries", {})
+            self.fetched_at = stored.get("fetched_at")
+
+    def replace(self, entries: dict[str, str]) -> None:
+        self.entries = entries
+        self.fetched_at = time.time()
+        if not self.path:
+            return
+        try:
+            data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        except (OSError, ValueError):
+            data = {}
+        data[self.url] = {"fetched_at": self.fetched_at, "entries": entries}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self.path)
+
+
+class KibanaRulesClient:
+    """Detection engine API client over one pooled keep-alive connection."""
+
+    def __init__(
+        self,
+        url: str,
+        username: str | None = "elastic",
+        password: str | None = None,
+        api_key: str | None = None,
+        verify_tls: bool = True,
+        cache_path: Path | None = DEFAULT_CACHE,
+        batch_size: int = DEFAULT_BATCH,
+        timeout: float = 60.0,
+    ):
+        config = IngestConfig(
+            url=url,
+            username=username,
+            password=password,
+            api_key=api_key,
+            verify_tls=verify_tls,
+            timeout=timeout,
+        )
+        self.pool = ConnectionPool(config)
+        self.pool.headers.update({"Content-Type": "application/json", "kbn-xsrf": "true"})
+        self.cache = RuleCache(cache_path, url)
+        self.batch_size = batch_size
+        self.requests = 0
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def request(self, method: str, path: str, body: Any = None, raw: bytes | None = None, headers: dict | None = None) -> Any:
+        """Send a request and decode the JSON response.
+
+        Error responses that carry a bulk ``attributes`` body are returned as
+        is, so partial failures can be reported per rule.
+        """
+        data = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+        self.requests += 1
+        try:
+            status, payload = self.pool.request(method, path, data, headers)
+        except (http.client.HTTPException, OSError) as e:
+            raise KibanaError(f"{method} {path}: cannot reach Kibana: {e}") from e
+        try:
+            result = json.loads(payload) if payload else {}
+        except ValueError:
+            result = None
+        if result is None and status < 400:
+            raise KibanaError(f"{method} {path}: invalid JSON response (HTTP {status})")
+        if status >= 400 and not (isinstance(result, dict) and "attributes" in result):
+            message = result.get("message") if isinstance(result, dict) else payload[:200].decode(errors="replace")
+            raise KibanaError(f"{method} {path}: HTTP {status}: {message}")
+        return result
+
+    # Name resolution
+
+    def fetch_catalog(self) -> dict[str, str]:
+        """Page through every rule once, mapping names and rule_ids to IDs."""
+        entries: dict[str, str] = {}
+        page = 1
+        while True:
+            query = urlencode([("page", page), ("per_page", FIND_PAGE_SIZE), ("fields", "name"), ("fields", "rule_id")])
+            result = self.request("GET", f"{RULES_API}/_find?{query}")
+            for rule in result.get("data", []):
+                entries.setdefault(rule["name"], rule["id"])
+                if rule.get("rule_id"):
+                    entries[rule["rule_id"]] = rule["id"]
+            if page * FIND_PAGE_SIZE >= result.get("total", 0) or not result.get("data"):
+                break
+            page += 1
+        self.cache.replace(entries)
+        return entries
+
+    def resolve(self, rules: Iterable[str], refresh: bool = False) -> tuple[dict[str, str], list[str]]:
+        """Map rule names / rule_ids to IDs; returns (found, missing).
+
+        The cached catalog is used when it covers every rule; otherwise it is
+        fetched again once.
+        """
+        rules = list(dict.fromkeys(rules))
+        if refresh or any(rule not in self.cache.entries for rule in rules):
+            self.fetch_catalog()
+        found = {rule: self.cache.entries[rule] for rule in rules if rule in self.cache.entries}
+        return found, [rule for rule in rules if rule not in found]
+
+    # Bulk operations
+
+    def _bulk_action(self, payload: dict, ids: list[str]) -> BulkResult:
+        total = BulkResult()
+        for batch in batched(ids, self.batch_size):
+            result = self.request("POST", f"{RULES_API}/_bulk_action", {**payload, "ids": batch})
+            summary = (result.get("attributes") or {}).get("summary") or {}
+            part = BulkResult(
+                succeeded=summary.get("succeeded", len(batch) if result.get("success") else 0),
+                failed=summary.get("failed", 0),
+                skipped=summary.get("skipped", 0),
+            )
+            for error in (result.get("attributes") or {}).get("errors") or []:
+                if error.get("status_code") == 404:
+                    part.missing.extend(rule["id"] for rule in error.get("rules", []) if rule.get("id"))
+                    continue
+                names = ", ".join(rule.get("name") or rule.get("id", "?") for rule in error.get("rules", []))
+                part.errors.append(f"{error.get('message')} ({names})" if names else str(error.get("message")))
+            total.add(part)
+        return total
+
+    def bulk_action(self, action: str, rules: Iterable[str], **extra: Any) -> tuple[BulkResult, list[str]]:
+        """Run a _bulk_action on rules given by name or rule_id.
+
+        Returns the result and the rules that could not be resolved. Rules
+        Kibana reports as missing (stale cache) are resolved again and retried
+        once.
+        """
+        found, missing = self.resolve(rules)
+        payload = {"action": action, **extra}
+        result = self._bulk_action(payload, list(dict.fromkeys(found.values())))
+        if result.missing:
+            stale = {rule for rule, rule_id in found.items() if rule_id in result.missing}
+            retry, still_missing = self.resolve(stale, refresh=True)
+            result.failed -= len(result.missing)
+            result.missing = []
+            result.add(self._bulk_action(payload, list(dict.fromkeys(retry.values()))))
+            missing += still_missing
+        return result, missing
+
+    def install_prebuilt(self) -> dict:
+        """Install and update Elastic's prebuilt rules."""
+        result = self.request("PUT", f"{RULES_API}/prepackaged")
+        if result.get("rules_installed"):
+            self.cache.entries = {}  # New rules: force a fresh catalog on next resolve
+        return result
+
+    def import_rules(self, rules: list[dict], overwrite: bool = True) -> BulkResult:
+        """Create or update rules through _import, in batches."""
+        total = BulkResult()
+        boundary = uuid.uuid4().hex
+        for batch in batched(rules, self.batch_size):
+            ndjson = "".join(json.dumps(rule) + "\n" for rule in batch).encode()
+            body = (
+                f"--{boundary}\r\n"
+                'Content-Disposition: form-data; name="file"; filename="rules.ndjson"\r\n'
+                "Content-Type: application/x-ndjson\r\n\r\n"
+            ).encode() + ndjson + f"\r\n--{boundary}--\r\n".encode()
+            result = self.request(
+                "POST",
+                f"{RULES_API}/_import?overwrite={str(overwrite).lower()}",
+                raw=body,
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            )
+            errors = result.get("errors") or []
+            total.add(BulkResult(succeeded=result.get("success_count", 0), failed=len(errors)))
+            total.errors.extend(f"{error.get('rule_id')}: {(error.get('error') or {}).get('message')}" for error in errors)
+        if total.succeeded:
+            self.cache.entries = {}
+        return total
+
+
+def esql_rule(path: Path) -> dict:
+    """Build a detection rule from one of the demo .esql files."""
+    query = "\n".join(line for line in path.read_text().splitlines() if not line.strip().startswith("//")).strip()
+    return {
+        "rule_id": str(uuid.uuid5(ESQL_RULE_NAMESPACE, path.stem)),
+        "name": path.stem.replace("-", " ").title(),
+        "description": f"Tomcatastrophe demo rule from {path.name}",
+        "type": "esql",
+        "language": "esql",
+        "query": query,
+        "risk_score": 47,
+        "severity": "medium",
+        "interval": "1m",
+        "from": "now-6m",
+        "enabled": False,
+        "tags": ["Tomcatastrophe", "Demo"],
+        "version": 1,
+    }
+
+
+def load_rule_files(paths: Iterable[str]) -> list[dict]:
+    """Read rules from .esql files and NDJSON rule exports."""
+    rules = []
+    for name in paths:
+        path = Path(name)
+        if path.suffix == ".esql":
+            rules.append(esql_rule(path))
+            continue
+        for line in path.read_text().splitlines():
+            if line.strip():
+                doc = json.loads(line)
+                if "rule_id" in doc:  # Skip export summary lines
+                    rules.append(doc)
+    return rules
+
+
+# =============================================================================
+# Stub Kibana
+# =============================================================================
+
+
+# Prebuilt rules the demo scripts reference; rule_ids are only known (from
+# enable-demo-rules.sh) for the ones looked up by rule_id
+STUB_PREBUILT_RULES = {
+    "Potential SYN-Based Port Scan Detected": None,
+    "Potential Reverse Shell via Java": None,
+    "Linux System Information Discovery via Getconf": None,
+    "Sudo Command Enumeration Detected": "28d39238-0c01-420a-b77a-24e5a7378663",
+    "Cron Job Created or Modified": "ff10d4d8-fea7-422d-afb1-e5a2702369a9",
+    "Potential Shadow File Read via Command Line Utilities": None,
+    "Tampering of Shell Command-Line History": None,
+    "Sensitive Files Compression": None,
+}
+
+
+class StubKibana:
+    """In-memory detection engine with the endpoints the client uses."""
+
+    def __init__(self, rule_count: int):
+        self.lock = threading.Lock()
+        self.rules: dict[str, dict] = {}
+        self.prebuilt_installed = False
+        for index in range(rule_count):
+            self._add({"rule_id": str(uuid.UUID(int=index + 1)), "name": f"Synthetic Rule {index:05d}", "type": "query"})
+
+    def _add(self, rule: dict) -> dict:
+        stored = {"enabled": False, "interval": "5m", "from": "now-6m", **rule}
+        stored["id"] = str(uuid.uuid5(uuid.NAMESPACE_OID, stored["rule_id"]))
+        self.rules[stored["id"]] = stored
+        return stored
+
+    def find(self, query: dict) -> dict:
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["20"])[0])
+        fields = query.get("fields")
+        ordered = sorted(self.rules.values(), key=lambda rule: rule["name"])
+        data = ordered[(page - 1) * per_page:page * per_page]
+        if fields:
+            data = [{"id": rule["id"], **{name: rule.get(name) for name in fields}} for rule in data]
+        return {"page": page, "perPage": per_page, "total": len(ordered), "data": data}
+
+    def bulk_action(self, body: dict) -> tuple[int, dict]:
+        action = body.get("action")
+        if action not in ("enable", "disable", "edit"):
+            return 400, {"message": f"unsupported action {action}"}
+        updated, missing = [], []
+        for rule_id in body.get("ids", []):
+            rule = self.rules.get(rule_id)
+            if rule is None:
+                missing.append({"id": rule_id})
+                continue
+            if action == "edit":
+                for edit in body.get("edit", []):
+                    if edit["type"] == "set_schedule":
+                        rule["interval"] = edit["value"]["interval"]
+                        rule["from"] = f"now-{format_duration(parse_duration(edit['value']['interval']) + parse_duration(edit['value']['lookback']))}"
+                    elif edit["type"] == "set_alert_suppression":
+                        rule["alert_suppression"] = edit["value"]
+            else:
+                rule["enabled"] = action == "enable"
+            updated.append(rule)
+        errors = [{"message": "Rule not found", "status_code": 404, "rules": missing}] if missing else []
+        summary = {"failed": len(missing), "skipped": 0, "succeeded": len(updated), "total": len(updated) + len(missing)}
+        attributes = {"results": {"updated": updated, "created": [], "deleted": [], "skipped": []}, "summary": summary, "errors": errors}
+        status = 500 if missing and not updated else 200
+        return status, {"success": not missing, "rules_count": len(updated), "attributes": attributes}
+
+    def install_prebuilt(self) -> dict:
+        installed = 0
+        if not self.prebuilt_installed:
+            for name, rule_id in STUB_PREBUILT_RULES.items():
+                rule_id = rule_id or str(uuid.uuid5(uuid.NAMESPACE_OID, name))
+                self._add({"rule_id": rule_id, "name": name, "type": "eql", "immutable": True})
+                installed += 1
+            self.prebuilt_installed = True
+        return {"rules_installed": installed, "rules_updated": 0}
+
+    def import_rules(self, rules: list[dict], overwrite: bool) -> dict:
+        errors, success = [], 0
+        by_rule_id = {rule["rule_id"]: rule for rule in self.rules.values()}
+        for rule in rules:
+            existing = by_rule_id.get(rule.get("rule_id"))
+            if existing and not overwrite:
+                errors.append({"rule_id": rule["rule_id"], "error": {"status_code": 409, "message": "rule_id already exists"}})
+                continue
+            if existing:
+                del self.rules[existing["id"]]
+            self._add(rule)
+            success += 1
+        return {"success": not errors, "success_count": success, "rules_count": len(rules), "errors": errors}
+
+
+def make_stub_handler(stub: StubKibana) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _route(self, method: str) -> None:
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            body = self._body()
+            if method != "GET" and self.headers.get("kbn-xsrf") is None:
+                self._reply(400, {"statusCode": 400, "message": 'Request must contain a kbn-xsrf header.'})
+                return
+            with stub.lock:
+                if method == "GET" and parts.path == f"{RULES_API}/_find":
+                    self._reply(200, stub.find(query))
+                elif method == "POST" and parts.path == f"{RULES_API}/_bulk_action":
+                    self._reply(*stub.bulk_action(json.loads(body)))
+                elif method == "PUT" and parts.path == f"{RULES_API}/prepackaged":
+                    self._reply(200, stub.install_prebuilt())
+                elif method == "POST" and parts.path == f"{RULES_API}/_import":
+                    header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+                    message = email.parser.BytesParser().parsebytes(header + body)
+                    rules = []
+                    for part in message.get_payload():
+                        for line in part.get_payload(decode=True).decode().splitlines():
+                            if line.strip():
+                                rules.append(json.loads(line))
+                    overwrite = query.get("overwrite", ["false"])[0] == "true"
+                    self._reply(200, stub.import_rules(rules, overwrite))
+                else:
+                    self._reply(404, {"statusCode": 404, "message": f"Not Found: {method} {parts.path}"})
+
+        def do_GET(self) -> None:
+            self._route("GET")
+
+        def do_POST(self) -> None:
+            self._route("POST")
+
+        def do_PUT(self) -> None:
+            self._route("PUT")
+
+        def log_message(self, format: str, *args: Any) -> None:
+            print(f"[stub-kibana] {self.command} {self.path}", file=sys.stderr)
+
+    return Handler
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def print_bulk(verb: str, result: BulkResult, missing: list[str]) -> None:
+    for rule in missing:
+        print(f"  ✗ Not found: {rule}")
+    print(f"  ✓ Rules {verb}: {result.succeeded}")
+    if result.skipped:
+        print(f"  - Rules skipped (already {verb}): {result.skipped}")
+    if result.failed:
+        print(f"  ✗ Rules failed: {result.failed}")
+    for error in result.errors:
+        print(f"      {error}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Enable, disable and import Kibana detection rules in bulk",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --url $KIBANA_URL enable --install-prebuilt --interval 1m --lookback 10m \\
+      --suppress-by host.name --suppress-for 1m 28d39238-0c01-420a-b77a-24e5a7378663
+  %(prog)s --url $KIBANA_URL disable "Cron Job Created or Modified" "Sensitive Files Compression"
+  %(prog)s --url $KIBANA_URL import demo-instructions/new-rules/*.esql
+  %(prog)s stub --port 5601 --rules 5000
+""",
+    )
+
+    parser.add_argument("--url", default=os.environ.get("KIBANA_URL"), help="Kibana URL (default: $KIBANA_URL)")
+    parser.add_argument("--user", default="elastic", help="Basic auth username (default: elastic)")
+    parser.add_argument("--password", default=os.environ.get("KIBANA_PASSWORD"), help="Basic auth password (default: $KIBANA_PASSWORD)")
+    parser.add_argument("--api-key", default=os.environ.get("KIBANA_API_KEY"), help="API key, overrides basic auth (default: $KIBANA_API_KEY)")
+    parser.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE), help=f"Rule ID cache file, '' to disable (default: {DEFAULT_CACHE})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH, help=f"Rules per bulk request (default: {DEFAULT_BATCH})")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enable = commands.add_parser("enable", help="Enable rules, optionally setting schedule and suppression")
+    enable.add_argument("rules", nargs="+", metavar="RULE", help="Rule name or rule_id")
+    enable.add_argument("--install-prebuilt", action="store_true", help="Install/update Elastic prebuilt rules first")
+    enable.add_argument("--interval", type=parse_duration, help="Run interval, e.g. 1m")
+    enable.add_argument("--lookback", type=parse_duration, help="Total time each run covers (from now-LOOKBACK), e.g. 10m")
+    enable.add_argument("--suppress-by", action="append", metavar="FIELD", help="Alert suppression group-by field (repeatable)")
+    enable.add_argument("--suppress-for", type=parse_duration, default=60, help="Alert suppression duration (default: 1m)")
+
+    disable = commands.add_parser("disable", help="Disable rules")
+    disable.add_argument("rules", nargs="+", metavar="RULE", help="Rule name or rule_id")
+
+    importer = commands.add_parser("import", help="Create or update rules from .esql files or NDJSON exports")
+    importer.add_argument("files", nargs="+", metavar="FILE")
+    importer.add_argument("--no-overwrite", action="store_true", help="Fail on rules that already exist")
+    importer.add_argument("--enable", action="store_true", help="Enable the imported rules")
+
+    stub = commands.add_parser("stub", help="Serve a local stub of the Kibana detection engine API")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=5601)
+    stub.add_argument("--rules", type=int, default=2000, help="Synthetic rules in the catalog (default: 2000)")
+
+    args = parser.parse_args()
+    if args.command != "stub" and not args.url:
+        parser.error("--url (or $KIBANA_URL) is required")
+    if args.command == "enable" and (args.interval is None) != (args.lookback is None):
+        parser.error("--interval and --lookback must be given together")
+    if args.command == "enable" and args.interval is not None and args.lookback < args.interval:
+        parser.error("--lookback must be at least --interval")
+    return args
+
+
+def run(args: argparse.Namespace, client: KibanaRulesClient) -> int:
+    if args.command == "import":
+        rules = load_rule_files(args.files)
+        print(f"Importing {len(rules)} rule(s)...")
+        result = client.import_rules(rules, overwrite=not args.no_overwrite)
+        print_bulk("imported", result, [])
+        if args.enable and result.succeeded:
+            enabled, missing = client.bulk_action("enable", [rule["rule_id"] for rule in rules])
+            print_bulk("enabled", enabled, missing)
+            return 1 if result.failed or enabled.failed or missing else 0
+        return 1 if result.failed else 0
+
+    if args.command == "enable" and args.install_prebuilt:
+        installed = client.install_prebuilt()
+        print(f"Prebuilt rules installed: {installed.get('rules_installed', 0)}, updated: {installed.get('rules_updated', 0)}")
+
+    started = time.perf_counter()
+    result, missing = client.bulk_action(args.command, args.rules)
+    print_bulk(f"{args.command}d", result, missing)
+    failed = result.failed + len(missing)
+
+    if args.command == "enable":
+        edits = []
+        if args.interval is not None:
+            value = {"interval": format_duration(args.interval), "lookback": format_duration(args.lookback - args.interval)}
+            edits.append({"type": "set_schedule", "value": value})
+        if args.suppress_by:
+            minutes, seconds = divmod(args.suppress_for, 60)
+            suppression = {
+                "group_by": args.suppress_by,
+                "duration": {"value": minutes, "unit": "m"} if not seconds else {"value": args.suppress_for, "unit": "s"},
+                "missing_fields_strategy": "suppress",
+            }
+            edits.append({"type": "set_alert_suppression", "value": suppression})
+        if edits:
+            edited, _ = client.bulk_action("edit", args.rules, edit=edits)
+            print_bulk("updated (schedule/suppression)", edited, [])
+            failed += edited.failed
+
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Done in {elapsed:.0f} ms with {client.requests} request(s) over one connection")
+    return 1 if failed else 0
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    if args.command == "stub":
+        stub = StubKibana(args.rules)
+        server = ThreadingHTTPServer((args.host, args.port), make_stub_handler(stub))
+        print(f"Stub Kibana with {len(stub.rules):,} rules on http://{args.host}:{args.port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    cache = Path(args.cache).expanduser() if args.cache else None
+    client = KibanaRulesClient(
+        args.url,
+        username=args.user,
+        password=args.password,
+        api_key=args.api_key,
+        verify_tls=not args.insecure,
+        cache_path=cache,
+        batch_size=args.batch_size,
+    )
+    try:
+        return run(args, client)
+    except KibanaError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""MSF RPC - Minimal client for the Metasploit msgpack RPC daemon (msfrpcd).
+
+Starting msfconsole loads the whole framework, which takes many seconds on
+every run. msfrpcd keeps one framework instance warm; this client talks to it
+over a single keep-alive HTTP(S) connection so repeated runs start
+immediately:
+
+    msfrpcd -U msf -P <password> -a 127.0.0.1     # once, on red-01
+
+Requests are msgpack arrays of [method, token, args...] POSTed to /api/.
+The codec below covers the msgpack types the RPC API uses (nil, bool, int,
+float, str, bin, array, map), so no third-party package is needed.
+
+``msfrpc.py stub`` serves an in-memory imitation of msfrpcd over plain HTTP,
+with canned shell output, so the RPC backend can be exercised without
+Metasploit or a target:
+
+    MSF_RPC_PASSWORD=secret python3 scripts/msfrpc.py stub --port 55553 &
+    python3 scripts/tomcatastrophe.py -t 10.0.1.50 -a 10.0.1.100 --rpc http://127.0.0.1:55553/api/ --rpc-password secret
+"""
+
+import argparse
+import base64
+import http.client
+import os
+import re
+import ssl
+import struct
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import urlsplit
+
+
+DEFAULT_URL = "https://127.0.0.1:55553/api/"
+
+# Calls that must not be resent after a connection error: the daemon may
+# have run them already (a module launched twice, a shell command written
+# twice) or consumed their result (shell output read and lost)
+NON_IDEMPOTENT_METHODS = frozenset({"module.execute", "session.shell_write", "session.shell_read"})
+
+
+class MsfRpcError(RuntimeError):
+    """An RPC call failed or returned an error response."""
+
+
+def packb(obj: Any) -> bytes:
+    """Serialize ``obj`` to msgpack."""
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def _pack(obj: Any, out: bytearray) -> None:
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj >= 0:
+            for code, fmt, limit in ((0xCC, ">B", 1 << 8), (0xCD, ">H", 1 << 16), (0xCE, ">I", 1 << 32), (0xCF, ">Q", 1 << 64)):
+                if obj < limit:
+                    out.append(code)
+                    out += struct.pack(fmt, obj)
+                    return
+            raise OverflowError(f"integer too large for msgpack: {obj}")
+        else:
+            for code, fmt, limit in ((0xD0, ">b", 1 << 7), (0xD1, ">h", 1 << 15), (0xD2, ">i", 1 << 31), (0xD3, ">q", 1 << 63)):
+                if obj >= -limit:
+                    out.append(code)
+                    out += struct.pack(fmt, obj)
+                    return
+            raise OverflowError(f"integer too small for msgpack: {obj}")
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _pack_header(len(data), out, 0xA0, 32, (0xD9, 0xDA, 0xDB))
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        _pack_header(len(obj), out, None, 0, (0xC4, 0xC5, 0xC6))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), out, 0x90, 16, (None, 0xDC, 0xDD))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), out, 0x80, 16, (None, 0xDE, 0xDF))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"cannot serialize {type(obj).__name__} to msgpack")
+
+
+def _pack_header(length: int, out: bytearray, fix: int | None, fix_limit: int, codes: tuple) -> None:
+    """Write a fix/8/16/32-bit length header, whichever is smallest."""
+    if fix is not None and length < fix_limit:
+        out.append(fix | length)
+        return
+    for code, fmt, limit in zip(codes, (">B", ">H", ">I"), (1 << 8, 1 << 16, 1 << 32)):
+        if code is not None and length < limit:
+            out.append(code)
+            out += struct.pack(fmt, length)
+            return
+    raise OverflowError("object too large for msgpack")
+
+
+def unpackb(data: bytes) -> Any:
+    """Deserialize one msgpack value; str types become str, bin becomes bytes."""
+    value, end = _unpack(memoryview(data), 0)
+    if end != len(data):
+        raise ValueError(f"{len(data) - end} trailing bytes after msgpack value")
+    return value
+
+
+_FIXED = {
+    0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+    0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+    0xCA: ">f", 0xCB: ">d",
+}
+_LENGTHS = {
+    0xC4: ">B", 0xC5: ">H", 0xC6: ">I",  # bin
+    0xD9: ">B", 0xDA: ">H", 0xDB: ">I",  # str
+    0xDC: ">H", 0xDD: ">I",  # array
+    0xDE: ">H", 0xDF: ">I",  # map
+}
+
+
+def _unpack(data: memoryview, pos: int) -> tuple[Any, int]:
+    code = data[pos]
+    pos += 1
+    if code < 0x80:
+        return code, pos
+    if code >= 0xE0:
+        return code - 0x100, pos
+    if 0x80 <= code <= 0x8F:
+        return _unpack_map(data, pos, code & 0x0F)
+    if 0x90 <= code <= 0x9F:
+        return _unpack_array(data, pos, code & 0x0F)
+    if 0xA0 <= code <= 0xBF:
+        length = code & 0x1F
+        return str(data[pos:pos + length], "utf-8", "replace"), pos + length
+    if code == 0xC0:
+        return None, pos
+    if code in (0xC2, 0xC3):
+        return code == 0xC3, pos
+    if code in _FIXED:
+        fmt = _FIXED[code]
+        return struct.unpack_from(fmt, data, pos)[0], pos + struct.calcsize(fmt)
+    if code in _LENGTHS:
+        fmt = _LENGTHS[code]
+        length = struct.unpack_from(fmt, data, pos)[0]
+        pos += struct.calcsize(fmt)
+        if code <= 0xC6:
+            return bytes(data[pos:pos + length]), pos + length
+        if code <= 0xDB:
+            return str(data[pos:pos + length], "utf-8", "replace"), pos + length
+        if code <= 0xDD:
+            return _unpack_array(data, pos, length)
+        return _unpack_map(data, pos, length)
+    raise ValueError(f"unsupported msgpack type 0x{code:02x}")
+
+
+def _unpack_array(data: memoryview, pos: int, length: int) -> tuple[list, int]:
+    items = []
+    for _ in range(length):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data: memoryview, pos: int, length: int) -> tuple[dict, int]:
+    result = {}
+    for _ in range(length):
+        key, pos = _unpack(data, pos)
+        value, pos = _unpack(data, pos)
+        result[key.decode("utf-8", "replace") if isinstance(key, bytes) else key] = value
+    return result, pos
+
+
+def _text(value: Any) -> str:
+    """Metasploit sends some strings as bin; treat them as text."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return "" if value is None else str(value)
+
+
+class MsfRpcClient:
+    """msgpack RPC client holding one keep-alive connection and auth token."""
+
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        username: str = "msf",
+        password: str = "",
+        verify_tls: bool = True,
+        timeout: float = 30.0,
+    ):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 55553
+        self.path = parts.path or "/api/"
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context()
+        if not verify_tls:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.token: str | None = None
+        self._conn: http.client.HTTPConnection | None = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _send(self, conn: http.client.HTTPConnection, body: bytes) -> tuple[int, bytes]:
+        headers = {"Content-Type": "binary/message-pack", "Connection": "keep-alive"}
+        try:
+            conn.request("POST", self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._conn = conn
+        return response.status, data
+
+    def _post(self, body: bytes, retry: bool = True) -> tuple[int, bytes]:
+        """POST on the kept-alive connection, reconnecting once if it went stale.
+
+        With ``retry`` off, a failure on the kept-alive connection is raised
+        rather than resent, since the daemon may already have acted on it.
+        """
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return self._send(self._connect(), body)
+        try:
+            return self._send(conn, body)
+        except (http.client.HTTPException, OSError):
+            if not retry:
+                raise
+            return self._send(self._connect(), body)
+
+    def call(self, method: str, *args: Any) -> Any:
+        """Invoke an RPC method; the auth token is added automatically."""
+        if method != "auth.login" and self.token is None:
+            self.login()
+        request = [method] if method == "auth.login" else [method, self.token]
+        try:
+            status, data = self._post(packb(request + list(args)), retry=method not in NON_IDEMPOTENT_METHODS)
+        except (http.client.HTTPException, OSError) as e:
+            raise MsfRpcError(f"{method}: cannot reach msfrpcd at {self.host}:{self.port}: {e}") from e
+        try:
+            result = unpackb(data)
+        except (ValueError, IndexError, struct.error) as e:
+            raise MsfRpcError(f"{method}: invalid msgpack response (HTTP {status})") from e
+        if isinstance(result, dict) and result.get("error"):
+            message = _text(result.get("error_message") or result.get("error_string") or result.get("error_class"))
+            raise MsfRpcError(f"{method}: {message}")
+        if status != 200:
+            raise MsfRpcError(f"{method}: HTTP {status}")
+        return result
+
+    def login(self) -> str:
+        result = self.call("auth.login", self.username, self.password)
+        if _text(result.get("result")) != "success":
+            raise MsfRpcError("auth.login: authentication failed")
+        self.token = _text(result["token"])
+        return self.token
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # Modules and jobs
+
+    def execute_module(self, module_type: str, name: str, options: dict) -> str:
+        """Run a module in the background; returns its job id."""
+        result = self.call("module.execute", module_type, name, options)
+        return _text(result.get("job_id"))
+
+    def jobs(self) -> dict[str, str]:
+        return {_text(job_id): _text(name) for job_id, name in self.call("job.list").items()}
+
+    def stop_job(self, job_id: str) -> None:
+        self.call("job.stop", job_id)
+
+    # Sessions
+
+    def sessions(self) -> dict[str, dict]:
+        return {
+            _text(session_id): {key: _text(value) if isinstance(value, bytes) else value for key, value in info.items()}
+            for session_id, info in self.call("session.list").items()
+        }
+
+    def stop_session(self, session_id: str) -> None:
+        self.call("session.stop", session_id)
+
+    def shell_write(self, session_id: str, data: str) -> None:
+        self.call("session.shell_write", session_id, data)
+
+    def shell_read(self, session_id: str) -> str:
+        return _text(self.call("session.shell_read", session_id).get("data"))
+
+    def shell_run(
+        self, session_id: str, commands: list[str], timeout: float = 30.0, interval: float = 0.05
+    ) -> list[tuple[str, int | None]]:
+        """Run commands on a shell session in one write; returns (output, exit code) each.
+
+        Each command is wrapped in random begin/end markers, the end marker
+        carrying its exit status, so one round trip serves the whole list.
+        Commands that did not finish before ``timeout`` return ("", None).
+        """
+        token = "TC" + uuid.uuid4().hex[:12]
+        script = "; ".join(
+            f"echo {token}B{i}; ( {command} ) 2>&1; echo {token}E{i} $?" for i, command in enumerate(commands)
+        )
+        self.shell_write(session_id, script + "\n")
+
+        buffer = ""
+        last_end = re.compile(rf"{token}E{len(commands) - 1} (\d+)")
+        deadline = time.monotonic() + timeout
+        while not last_end.search(buffer) and time.monotonic() < deadline:
+            chunk = self.shell_read(session_id)
+            if chunk:
+                buffer += chunk
+            else:
+                time.sleep(interval)
+
+        results = []
+        for i in range(len(commands)):
+            match = re.search(rf"{token}B{i}\r?\n(.*?){token}E{i} (\d+)", buffer, re.S)
+            results.append((match.group(1), int(match.group(2))) if match else ("", None))
+        return results
+
+
+# =============================================================================
+# Stub msfrpcd
+# =============================================================================
+
+
+# What the lab target prints for the attack chain's commands; anything else
+# prints nothing and exits 0. Nothing is executed on the local machine.
+STUB_OUTPUTS = {
+    "whoami": "tomcat",
+    "id": "uid=1001(tomcat) gid=1001(tomcat) groups=1001(tomcat)",
+    "uname -a": "Linux {host} 6.8.0-1021-aws #23-Ubuntu SMP Mon Dec  9 23:59:34 UTC 2024 x86_64 x86_64 x86_64 GNU/Linux",
+    "hostname": "{host}",
+    "cat /etc/passwd | grep -v nologin": "root:x:0:0:root:/root:/bin/bash\nsync:x:4:65534:sync:/bin:/bin/sync\n"
+    "ubuntu:x:1000:1000:Ubuntu:/home/ubuntu:/bin/bash\ntomcat:x:1001:1001::/opt/tomcat:/bin/bash",
+    "sudo -l": "User tomcat may run the following commands on {host}:\n    (ALL) NOPASSWD: ALL",
+    "sudo -V | head -1": "Sudo version 1.9.15p5",
+    "sudo whoami": "root",
+    "sudo cat /etc/shadow": "root:*:19760:0:99999:7:::\nubuntu:$6$stub$0123456789abcdef:19760:0:99999:7:::",
+    "ls -la /tmp/loot.tar.gz": "-rw-r--r-- 1 root root 2048 Jan  1 00:00 /tmp/loot.tar.gz",
+}
+STUB_MARKED = re.compile(r"echo (\w+B\d+); \( (.*?) \) 2>&1; echo (\w+E\d+) \$\?")
+STUB_CRON = re.compile(r"echo (\S+) \| base64 -d > (\S+); sudo crontab \2")
+
+
+class StubMsfRpcd:
+    """In-memory stand-in for msfrpcd with the calls MsfRpcClient makes.
+
+    A multi/handler job waits for a connection; running
+    multi/http/tomcat_mgr_upload opens a shell session to RHOSTS after
+    ``session_delay`` seconds and, with ExitOnSession, ends the handler.
+    Shell commands get canned output (STUB_OUTPUTS) and honour shell_run's
+    begin/end markers; a crontab installed through the session is kept, so
+    ``sudo crontab -l`` shows it.
+    """
+
+    def __init__(self, username: str, password: str, session_delay: float = 0.5):
+        self.lock = threading.Lock()
+        self.username = username
+        self.password = password
+        self.session_delay = session_delay
+        self.tokens: set[str] = set()
+        self.jobs: dict[str, dict] = {}
+        self.sessions: dict[str, dict] = {}
+        self.next_id = 1
+
+    def _id(self) -> str:
+        self.next_id += 1
+        return str(self.next_id - 1)
+
+    def call(self, method: str, args: list) -> dict:
+        if method == "auth.login":
+            if list(args[:2]) != [self.username, self.password]:
+                return {"error": True, "error_class": "Msf::RPC::Exception", "error_message": "Login Failed"}
+            token = "TEMP" + uuid.uuid4().hex[:28]
+            self.tokens.add(token)
+            return {"result": "success", "token": token.encode()}
+        if not args or _text(args[0]) not in self.tokens:
+            return {"error": True, "error_class": "Msf::RPC::Exception", "error_message": "Invalid Authentication Token"}
+        handler = getattr(self, "rpc_" + method.replace(".", "_"), None)
+        if handler is None:
+            return {"error": True, "error_class": "Msf::RPC::Exception", "error_message": f"Unknown API Call: '{method}'"}
+        return handler(*args[1:])
+
+    def rpc_core_version(self) -> dict:
+        return {"version": "6.4.0-stub", "ruby": "3.2.0", "api": "1.0"}
+
+    def rpc_module_execute(self, module_type: str, name: str, options: dict) -> dict:
+        job_id = self._id()
+        self.jobs[job_id] = {"name": f"Exploit: {name}", "options": options}
+        if name == "multi/http/tomcat_mgr_upload":
+            timer = threading.Timer(self.session_delay, self._open_session, (job_id, options))
+            timer.daemon = True
+            timer.start()
+        return {"job_id": int(job_id), "uuid": uuid.uuid4().hex[:8]}
+
+    def _open_session(self, job_id: str, options: dict) -> None:
+        with self.lock:
+            if self.jobs.pop(job_id, None) is None:
+                return
+            host = _text(options.get("RHOSTS")) or "127.0.0.1"
+            self.sessions[self._id()] = {
+                "type": "shell",
+                "tunnel_peer": f"{host}:{49152 + len(self.sessions)}",
+                "session_host": host,
+                "via_exploit": "exploit/multi/handler",
+                "via_payload": "payload/java/shell_reverse_tcp",
+                "host": "ip-" + host.replace(".", "-"),
+                "output": "",
+                "crontab": None,
+            }
+            for handler_id, job in list(self.jobs.items()):
+                if job["name"] == "Exploit: multi/handler" and job["options"].get("ExitOnSession"):
+                    del self.jobs[handler_id]
+
+    def rpc_job_list(self) -> dict:
+        return {job_id: job["name"] for job_id, job in self.jobs.items()}
+
+    def rpc_job_stop(self, job_id: str) -> dict:
+        self.jobs.pop(_text(job_id), None)
+        return {"result": "success"}
+
+    def rpc_session_list(self) -> dict:
+        return {
+            session_id: {key: value for key, value in info.items() if key not in ("host", "output", "crontab")}
+            for session_id, info in self.sessions.items()
+        }
+
+    def _session(self, session_id: Any) -> dict | None:
+        return self.sessions.get(_text(session_id))
+
+    def rpc_session_stop(self, session_id: str) -> dict:
+        self.sessions.pop(_text(session_id), None)
+        return {"result": "success"}
+
+    def rpc_session_shell_write(self, session_id: str, data: Any) -> dict:
+        session = self._session(session_id)
+        if session is None:
+            return {"error": True, "error_class": "Msf::RPC::Exception", "error_message": "Unknown Session ID"}
+        text = _text(data)
+        marked = list(STUB_MARKED.finditer(text))
+        if marked:
+            for match in marked:
+                output, status = self._run(session, match.group(2))
+                session["output"] += f"{match.group(1)}\n{output}{match.group(3)} {status}\n"
+        else:
+            for line in text.splitlines():
+                session["output"] += self._run(session, line.strip())[0]
+        return {"write_count": str(len(text))}
+
+    def rpc_session_shell_read(self, session_id: str) -> dict:
+        session = self._session(session_id)
+        if session is None:
+            return {"error": True, "error_class": "Msf::RPC::Exception", "error_message": "Unknown Session ID"}
+        data, session["output"] = session["output"], ""
+        return {"seq": "0", "data": data.encode()}
+
+    def _run(self, session: dict, command: str) -> tuple[str, int]:
+        """Canned output and exit status of one command on the stand-in target."""
+        cron = STUB_CRON.match(command)
+        if cron:
+            try:
+                session["crontab"] = base64.b64decode(cron.group(1)).decode()
+            except (ValueError, UnicodeDecodeError):
+                return "base64: invalid input\n", 1
+            return "", 0
+        if command == "sudo crontab -l":
+            if session["crontab"] is None:
+                return "no crontab for root\n", 1
+            return session["crontab"], 0
+        output = STUB_OUTPUTS.get(command, "").format(host=session["host"])
+        return output + "\n" if output else "", 0
+
+
+def make_stub_handler(stub: StubMsfRpcd, path: str = "/api/") -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path != path:
+                result = {"error": True, "error_class": "Msf::RPC::Exception", "error_message": "Not Found"}
+            else:
+                try:
+                    request = unpackb(body)
+                except (ValueError, IndexError, struct.error):
+                    request = None
+                if not isinstance(request, list) or not request:
+                    result = {"error": True, "error_class": "Msf::RPC::Exception", "error_message": "Invalid Request"}
+                else:
+                    with stub.lock:
+                        result = stub.call(_text(request[0]), request[1:])
+            data = packb(result)
+            self.send_response(500 if result.get("error") else 200)
+            self.send_header("Content-Type", "binary/message-pack")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            print(f"[stub-msfrpcd] {self.command} {self.path}", file=sys.stderr)
+
+    return Handler
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Check a Metasploit RPC daemon: log in, list jobs and sessions",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  msfrpcd -U msf -P secret -a 127.0.0.1
+  MSF_RPC_PASSWORD=secret %(prog)s --insecure
+  MSF_RPC_PASSWORD=secret %(prog)s stub --port 55553
+""",
+    )
+
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"RPC endpoint (default: {DEFAULT_URL})")
+    parser.add_argument("--user", default="msf", help="RPC username (default: msf)")
+    parser.add_argument("--password", default=os.environ.get("MSF_RPC_PASSWORD", ""), help="RPC password (default: $MSF_RPC_PASSWORD)")
+    parser.add_argument("--insecure", action="store_true", help="Skip TLS verification (msfrpcd uses a self-signed certificate)")
+
+    commands = parser.add_subparsers(dest="command")
+    stub = commands.add_parser("stub", help="Serve a local stand-in msfrpcd (plain HTTP, canned shell output)")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=55553)
+    stub.add_argument("--session-delay", type=float, default=0.5, help="Seconds from exploit to session (default: 0.5)")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    if args.command == "stub":
+        stub = StubMsfRpcd(args.user, args.password, args.session_delay)
+        server = ThreadingHTTPServer((args.host, args.port), make_stub_handler(stub))
+        print(f"Stub msfrpcd for user {args.user!r} on http://{args.host}:{args.port}/api/", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    client = MsfRpcClient(args.url, args.user, args.password, verify_tls=not args.insecure)
+
+    start = time.perf_counter()
+    try:
+        client.login()
+        version = client.call("core.version")
+        jobs = client.jobs()
+        sessions = client.sessions()
+    except MsfRpcError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+
+    print(f"Connected to Metasploit {_text(version.get('version'))} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(f"Jobs:     {len(jobs)}")
+    for job_id, name in jobs.items():
+        print(f"  {job_id}: {name}")
+    print(f"Sessions: {len(sessions)}")
+    for session_id, info in sessions.items():
+        print(f"  {session_id}: {info.get('type', '')} {info.get('session_host', '')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
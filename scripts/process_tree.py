@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""Process Tree - Link ECS process events into ancestry chains at ingest speed.
+
+Every rule in demo-instructions/ looks at one event at a time, so the
+java -> bash -> sudo -> tar chain a tomcatastrophe run produces is never
+connected. This script builds an in-memory process tree from Elastic Defend
+process events as they stream past and reports attack chains: processes that
+descend from a Tomcat JVM however many hops removed.
+
+Storage is array-backed: each process gets a slot (a small integer) and its
+parent, flags and marks live in typed arrays indexed by slot, with a single
+entity_id -> slot dict on top. Every slot carries bit marks ("is a Tomcat
+JVM", "is sudo", ...) and caches the union of its ancestors' marks, so
+"does this tar descend from a Tomcat JVM?" is one array lookup rather than
+a walk. Capacity is bounded: exited processes (event.type "end") are
+evicted first, oldest first, and the live processes least recently
+started after that. Slots carry a reuse tag so a child never mistakes a
+recycled slot for its parent.
+"""
+
+import argparse
+import json
+import sys
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from esql_engine import iter_json_values
+
+
+DEFAULT_CAPACITY = 1_000_000
+
+ARCHIVERS = {"tar", "zip", "gzip", "7z", "rar"}
+SHELLS = {"bash", "sh", "dash", "zsh"}
+
+
+def get_field(doc: dict, name: str):
+    """Look up a dotted ECS field in a nested or already-flattened document."""
+    value = doc.get(name)
+    if value is not None or "." not in name:
+        return value
+    value = doc
+    for part in name.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+@dataclass(frozen=True)
+class Marker:
+    """A named property of a single process, tested on name and command line."""
+
+    name: str
+    test: Callable[[str, str], bool]
+
+
+MARKERS = (
+    Marker("tomcat_jvm", lambda name, command_line: name == "java" and ("catalina" in command_line or "tomcat" in command_line)),
+    Marker("shell", lambda name, command_line: name in SHELLS),
+    Marker("sudo", lambda name, command_line: name == "sudo"),
+)
+
+
+@dataclass(frozen=True)
+class ChainRule:
+    """Alert when a process matching ``test`` descends from a marked ancestor."""
+
+    name: str
+    ancestor: str  # Marker name
+    test: Callable[[str, str], bool]
+
+
+CHAIN_RULES = (
+    ChainRule("tomcat-descendant-archiver", "tomcat_jvm", lambda name, command_line: name in ARCHIVERS),
+    ChainRule("tomcat-descendant-shadow-read", "tomcat_jvm", lambda name, command_line: "/etc/shadow" in command_line),
+    ChainRule("tomcat-descendant-sudo", "tomcat_jvm", lambda name, command_line: name == "sudo"),
+)
+
+
+class ProcessTree:
+    """Bounded, array-backed map of entity_id -> process with cached ancestry."""
+
+    NO_PARENT = -1
+
+    EXITED = 1
+    HAS_CHILDREN = 2
+    LINKED = 4  # Parent link known (the process's own event was seen)
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, markers: tuple[Marker, ...] = MARKERS):
+        self.capacity = capacity
+        self.markers = markers
+        self.mark_bits = {marker.name: 1 << bit for bit, marker in enumerate(markers)}
+
+        self.slots: dict[str, int] = {}
+        self.entity_ids: list[str | None] = []
+        self.parent = array("i")
+        self.parent_tag = array("I")  # tag of the parent slot when linked
+        self.tag = array("I")  # bumped whenever a slot is reused
+        self.name = array("i")  # index into self.names
+        self.marks = array("I")  # this process's own marks
+        self.inherited = array("I")  # own marks | every ancestor's marks
+        self.inherited_gen = array("Q")  # generation ``inherited`` was computed in
+        self.flags = array("B")
+
+        self.names: list[str] = []
+        self.name_codes: dict[str, int] = {}
+        self.free: list[int] = []
+        self.started: deque[tuple[int, int]] = deque()  # (slot, tag) in allocation order
+        self.exited: deque[tuple[int, int]] = deque()  # (slot, tag) in exit order
+        # Bumped when ancestry learned late could change cached ``inherited``
+        # values (a parent seen before its own parent link); normally constant
+        self.generation = 0
+
+        self.evicted = 0
+        self.evicted_live = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    # Slots
+
+    def _intern(self, name: str) -> int:
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def _evict_one(self) -> None:
+        for queue, live in ((self.exited, False), (self.started, True)):
+            while queue:
+                slot, tag = queue.popleft()
+                if self.tag[slot] == tag and self.entity_ids[slot] is not None:
+                    if live and self.flags[slot] & self.EXITED:
+                        continue  # Still queued in ``exited``; evicted from there
+                    self._release(slot)
+                    self.evicted += 1
+                    self.evicted_live += live
+                    return
+
+    def _release(self, slot: int) -> None:
+        del self.slots[self.entity_ids[slot]]
+        self.entity_ids[slot] = None
+        self.tag[slot] = (self.tag[slot] + 1) & 0xFFFFFFFF
+        self.free.append(slot)
+
+    def _slot(self, entity_id: str) -> int:
+        """Return the slot for ``entity_id``, allocating (and evicting) if needed."""
+        slot = self.slots.get(entity_id)
+        if slot is not None:
+            return slot
+        if not self.free and len(self.entity_ids) >= self.capacity:
+            self._evict_one()
+        if self.free:
+            slot = self.free.pop()
+            self.entity_ids[slot] = entity_id
+            self.parent[slot] = self.NO_PARENT
+            self.parent_tag[slot] = 0
+            self.name[slot] = -1
+            self.marks[slot] = 0
+            self.inherited[slot] = 0
+            self.inherited_gen[slot] = self.generation
+            self.flags[slot] = 0
+        else:
+            slot = len(self.entity_ids)
+            self.entity_ids.append(entity_id)
+            self.parent.append(self.NO_PARENT)
+            self.parent_tag.append(0)
+            self.tag.append(0)
+            self.name.append(-1)
+            self.marks.append(0)
+            self.inherited.append(0)
+            self.inherited_gen.append(self.generation)
+            self.flags.append(0)
+        self.slots[entity_id] = slot
+        self.started.append((slot, self.tag[slot]))
+        if len(self.started) > 2 * self.capacity:
+            # Slots evicted via ``exited`` leave stale entries behind
+            self.started = deque((s, t) for s, t in self.started if self.tag[s] == t and self.entity_ids[s] is not None)
+        return slot
+
+    def _describe(self, slot: int, name: str | None, command_line: str | None) -> None:
+        if name is None or self.name[slot] >= 0:
+            return
+        self.name[slot] = self._intern(name)
+        marks = 0
+        for marker in self.markers:
+            if marker.test(name, command_line or ""):
+                marks |= self.mark_bits[marker.name]
+        if marks:
+            self.marks[slot] = marks
+            if self.flags[slot] & self.HAS_CHILDREN:
+                self.generation += 1  # Descendants' cached marks are stale
+            self.inherited[slot] |= marks
+
+    # Updates
+
+    def observe(
+        self,
+        entity_id: str,
+        name: str | None = None,
+        command_line: str | None = None,
+        parent_id: str | None = None,
+        parent_name: str | None = None,
+        parent_command_line: str | None = None,
+    ) -> int:
+        """Record a process start (or any event naming a process); returns its slot."""
+        slot = self._slot(entity_id)
+        self._describe(slot, name, command_line)
+        if parent_id and not self.flags[slot] & self.LINKED:
+            parent = self._slot(parent_id)
+            self._describe(parent, parent_name, parent_command_line)
+            self.parent[slot] = parent
+            self.parent_tag[slot] = self.tag[parent]
+            self.flags[parent] |= self.HAS_CHILDREN
+            if self.flags[slot] & self.HAS_CHILDREN:
+                self.generation += 1  # Learned ancestry for a process with known children
+            self.flags[slot] |= self.LINKED
+            if self.inherited_gen[parent] == self.generation:
+                self.inherited[slot] = self.marks[slot] | self.inherited[parent]
+                self.inherited_gen[slot] = self.generation
+            else:
+                self.inherited_gen[slot] = self.generation - 1  # Recompute on first query
+        return slot
+
+    def exit(self, entity_id: str) -> None:
+        """Record a process end; its slot becomes first in line for eviction."""
+        slot = self.slots.get(entity_id)
+        if slot is not None and not self.flags[slot] & self.EXITED:
+            self.flags[slot] |= self.EXITED
+            self.exited.append((slot, self.tag[slot]))
+
+    def ingest(self, doc: dict) -> int | None:
+        """Update the tree from one ECS process event; returns the process slot."""
+        process = get_field(doc, "process")
+        if isinstance(process, dict):
+            # Nested document: read the process object directly
+            parent = process.get("parent") or {}
+            entity_id = process.get("entity_id")
+            fields = (
+                process.get("name"),
+                process.get("command_line"),
+                parent.get("entity_id"),
+                parent.get("name"),
+                parent.get("command_line"),
+            )
+        else:
+            entity_id = get_field(doc, "process.entity_id")
+            fields = tuple(
+                get_field(doc, name)
+                for name in (
+                    "process.name",
+                    "process.command_line",
+                    "process.parent.entity_id",
+                    "process.parent.name",
+                    "process.parent.command_line",
+                )
+            )
+        if not entity_id:
+            return None
+        event_type = get_field(doc, "event.type")
+        if event_type == "end" or (isinstance(event_type, list) and "end" in event_type):
+            self.exit(entity_id)
+            return self.slots.get(entity_id)
+        return self.observe(entity_id, *fields)
+
+    # Queries
+
+    def _parent_of(self, slot: int) -> int:
+        parent = self.parent[slot]
+        if parent == self.NO_PARENT or self.tag[parent] != self.parent_tag[slot] or self.entity_ids[parent] is None:
+            return self.NO_PARENT
+        return parent
+
+    def ancestor_marks(self, slot: int) -> int:
+        """Union of the marks of a process and all its known ancestors."""
+        if self.inherited_gen[slot] == self.generation:
+            return self.inherited[slot]
+        # Stale after late-arriving ancestry: walk up to a fresh ancestor, then
+        # fill the cache back down the path
+        path = []
+        current = slot
+        while current != self.NO_PARENT and self.inherited_gen[current] != self.generation:
+            path.append(current)
+            current = self._parent_of(current)
+        marks = self.inherited[current] if current != self.NO_PARENT else 0
+        for node in reversed(path):
+            marks |= self.marks[node]
+            self.inherited[node] = marks
+            self.inherited_gen[node] = self.generation
+        return marks
+
+    def descends_from(self, entity_id: str, marker: str) -> bool:
+        """True if the process or one of its known ancestors carries ``marker``."""
+        slot = self.slots.get(entity_id)
+        return slot is not None and bool(self.ancestor_marks(slot) & self.mark_bits[marker])
+
+    def ancestry(self, entity_id: str, limit: int = 64) -> list[tuple[str, str | None]]:
+        """(entity_id, name) from the process up to its oldest known ancestor."""
+        chain = []
+        slot = self.slots.get(entity_id, self.NO_PARENT)
+        while slot != self.NO_PARENT and len(chain) < limit:
+            code = self.name[slot]
+            chain.append((self.entity_ids[slot], self.names[code] if code >= 0 else None))
+            slot = self._parent_of(slot)
+        return chain
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def iter_events(paths: list[str]) -> Iterator[dict]:
+    """Yield documents from JSON/NDJSON files, or stdin for '-'."""
+    for path in paths:
+        if path == "-":
+            stream = sys.stdin
+        else:
+            stream = open(path, encoding="utf-8")
+        try:
+            for doc in iter_json_values(stream):
+                if isinstance(doc, dict):
+                    yield doc
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Correlate ECS process events into attack chains with an in-memory process tree",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s corpus.ndjson
+  %(prog)s data/test-data/*.json --json
+  python3 scripts/generate_events.py -n 1000000 | %(prog)s - --capacity 200000
+""",
+    )
+
+    parser.add_argument("files", nargs="+", metavar="FILE", help="ECS JSON/NDJSON files, or - for stdin")
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=DEFAULT_CAPACITY,
+        help=f"Maximum processes tracked before eviction (default: {DEFAULT_CAPACITY:,})",
+    )
+    parser.add_argument("--json", action="store_true", help="Print chain alerts as NDJSON")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    tree = ProcessTree(args.capacity)
+    rules = [(rule, tree.mark_bits[rule.ancestor]) for rule in CHAIN_RULES]
+    counts = {rule.name: 0 for rule in CHAIN_RULES}
+    events = 0
+
+    start = time.perf_counter()
+    try:
+        for doc in iter_events(args.files):
+            events += 1
+            slot = tree.ingest(doc)
+            if slot is None or tree.flags[slot] & tree.EXITED:
+                continue
+            code = tree.name[slot]
+            name = tree.names[code] if code >= 0 else ""
+            command_line = get_field(doc, "process.command_line") or ""
+            marks = None
+            for rule, bit in rules:
+                if not rule.test(name, command_line):
+                    continue
+                if marks is None:
+                    marks = tree.ancestor_marks(slot)
+                if not marks & bit:
+                    continue
+                counts[rule.name] += 1
+                if args.quiet:
+                    continue
+                entity_id = tree.entity_ids[slot]
+                chain = [ancestor or "?" for _, ancestor in tree.ancestry(entity_id)]
+                if args.json:
+                    print(json.dumps({
+                        "rule": rule.name,
+                        "@timestamp": doc.get("@timestamp"),
+                        "host.name": get_field(doc, "host.name"),
+                        "process.entity_id": entity_id,
+                        "process.command_line": command_line,
+                        "ancestry": chain,
+                    }))
+                else:
+                    print(f"{rule.name}: {' <- '.join(chain)}  [{command_line}]")
+    except KeyboardInterrupt:
+        pass
+    except json.JSONDecodeError as e:
+        print(f"ERROR: Invalid JSON: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    rate = events / elapsed if elapsed > 0 else 0
+    print(f"Events: {events:,} in {elapsed:.1f}s ({rate:,.0f} events/s)", file=sys.stderr)
+    print(
+        f"Processes tracked: {len(tree):,} of {args.capacity:,} "
+        f"({tree.evicted:,} evicted, {tree.evicted_live:,} of them still running)",
+        file=sys.stderr,
+    )
+    for name, count in counts.items():
+        print(f"  {name}: {count:,} chain(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""Replay - Re-send recorded endpoint telemetry at a controlled rate with fresh timestamps.
+
+Recorded NDJSON (test data, generate_events.py corpora, converted Tracee
+captures) carries fixed 2025 timestamps, so windowed rules such as
+``@timestamp > NOW() - 5 minutes`` never match it once it is ingested.
+This script replays recordings as a live source for soak-testing detection
+latency:
+
+    - ``@timestamp``, ``event.created`` and ``event.ingested`` are rewritten
+      in the raw line bytes (one regex pass, no JSON decode/encode), either
+      to the moment each event is sent or shifted so the recording starts now
+    - A token bucket holds the stream at ``--eps`` events per second;
+      ``--speed`` instead follows the recorded spacing, compressed by a factor
+    - ``--loop`` repeats the recording, shifting each pass after the last
+    - Achieved versus target events/sec is reported as it runs and at the end
+
+Output goes to stdout, to a file that stream_detect.py can follow, or to
+Elasticsearch through bulk_ingest.py (batches flush at least every
+``--flush-interval`` seconds, so slow rates are not held back by batch size).
+
+The nested ``created``/``ingested`` keys are matched by name, so any other
+object with such a key (``file.created``) is shifted by the same amount.
+Looped passes reuse each event's ``event.id``.
+"""
+
+import argparse
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator
+
+from bulk_ingest import BulkIngester, IngestConfig, iter_source_lines, print_summary
+
+
+TIMESTAMP_FIELDS = (b"@timestamp", b"created", b"ingested", b"event.created", b"event.ingested")
+TIMESTAMP_PATTERN = re.compile(
+    rb'"(' + b"|".join(re.escape(name) for name in TIMESTAMP_FIELDS) + rb')"(\s*:\s*)"(\d{4}-\d\d-\d\dT[^"]*)"'
+)
+MIN_SLEEP = 0.001  # Delays shorter than this are carried over rather than slept
+REPORT_INTERVAL = 5.0
+FEED_QUEUE_SIZE = 10_000  # Lines buffered between the replayer thread and the batcher
+
+
+def parse_iso(value: bytes) -> float | None:
+    """Parse an ISO 8601 timestamp to epoch seconds (naive values are UTC)."""
+    try:
+        parsed = datetime.fromisoformat(value.decode().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class TimestampFormatter:
+    """Formats epoch seconds as ``2025-11-10T15:00:00.002Z``, caching the per-second prefix."""
+
+    def __init__(self):
+        self._second = None
+        self._prefix = b""
+
+    def __call__(self, epoch: float) -> bytes:
+        second = int(epoch // 1)
+        if second != self._second:
+            self._second = second
+            self._prefix = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S").encode()
+        millis = int((epoch - second) * 1000)
+        return b"%s.%03dZ" % (self._prefix, millis)
+
+
+def event_time(line: bytes) -> float | None:
+    """The recorded ``@timestamp`` of a line, or its first rewritable timestamp."""
+    first = None
+    for match in TIMESTAMP_PATTERN.finditer(line):
+        if match.group(1) == b"@timestamp":
+            return parse_iso(match.group(3))
+        if first is None:
+            first = match.group(3)
+    return parse_iso(first) if first is not None else None
+
+
+def rewrite_timestamps(line: bytes, transform: Callable[[bytes], bytes]) -> tuple[bytes, int]:
+    """Replace every timestamp field value in ``line`` with ``transform(value)``."""
+    return TIMESTAMP_PATTERN.subn(lambda m: b'"%s"%s"%s"' % (m.group(1), m.group(2), transform(m.group(3))), line)
+
+
+class TokenBucket:
+    """Token bucket that returns how long to wait rather than sleeping itself."""
+
+    def __init__(self, rate: float, burst: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate / 10)
+        self.clock = clock
+        self.tokens = 0.0  # Credit only builds up while the consumer is idle
+        self.updated = clock()
+
+    def take(self, count: float = 1.0) -> float:
+        """Spend ``count`` tokens; return the seconds to wait before proceeding."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= count
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+@dataclass
+class ReplayConfig:
+    """Configuration for a replay run."""
+
+    eps: float | None = None  # Token bucket rate; None to follow recorded spacing or run flat out
+    speed: float | None = None  # Compression of recorded spacing (paces the replay without eps)
+    burst: float | None = None
+    loops: int = 1  # 0 repeats forever
+    timestamps: str = "send"  # send | shift | keep
+    report_interval: float = REPORT_INTERVAL
+
+
+@dataclass
+class ReplayStats:
+    """Counters for achieved versus target throughput."""
+
+    events: int = 0
+    rewritten: int = 0  # Timestamp fields replaced
+    loops: int = 0
+    max_lag: float = 0.0  # Furthest behind schedule, in seconds
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def eps(self) -> float:
+        return self.events / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Replayer:
+    """Yields rewritten lines on schedule; ``flush`` runs before every wait."""
+
+    def __init__(self, config: ReplayConfig, flush: Callable[[], None] | None = None):
+        self.config = config
+        self.flush = flush or (lambda: None)
+        self.stats = ReplayStats()
+        self.bucket = TokenBucket(config.eps, config.burst) if config.eps else None
+        self.format = TimestampFormatter()
+
+    def _wait(self, delay: float) -> None:
+        if delay >= MIN_SLEEP:
+            self.flush()
+            time.sleep(delay)
+        elif delay < 0:
+            self.stats.max_lag = max(self.stats.max_lag, -delay)
+
+    def run(self, source: Callable[[], Iterable[bytes]]) -> Iterator[bytes]:
+        """Replay ``source()`` (re-opened for every loop) and yield each rewritten line."""
+        config = self.config
+        stats = self.stats = ReplayStats()
+        wall_start = time.time()
+        first = None  # Recorded time of the first event
+        last = None  # Latest recorded time seen in the first pass
+        period = 0.0  # Replayed duration of one pass, for shifting later loops
+        speed = config.speed or 1.0
+        next_report = stats.started + config.report_interval
+        reported = (stats.started, 0)
+
+        def shift(value: bytes) -> bytes:
+            original = parse_iso(value)
+            if original is None:
+                return value
+            return self.format(wall_start + offset + (original - first) / speed)
+
+        loop = 0
+        while config.loops == 0 or loop < config.loops:
+            offset = loop * period
+            count = 0
+            latest = None  # Out-of-order events go out immediately, without counting as lag
+            for line in source():
+                count += 1
+                recorded = None
+                if (config.speed and not self.bucket) or config.timestamps == "shift":
+                    recorded = event_time(line)
+                    if recorded is not None:
+                        if first is None:
+                            first = recorded
+                        if loop == 0 and (last is None or recorded > last):
+                            last = recorded
+
+                if self.bucket:
+                    self._wait(self.bucket.take())
+                elif config.speed and recorded is not None and (latest is None or recorded >= latest):
+                    latest = recorded
+                    due = stats.started + offset + (recorded - first) / speed
+                    self._wait(due - time.monotonic())
+
+                if config.timestamps == "send":
+                    stamp = self.format(time.time())
+                    line, replaced = rewrite_timestamps(line, lambda value: stamp)
+                    stats.rewritten += replaced
+                elif config.timestamps == "shift" and first is not None:
+                    line, replaced = rewrite_timestamps(line, shift)
+                    stats.rewritten += replaced
+
+                stats.events += 1
+                yield line
+
+                now = time.monotonic()
+                if now >= next_report:
+                    interval = stats.events - reported[1], now - reported[0]
+                    print(
+                        f"  {stats.events:,} events, {interval[0] / interval[1]:,.0f} events/s"
+                        + (f" (target {config.eps:,.0f})" if config.eps else ""),
+                        file=sys.stderr,
+                    )
+                    reported = (now, stats.events)
+                    next_report = now + config.report_interval
+
+            loop += 1
+            stats.loops = loop
+            if count == 0:
+                break
+            if loop == 1 and first is not None and last is not None:
+                # Leave one average gap between the end of a pass and the next
+                period = (last - first) * (1 + 1 / max(count - 1, 1)) / speed
+            if not period:
+                period = time.monotonic() - stats.started
+
+        stats.finished = time.monotonic()
+
+
+def iter_timed_batches(lines: Iterable[bytes], max_bytes: int, max_delay: float) -> Iterator[list[bytes]]:
+    """Group lines by size like ``iter_batches``, but never hold a batch past ``max_delay``.
+
+    ``lines`` is consumed on a background thread through a bounded queue, so
+    a batch is released when it comes due even while the replayer is asleep
+    waiting to send its next event.
+    """
+    feed: queue.Queue = queue.Queue(maxsize=FEED_QUEUE_SIZE)
+    done = object()
+    failure: list[BaseException] = []
+
+    def produce() -> None:
+        try:
+            for line in lines:
+                feed.put(line)
+        except BaseException as e:  # Re-raised in the consuming thread
+            failure.append(e)
+        finally:
+            feed.put(done)
+
+    threading.Thread(target=produce, name="replay-feed", daemon=True).start()
+
+    batch: list[bytes] = []
+    size = 0
+    due = 0.0
+    while True:
+        try:
+            line = feed.get(timeout=max(0.0, due - time.monotonic()) if batch else None)
+        except queue.Empty:
+            yield batch
+            batch, size = [], 0
+            continue
+        if line is done:
+            break
+        line_size = len(line) + len(BulkIngester.ACTION) + 2
+        if batch and size + line_size > max_bytes:
+            yield batch
+            batch, size = [], 0
+        if not batch:
+            due = time.monotonic() + max_delay
+        batch.append(line)
+        size += line_size
+        if time.monotonic() >= due:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+    if failure:
+        raise failure[0]
+
+
+def print_replay_summary(stats: ReplayStats, config: ReplayConfig) -> None:
+    """Print achieved against target throughput to stderr."""
+    print(f"Replayed {stats.events:,} events in {stats.loops} pass(es) over {stats.elapsed:.1f}s", file=sys.stderr)
+    line = f"Achieved: {stats.eps:,.0f} events/s"
+    if config.eps:
+        line += f" of {config.eps:,.0f} target ({stats.eps / config.eps:.1%})"
+    elif config.speed:
+        line += f" at {config.speed:g}x recorded speed"
+    print(line, file=sys.stderr)
+    if stats.max_lag:
+        print(f"Fell behind schedule by up to {stats.max_lag * 1000:.1f} ms", file=sys.stderr)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Replay recorded ECS NDJSON at a controlled rate with timestamps moved to now",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s corpus.ndjson --eps 500 --loop 0 | python3 scripts/stream_detect.py -
+  %(prog)s data/test-data/*.json --speed 10 -o /tmp/live.ndjson
+  ES_PASSWORD=... %(prog)s corpus.ndjson --eps 2000 --url https://my-es:443
+  %(prog)s corpus.ndjson --timestamps shift --speed 60 --loop 3 > shifted.ndjson
+""",
+    )
+
+    parser.add_argument("files", nargs="+", metavar="FILE", help="NDJSON or JSON files to replay")
+    parser.add_argument("--eps", type=float, help="Target events per second (token bucket)")
+    parser.add_argument("--burst", type=float, help="Token bucket size in events (default: eps / 10)")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        help="Follow the recorded event spacing compressed by this factor; with --eps, only compresses shifted timestamps",
+    )
+    parser.add_argument("--loop", type=int, default=1, metavar="N", help="Passes over the input, 0 for forever (default: 1)")
+    parser.add_argument(
+        "--timestamps",
+        choices=["send", "shift", "keep"],
+        default="send",
+        help="send: stamp events when sent; shift: keep recorded spacing starting now; keep: unchanged (default: send)",
+    )
+    parser.add_argument("-o", "--output", metavar="FILE", help="Append to FILE instead of writing to stdout")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL, help="Seconds between progress lines")
+
+    es = parser.add_argument_group("Elasticsearch output")
+    es.add_argument("--url", help="Send to Elasticsearch via _bulk instead of writing NDJSON")
+    es.add_argument("--index", default="logs-endpoint.events.default", help="Target index or data stream")
+    es.add_argument("--user", default="elastic", help="Basic auth username (default: elastic)")
+    es.add_argument("--password", default=os.environ.get("ES_PASSWORD"), help="Basic auth password (default: $ES_PASSWORD)")
+    es.add_argument("--api-key", default=os.environ.get("ES_API_KEY"), help="API key, overrides basic auth (default: $ES_API_KEY)")
+    es.add_argument("--batch-mb", type=float, default=5.0, help="Maximum bulk request size in MB (default: 5)")
+    es.add_argument("--flush-interval", type=float, default=1.0, help="Maximum seconds a batch is held (default: 1)")
+    es.add_argument("--concurrency", type=int, default=4, help="Concurrent bulk requests (default: 4)")
+    es.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification")
+    es.add_argument("--refresh", action="store_true", help="Wait for each batch to become searchable")
+
+    args = parser.parse_args()
+    if args.eps is not None and args.eps <= 0:
+        parser.error("--eps must be positive")
+    if args.speed is not None and args.speed <= 0:
+        parser.error("--speed must be positive")
+    return args
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    for path in args.files:
+        if not os.path.isfile(path):
+            print(f"ERROR: {path} not found", file=sys.stderr)
+            return 1
+
+    config = ReplayConfig(
+        eps=args.eps,
+        speed=args.speed,
+        burst=args.burst,
+        loops=args.loop,
+        timestamps=args.timestamps,
+        report_interval=args.report_interval,
+    )
+
+    def source() -> Iterator[bytes]:
+        for path in args.files:
+            yield from iter_source_lines(path)
+
+    target = f"{config.eps:,.0f} events/s" if config.eps else f"{config.speed:g}x recorded speed" if config.speed else "full speed"
+    print(f"Replaying {len(args.files)} file(s) at {target}, timestamps: {config.timestamps}", file=sys.stderr)
+
+    if args.url:
+        ingest = IngestConfig(
+            url=args.url,
+            index=args.index,
+            username=args.user if args.password else None,
+            password=args.password,
+            api_key=args.api_key,
+            batch_bytes=int(args.batch_mb * 1024 * 1024),
+            concurrency=args.concurrency,
+            verify_tls=not args.insecure,
+            refresh=args.refresh,
+        )
+        replayer = Replayer(config)
+        ingester = BulkIngester(ingest)
+        try:
+            stats = ingester.run_batches(iter_timed_batches(replayer.run(source), ingest.batch_bytes, args.flush_interval))
+        except KeyboardInterrupt:
+            replayer.stats.finished = time.monotonic()
+            stats = ingester.stats
+        print_summary(stats, replayer.stats.elapsed)
+        print_replay_summary(replayer.stats, config)
+        return 0 if stats.failed == 0 else 1
+
+    out = open(args.output, "ab") if args.output else sys.stdout.buffer
+    replayer = Replayer(config, flush=out.flush)
+    try:
+        for line in replayer.run(source):
+            out.write(line + b"\n")
+    except KeyboardInterrupt:
+        replayer.stats.finished = time.monotonic()
+    except BrokenPipeError:
+        replayer.stats.finished = time.monotonic()
+        sys.stdout = None  # Suppress the flush error at exit
+    finally:
+        try:
+            out.flush()
+        except BrokenPipeError:
+            pass
+        if args.output:
+            out.close()
+    print_replay_summary(replayer.stats, config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
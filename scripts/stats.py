@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""Stats - Summary statistics shared by the benchmark and latency reports.
+
+Used by bench_rules.py, stream_detect.py and time_to_detect.py, so none of
+them has to import another tool to summarize its samples.
+"""
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
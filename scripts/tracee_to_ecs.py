@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Tracee to ECS - Stream Tracee events into ECS-shaped NDJSON.
+
+Reads Tracee output (a JSON array like data/new-source/tracee.json, or one
+event per line) incrementally, in fixed-size chunks, so memory use stays
+constant however large the capture is. Each event is mapped to ECS
+process/network/file fields and written as NDJSON, ready for bulk_ingest.py
+or esql_engine.py.
+
+Both the flattened demo shape and Tracee's native field names are accepted:
+
+    demo shape      timestamp, host, process, event, user, file, destination, ...
+    native Tracee   timestamp (ns), hostName, processName, eventName, processId,
+                    parentProcessId, userId, args: [{name, value}, ...]
+"""
+
+import argparse
+import json
+import posixpath
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator, TextIO
+
+from esql_engine import iter_json_values
+
+
+PROCESS_EVENTS = {"execve", "execveat", "sched_process_exec", "sched_process_exit", "ptrace", "clone", "fork"}
+NETWORK_EVENTS = {"connect", "accept", "accept4", "bind", "listen", "sendto", "recvfrom", "security_socket_connect"}
+FILE_EVENTS = {"open", "openat", "openat2", "read", "write", "fchmodat", "chmod", "unlink", "unlinkat", "rename", "security_file_open"}
+
+EVENT_TYPES = {
+    "execve": ["start"],
+    "execveat": ["start"],
+    "sched_process_exec": ["start"],
+    "sched_process_exit": ["end"],
+    "clone": ["start"],
+    "fork": ["start"],
+    "ptrace": ["access"],
+    "connect": ["connection", "start"],
+    "security_socket_connect": ["connection", "start"],
+    "accept": ["connection", "start"],
+    "accept4": ["connection", "start"],
+    "bind": ["start"],
+    "listen": ["start"],
+    "sendto": ["connection", "protocol"],
+    "recvfrom": ["connection", "protocol"],
+    "open": ["access"],
+    "openat": ["access"],
+    "openat2": ["access"],
+    "security_file_open": ["access"],
+    "read": ["access"],
+    "write": ["change"],
+    "fchmodat": ["change"],
+    "chmod": ["change"],
+    "unlink": ["deletion"],
+    "unlinkat": ["deletion"],
+    "rename": ["change"],
+}
+
+ENDPOINT_DATASETS = {
+    "process": "endpoint.events.process",
+    "network": "endpoint.events.network",
+    "file": "endpoint.events.file",
+}
+
+
+def split_address(value: object) -> tuple[str | None, int | None]:
+    """Split "ip:port" (or "[v6]:port") into its parts."""
+    if not isinstance(value, str):
+        return None, None
+    host, sep, port = value.rpartition(":")
+    if not sep or not port.isdigit():
+        return value, None
+    return host.strip("[]"), int(port)
+
+
+def to_timestamp(value: object) -> str | None:
+    """Normalize ISO strings and Tracee nanosecond epochs to ISO-8601 UTC."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        seconds = value / 1e9 if value > 1e14 else value
+        return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    return None
+
+
+def native_args(event: dict) -> dict:
+    """Flatten Tracee's ``args: [{name, value}]`` list into a dict."""
+    args = event.get("args")
+    if not isinstance(args, list):
+        return {}
+    return {arg.get("name"): arg.get("value") for arg in args if isinstance(arg, dict)}
+
+
+def normalize(event: dict, dataset: str = "tracee", endpoint_compatible: bool = False) -> dict:
+    """Map one Tracee event to an ECS document."""
+    args = native_args(event)
+    name = event.get("event") or event.get("eventName") or "unknown"
+    process_name = event.get("process") or event.get("processName")
+    user = event.get("user")
+    if user is None and event.get("userId") is not None:
+        user = {"id": str(event["userId"])}
+    elif isinstance(user, str):
+        user = {"name": user}
+
+    if name in PROCESS_EVENTS:
+        category = "process"
+    elif name in NETWORK_EVENTS:
+        category = "network"
+    elif name in FILE_EVENTS:
+        category = "file"
+    else:
+        category = "host"
+
+    dataset_name = ENDPOINT_DATASETS.get(category, dataset) if endpoint_compatible else dataset
+    doc: dict = {
+        "@timestamp": to_timestamp(event.get("timestamp")),
+        "agent": {"type": "tracee"},
+        "data_stream": {"dataset": dataset_name, "namespace": "default", "type": "logs"},
+        "ecs": {"version": "8.10.0"},
+        "event": {
+            "action": name,
+            "category": [category],
+            "dataset": dataset_name,
+            "kind": "event",
+            "module": "tracee",
+            "type": EVENT_TYPES.get(name, ["info"]),
+        },
+        "host": {"name": event.get("host") or event.get("hostName"), "os": {"type": "linux"}},
+    }
+    if user:
+        doc["user"] = user
+
+    process: dict = {}
+    if process_name:
+        process["name"] = process_name
+    if event.get("processId") is not None:
+        process["pid"] = event["processId"]
+    if event.get("parentProcessId") is not None:
+        process["parent"] = {"pid": event["parentProcessId"]}
+
+    path = event.get("file") or args.get("pathname")
+    if name in ("execve", "execveat", "sched_process_exec") and path:
+        # The traced process is the parent; the executed file is the new process
+        # (exec keeps the pid, so a native processId stays on the process)
+        argv = args.get("argv")
+        parent = process.pop("parent", {})
+        if process_name:
+            parent["name"] = process_name
+        process = {
+            "executable": path,
+            "name": posixpath.basename(path),
+            **({"pid": process["pid"]} if "pid" in process else {}),
+            "parent": parent,
+        }
+        if isinstance(argv, list) and argv:
+            process["args"] = argv
+            process["args_count"] = len(argv)
+            process["command_line"] = " ".join(str(arg) for arg in argv)
+    elif path:
+        doc["file"] = {"path": path, "name": posixpath.basename(path)}
+        mode = event.get("permissions") or args.get("mode")
+        if mode is not None:
+            doc["file"]["mode"] = str(mode)
+    if process:
+        doc["process"] = process
+
+    if category == "network":
+        direction = "ingress" if name in ("accept", "accept4", "recvfrom", "bind", "listen") else "egress"
+        doc["network"] = {"direction": direction, "transport": "tcp"}
+        for field in ("destination", "source"):
+            ip, port = split_address(event.get(field))
+            if ip or port:
+                doc[field] = {key: value for key, value in (("ip", ip), ("port", port)) if value is not None}
+        if event.get("port") is not None:
+            doc["server"] = {"port": event["port"]}
+
+    if event.get("container") or event.get("containerId"):
+        doc["container"] = {"name": event.get("container"), "id": event.get("containerId")}
+        doc["container"] = {key: value for key, value in doc["container"].items() if value}
+
+    if event.get("action"):
+        doc["tracee"] = {"action": event["action"]}
+
+    return doc
+
+
+def convert(source: TextIO, out: TextIO, dataset: str, endpoint_compatible: bool, batch_size: int = 1000) -> int:
+    """Stream-convert Tracee events from ``source`` to NDJSON on ``out``."""
+    count = 0
+    batch = []
+    for event in iter_json_values(source):
+        if not isinstance(event, dict):
+            continue
+        batch.append(json.dumps(normalize(event, dataset, endpoint_compatible), separators=(",", ":")))
+        count += 1
+        if len(batch) >= batch_size:
+            out.write("\n".join(batch) + "\n")
+            batch = []
+    if batch:
+        out.write("\n".join(batch) + "\n")
+    return count
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Convert Tracee events to ECS NDJSON",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s data/new-source/tracee.json
+  %(prog)s capture.json -o tracee.ndjson --endpoint-compatible
+  tracee --output json | %(prog)s - -o tracee.ndjson
+""",
+    )
+
+    parser.add_argument("input", metavar="FILE", help="Tracee JSON array or JSON-lines file ('-' for stdin)")
+    parser.add_argument("-o", "--output", metavar="FILE", help="Output NDJSON file (default: stdout)")
+    parser.add_argument("--dataset", default="tracee", help="data_stream.dataset for converted events (default: tracee)")
+    parser.add_argument(
+        "--endpoint-compatible",
+        action="store_true",
+        help="Route process/network/file events to the endpoint.events.* datasets the demo rules query",
+    )
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        count = convert(source, out, args.dataset, args.endpoint_compatible)
+    except json.JSONDecodeError as e:
+        print(f"ERROR: Invalid JSON in {args.input}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"Converted {count} events in {elapsed:.2f}s ({rate:,.0f} events/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
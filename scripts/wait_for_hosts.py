@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Wait For Hosts - Probe many hosts concurrently until their SSH (or any TCP) port is ready.
+
+The deployment scripts used to wait for each VM with a fixed loop of
+``ssh ...; sleep 10`` attempts, one host after another. This script probes
+every host:port at once on a single asyncio event loop:
+
+    - A host is ready when a TCP connect succeeds and, for SSH ports, the
+      server sends its ``SSH-`` identification banner (sshd accepts
+      connections before it is able to serve them during boot)
+    - Failed attempts back off exponentially with jitter, capped, so a
+      fleet of booting VMs is not polled in lockstep
+    - Each host is reported the moment it becomes ready, with its time to
+      ready and number of attempts
+
+Exits 0 when every host is ready, 1 if any is still down at ``--timeout``.
+``--stub`` starts local stand-in listeners for the given targets, so the
+behaviour can be tried without any VMs.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+
+DEFAULT_PORT = 22
+SSH_BANNER = b"SSH-"
+
+
+@dataclass(frozen=True)
+class Target:
+    """A host:port to probe and the banner prefix it must send, if any."""
+
+    host: str
+    port: int = DEFAULT_PORT
+    banner: bytes | None = SSH_BANNER
+
+    def __str__(self) -> str:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"{host}:{self.port}"
+
+
+@dataclass
+class ProbeConfig:
+    """Timing for one run of probes."""
+
+    timeout: float = 300.0  # Overall deadline per host, in seconds
+    connect_timeout: float = 5.0  # Per attempt: connect plus banner
+    backoff: float = 1.0  # First retry delay, in seconds
+    max_backoff: float = 5.0
+    concurrency: int = 256  # Connection attempts in flight at once
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of waiting for one target."""
+
+    target: str
+    ready: bool
+    seconds: float  # Time until ready (or until giving up)
+    attempts: int
+    banner: str = ""
+    error: str = ""
+
+
+def parse_target(text: str, banner: bytes | None = None, check_banner: bool = True) -> Target:
+    """Parse ``host``, ``host:port`` or ``[v6addr]:port``.
+
+    SSH banners are expected on port 22 unless ``banner`` names another prefix
+    or ``check_banner`` is off.
+    """
+    host, port_text = text, ""
+    if text.startswith("["):
+        host, _, rest = text[1:].partition("]")
+        port_text = rest[1:] if rest.startswith(":") else ""
+    elif text.count(":") == 1:
+        host, port_text = text.split(":")
+    try:
+        port = int(port_text) if port_text else DEFAULT_PORT
+    except ValueError:
+        raise ValueError(f"invalid port in {text!r}") from None
+    if not host or not 0 < port < 65536:
+        raise ValueError(f"invalid target {text!r}")
+    if not check_banner:
+        expected = None
+    elif banner is not None:
+        expected = banner
+    else:
+        expected = SSH_BANNER if port == DEFAULT_PORT else None
+    return Target(host, port, expected)
+
+
+def backoff_delay(config: ProbeConfig, attempt: int) -> float:
+    """Exponential delay for a retry, jittered between half and the full value."""
+    delay = min(config.max_backoff, config.backoff * (2 ** attempt))
+    return delay / 2 + random.random() * delay / 2
+
+
+async def probe_once(target: Target, timeout: float) -> str:
+    """Connect (and read the banner); returns the banner line or raises OSError/TimeoutError."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(target.host, target.port), timeout)
+    try:
+        if target.banner is None:
+            return ""
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        if not line.startswith(target.banner):
+            raise ConnectionError(f"unexpected banner {line[:40]!r}")
+        return line.decode(errors="replace").strip()
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def wait_ready(target: Target, config: ProbeConfig, limit: asyncio.Semaphore) -> ProbeResult:
+    """Probe one target until it is ready or ``config.timeout`` passes."""
+    start = time.monotonic()
+    deadline = start + config.timeout
+    attempt = 0
+    error = ""
+    while True:
+        attempt += 1
+        remaining = deadline - time.monotonic()
+        try:
+            async with limit:
+                banner = await probe_once(target, max(0.01, min(config.connect_timeout, remaining)))
+            return ProbeResult(str(target), True, time.monotonic() - start, attempt, banner)
+        except (OSError, asyncio.TimeoutError) as e:
+            error = str(e) or type(e).__name__
+        delay = backoff_delay(config, attempt - 1)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ProbeResult(str(target), False, time.monotonic() - start, attempt, error=error)
+        await asyncio.sleep(min(delay, remaining))
+
+
+async def wait_all(targets: list[Target], config: ProbeConfig, on_result=None) -> list[ProbeResult]:
+    """Wait for every target concurrently; ``on_result`` is called as each finishes."""
+    limit = asyncio.Semaphore(config.concurrency)
+    tasks = [asyncio.create_task(wait_ready(target, config, limit)) for target in targets]
+    if on_result:
+        for task in asyncio.as_completed(tasks):
+            on_result(await task)
+    return list(await asyncio.gather(*tasks))
+
+
+# =============================================================================
+# Stand-in listeners
+# =============================================================================
+
+
+async def start_stub(target: Target, delay: float, banner: bytes = b"SSH-2.0-OpenSSH_stub") -> asyncio.AbstractServer:
+    """Listen on ``target`` after ``delay`` seconds, sending ``banner`` to each client.
+
+    Until then the port is closed, so probes see connection refused, as for a
+    VM that is still booting.
+    """
+    await asyncio.sleep(delay)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(banner + b"\r\n")
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, target.host, target.port)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def print_result(result: ProbeResult) -> None:
+    """Print one host's outcome as soon as it is known."""
+    if result.ready:
+        detail = f", {result.banner}" if result.banner else ""
+        print(f"[READY] {result.target} in {result.seconds:.1f}s ({result.attempts} attempt(s){detail})")
+    else:
+        print(f"[DOWN]  {result.target} not ready after {result.seconds:.1f}s ({result.attempts} attempt(s), last error: {result.error})")
+    sys.stdout.flush()
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Wait until many hosts accept TCP connections (and send an SSH banner)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s 10.0.1.50 10.0.1.100
+  %(prog)s 10.0.1.50:22 10.0.1.50:8080 --timeout 600 --json readiness.json
+  %(prog)s 127.0.0.1:2222 127.0.0.1:2223 --stub 2,5
+""",
+    )
+
+    parser.add_argument("targets", nargs="+", metavar="HOST[:PORT]", help=f"Hosts to probe (default port: {DEFAULT_PORT})")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for each host (default: 300)")
+    parser.add_argument("--connect-timeout", type=float, default=5.0, help="Seconds per connection attempt (default: 5)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="First retry delay in seconds, doubled each attempt (default: 1)")
+    parser.add_argument("--max-backoff", type=float, default=5.0, help="Longest retry delay in seconds (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=256, help="Connection attempts in flight at once (default: 256)")
+    parser.add_argument("--banner", help="Banner prefix every target must send (default: SSH- on port 22)")
+    parser.add_argument("--no-banner", action="store_true", help="Only require the TCP connect to succeed")
+    parser.add_argument("--json", metavar="FILE", help="Write per-host results as JSON")
+    parser.add_argument(
+        "--stub",
+        metavar="DELAY[,DELAY...]",
+        help="Start local stand-in listeners for the targets after these delays (seconds; the last repeats)",
+    )
+
+    return parser.parse_args()
+
+
+async def run(targets: list[Target], config: ProbeConfig, stub_delays: list[float]) -> list[ProbeResult]:
+    """Probe all targets, first starting stand-in listeners if ``stub_delays`` is given."""
+    stubs = [
+        asyncio.create_task(start_stub(target, stub_delays[min(index, len(stub_delays) - 1)]))
+        for index, target in enumerate(targets)
+    ] if stub_delays else []
+    try:
+        return await wait_all(targets, config, print_result)
+    finally:
+        for stub in stubs:
+            if stub.done() and not stub.exception():
+                stub.result().close()
+            else:
+                stub.cancel()
+
+
+def main() -> int:
+    """Main entry point."""
+    args = parse_arguments()
+    banner = args.banner.encode() if args.banner else None
+    try:
+        targets = [parse_target(text, banner, not args.no_banner) for text in args.targets]
+        stub_delays = [float(value) for value in args.stub.split(",")] if args.stub else []
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    config = ProbeConfig(args.timeout, args.connect_timeout, args.backoff, args.max_backoff, max(1, args.concurrency))
+
+    print(f"Waiting for {len(targets)} host(s), up to {args.timeout:g}s each...")
+    start = time.monotonic()
+    try:
+        results = asyncio.run(run(targets, config, stub_delays))
+    except KeyboardInterrupt:
+        return 130
+
+    ready = [result for result in results if result.ready]
+    print(f"{len(ready)}/{len(results)} host(s) ready in {time.monotonic() - start:.1f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    return 0 if len(ready) == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())